@@ -0,0 +1,64 @@
+"""
+Script for resuming the course import and export jobs whose celery tasks were
+lost, e.g. when the broker was restarted while they were queued or running
+"""
+from datetime import timedelta
+from optparse import make_option
+import tarfile
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from contentstore.models import CourseImportExportJob
+from contentstore.tasks import course_import_dir, import_course, export_course
+
+
+def is_uploaded(job):
+    """
+    Whether the whole tarball of the queued import job has been uploaded.
+    Imports are queued as soon as their upload starts, and only given to
+    celery once the last chunk is in.
+    """
+    try:
+        tar_file = tarfile.open(course_import_dir(job) / job.filename)
+        try:
+            # Reading to the end fails if the tarball was cut short
+            tar_file.getmembers()
+        finally:
+            tar_file.close()
+    except (IOError, OSError, EOFError, tarfile.TarError):
+        return False
+    return True
+
+
+class Command(BaseCommand):
+    """Queue again the import and export jobs which haven't progressed for a while"""
+    help = 'Queue again the import and export jobs which haven\'t progressed for --minutes minutes'
+    option_list = BaseCommand.option_list + (
+        make_option('--minutes',
+                    action='store',
+                    type='int',
+                    default=60,
+                    help='How long a job has to have been stuck for (longer than the longest import)'),
+    )
+
+    def handle(self, *args, **options):
+        "Execute the command"
+        tasks = {
+            CourseImportExportJob.IMPORT: import_course,
+            CourseImportExportJob.EXPORT: export_course,
+        }
+        stuck_since = timezone.now() - timedelta(minutes=options['minutes'])
+        jobs = CourseImportExportJob.objects.filter(
+            state__in=(CourseImportExportJob.QUEUED, CourseImportExportJob.PROGRESS),
+            updated__lt=stuck_since
+        )
+
+        for job in jobs:
+            if (job.state == CourseImportExportJob.QUEUED and job.job_type == CourseImportExportJob.IMPORT and
+                    not is_uploaded(job)):
+                # The upload was abandoned, or is still going on
+                continue
+            self.stdout.write("Resuming {0}\n".format(repr(job)))
+            # The tasks carry on from the stage the job reached
+            tasks[job.job_type].apply_async((job.id,), task_id=job.task_id)
@@ -0,0 +1,83 @@
+"""
+Tests for resume_import_export_jobs.
+"""
+from datetime import timedelta
+import os
+import shutil
+import tarfile
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from mock import patch
+
+from contentstore.models import CourseImportExportJob
+from contentstore.tasks import course_import_dir, import_job_dir
+from student.tests.factories import UserFactory
+
+COURSE_LOCATION = 'i4x://edX/resume/course/2013_Fall'
+
+
+@patch('contentstore.management.commands.resume_import_export_jobs.export_course')
+@patch('contentstore.management.commands.resume_import_export_jobs.import_course')
+class ResumeImportExportJobsTestCase(TestCase):
+    """
+    Test that the jobs whose celery tasks were lost are queued again.
+    """
+    def setUp(self):
+        self.user = UserFactory.create()
+
+    def make_job(self, job_type, state, minutes_ago=120, filename='course.tar.gz'):
+        """
+        Make a job in state which was last updated minutes_ago.
+        """
+        job = CourseImportExportJob.create(job_type, COURSE_LOCATION, filename, self.user)
+        CourseImportExportJob.objects.filter(id=job.id).update(
+            state=state, updated=timezone.now() - timedelta(minutes=minutes_ago)
+        )
+        return job
+
+    def upload(self, job, complete=True):
+        """
+        Write the tarball of the import job, cut short unless complete.
+        """
+        course_dir = course_import_dir(job)
+        os.makedirs(course_dir)
+        self.addCleanup(shutil.rmtree, import_job_dir(job))
+        content_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, content_dir)
+        with open(os.path.join(content_dir, 'course.xml'), 'w') as course_xml:
+            course_xml.write('<course url_name="2013_Fall" org="edX" course="resume"/>' * 1000)
+        tarball = course_dir / job.filename
+        with tarfile.open(tarball, 'w:gz') as tar_file:
+            tar_file.add(content_dir, arcname='course')
+        if not complete:
+            with open(tarball, 'r+b') as tar_file:
+                tar_file.truncate(os.path.getsize(tarball) // 2)
+
+    def resumed(self, task):
+        """
+        Return the ids of the jobs task was queued again for.
+        """
+        return [call[0][0][0] for call in task.apply_async.call_args_list]
+
+    def test_resume_stale_jobs(self, import_course, export_course):
+        running_import = self.make_job(CourseImportExportJob.IMPORT, CourseImportExportJob.PROGRESS)
+        queued_export = self.make_job(CourseImportExportJob.EXPORT, CourseImportExportJob.QUEUED)
+        self.make_job(CourseImportExportJob.EXPORT, CourseImportExportJob.QUEUED, minutes_ago=1)
+        self.make_job(CourseImportExportJob.EXPORT, CourseImportExportJob.SUCCESS)
+
+        call_command('resume_import_export_jobs')
+        self.assertEqual(self.resumed(import_course), [running_import.id])
+        self.assertEqual(self.resumed(export_course), [queued_export.id])
+
+    def test_resume_uploaded_imports(self, import_course, _export_course):
+        uploaded = self.make_job(CourseImportExportJob.IMPORT, CourseImportExportJob.QUEUED)
+        self.upload(uploaded)
+        uploading = self.make_job(CourseImportExportJob.IMPORT, CourseImportExportJob.QUEUED, filename='other.tar.gz')
+        self.upload(uploading, complete=False)
+        self.make_job(CourseImportExportJob.IMPORT, CourseImportExportJob.QUEUED, filename='none.tar.gz')
+
+        call_command('resume_import_export_jobs')
+        self.assertEqual(self.resumed(import_course), [uploaded.id])
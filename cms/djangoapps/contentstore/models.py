@@ -0,0 +1,159 @@
+"""
+WE'RE USING MIGRATIONS!
+
+If you make changes to this model, be sure to create an appropriate migration
+file and check it in at the same time as your model changes. To do that,
+
+1. Go to the edx-platform dir
+2. ./manage.py cms schemamigration contentstore --auto description_of_your_change
+3. Add the migration file created in edx-platform/cms/djangoapps/contentstore/migrations/
+"""
+import json
+from uuid import uuid4
+
+from django.contrib.auth.models import User
+from django.db import models, transaction
+
+
+class CourseImportExportJob(models.Model):
+    """
+    Stores the progress of a course import or export, which is run by a
+    celery task (see contentstore.tasks).
+
+    `job_type` is IMPORT or EXPORT.
+    `course_location` is the url of the Location of the course.
+    `filename` is the name of the uploaded tarball of an import, or the name
+        an export's archive is downloaded as (it is stored under a name
+        unique to the job, see contentstore.tasks.export_archive_path).
+    `task_id` stores the id used by celery for the task.
+    `state` is QUEUED, PROGRESS, SUCCESS or FAILURE.
+    `stage` is the last stage the job reached: one of the IMPORT_STAGES or
+        EXPORT_STAGES. A failed job keeps the stage it failed at.
+    `output` stores the output of the job as a JSON-serialized dict: the
+        error response of a failed job.
+
+    `requester` stores the user who started the job
+    `created` stores date that entry was first created
+    `updated` stores date that entry was last modified
+    """
+    IMPORT = 'import'
+    EXPORT = 'export'
+
+    QUEUED = 'QUEUED'
+    PROGRESS = 'PROGRESS'
+    SUCCESS = 'SUCCESS'
+    FAILURE = 'FAILURE'
+
+    # The stages of an import, which are shown to the user by the import page
+    UPLOADING = 0
+    EXTRACTING = 1
+    VALIDATING = 2
+    IMPORTING = 3
+    IMPORTED = 4
+
+    # The stages of an export
+    EXPORTING = 1
+    COMPRESSING = 2
+    EXPORTED = 3
+
+    job_type = models.CharField(max_length=50, db_index=True)
+    course_location = models.CharField(max_length=255, db_index=True)
+    filename = models.CharField(max_length=255)
+    task_id = models.CharField(max_length=255, db_index=True)  # max_length from celery_taskmeta
+    state = models.CharField(max_length=50, db_index=True)
+    stage = models.IntegerField(default=0)
+    output = models.TextField(blank=True)
+    requester = models.ForeignKey(User, db_index=True)
+    created = models.DateTimeField(auto_now_add=True, null=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __repr__(self):
+        return 'CourseImportExportJob<%r>' % ({
+            'job_type': self.job_type,
+            'course_location': self.course_location,
+            'filename': self.filename,
+            'task_id': self.task_id,
+            'state': self.state,
+            'stage': self.stage,
+        },)
+
+    def __unicode__(self):
+        return unicode(repr(self))
+
+    @classmethod
+    def create(cls, job_type, course_location, filename, requester):
+        """
+        Create a queued job, committing it so that the celery task can read it.
+        """
+        job = cls(
+            job_type=job_type,
+            course_location=course_location,
+            filename=filename,
+            task_id=str(uuid4()),
+            state=cls.QUEUED,
+            requester=requester
+        )
+        job.save_now()
+        return job
+
+    @classmethod
+    def latest(cls, job_type, course_location, filename=None):
+        """
+        Return the last job of job_type for the course (and filename, if
+        given), or None if there is none.
+        """
+        jobs = cls.objects.filter(job_type=job_type, course_location=course_location)
+        if filename is not None:
+            jobs = jobs.filter(filename=filename)
+        try:
+            return jobs.order_by('-id')[0]
+        except IndexError:
+            return None
+
+    @transaction.autocommit
+    def save_now(self):
+        """
+        Writes the job immediately, ensuring the transaction is committed, so
+        that its progress is seen by the status requests while the job runs.
+        """
+        self.save()
+
+    @property
+    def is_ready(self):
+        """
+        Whether the job has finished, successfully or not.
+        """
+        return self.state in (self.SUCCESS, self.FAILURE)
+
+    def get_output(self):
+        """
+        Return the output of the job as a dict.
+        """
+        return json.loads(self.output) if self.output else {}
+
+    def set_stage(self, stage):
+        """
+        Record that the job reached stage.
+        """
+        self.state = self.PROGRESS
+        self.stage = stage
+        self.save_now()
+
+    def succeed(self, stage, **output):
+        """
+        Record that the job finished at stage with output.
+        """
+        self.state = self.SUCCESS
+        self.stage = stage
+        self.output = json.dumps(output)
+        self.save_now()
+
+    def fail(self, status, **response):
+        """
+        Record that the job failed at its current stage. The response to give
+        the user, and its http status, are kept in the output.
+        """
+        response.setdefault('Stage', self.stage)
+        self.state = self.FAILURE
+        self.output = json.dumps(dict(response, status=status))
+        self.save_now()
@@ -0,0 +1,231 @@
+"""
+Celery tasks that import and export courses in the background, so that big
+courses don't tie up a Studio web worker (nor hit the load balancer's
+timeout).
+
+The progress of each task is kept in a CourseImportExportJob, which the
+status views read. The tasks are acknowledged late: if a worker dies during
+one, the broker gives it to another worker, which resumes the job from the
+last stage it reached. The files of a job are kept under GITHUB_REPO_ROOT,
+which must be shared by the Studio web and celery workers.
+"""
+import logging
+import os
+import shutil
+import tarfile
+from tempfile import mkdtemp
+
+from celery import task
+from django.conf import settings
+from django.core.exceptions import SuspiciousOperation
+from django.utils.translation import ugettext as _
+from path import path
+
+from auth.authz import create_all_course_groups
+from extract_tar import safetar_extractall
+from xmodule.contentstore.django import contentstore
+from xmodule.modulestore import Location
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.xml_exporter import export_to_xml
+from xmodule.modulestore.xml_importer import import_from_xml
+
+from .models import CourseImportExportJob
+
+log = logging.getLogger(__name__)
+
+
+def import_job_dir(job):
+    """
+    Return the directory holding the files of the import job, so that
+    overlapping imports of a course don't touch each other's files.
+    """
+    return path(settings.GITHUB_REPO_ROOT) / 'imports' / str(job.id)
+
+
+def course_import_dir(job):
+    """
+    Return the directory the tarball of the import job is uploaded and
+    extracted to, which is named after the course in import_job_dir(job).
+    """
+    location = Location(job.course_location)
+    course_subdir = "{0}-{1}-{2}".format(location.org, location.course, location.name)
+    return import_job_dir(job) / course_subdir
+
+
+def course_export_dir():
+    """
+    Return the directory the archives of exports are written to.
+    """
+    return path(settings.GITHUB_REPO_ROOT) / 'exports'
+
+
+def export_archive_path(job):
+    """
+    Return the path of the archive of the export job. It is named after the
+    job, as the name of a course's run is shared by many courses.
+    """
+    location = Location(job.course_location)
+    return course_export_dir() / "{0}-{1}-{2}-{3}.tar.gz".format(
+        location.org, location.course, location.name, job.id
+    )
+
+
+def _get_dir_for_fname(directory, filename):
+    """
+    Returns the dirpath for the first file found in the directory with the
+    given name. If there is no file in the directory with the specified name,
+    return None.
+    """
+    for dirpath, _dirnames, filenames in os.walk(directory):
+        if filename in filenames:
+            return path(dirpath)
+    return None
+
+
+def _extract(job, course_dir):
+    """
+    Extract the uploaded tarball of job into course_dir, and move the course
+    in it, wherever its course.xml is, to the top of course_dir.
+    """
+    temp_filepath = course_dir / job.filename
+
+    # Remove whatever an earlier, interrupted, run of the job extracted
+    for name in os.listdir(course_dir):
+        if name != job.filename:
+            child = course_dir / name
+            if child.isdir() and not child.islink():
+                shutil.rmtree(child)
+            else:
+                os.remove(child)
+
+    job.set_stage(CourseImportExportJob.EXTRACTING)
+    tar_file = tarfile.open(temp_filepath)
+    try:
+        safetar_extractall(tar_file, (course_dir + '/').encode('utf-8'))
+    except SuspiciousOperation as exc:
+        job.fail(
+            400,
+            ErrMsg='Unsafe tar file. Aborting import.',
+            SuspiciousFileOperationMsg=exc.args[0]
+        )
+        return False
+    finally:
+        tar_file.close()
+
+    job.set_stage(CourseImportExportJob.VALIDATING)
+    dirpath = _get_dir_for_fname(course_dir, "course.xml")
+    if not dirpath:
+        job.fail(415, ErrMsg=_('Could not find the course.xml file in the package.'))
+        return False
+
+    log.debug('found course.xml at %s', dirpath)
+    if dirpath != course_dir:
+        for fname in os.listdir(dirpath):
+            shutil.move(dirpath / fname, course_dir)
+    return True
+
+
+@task(acks_late=True)  # pylint: disable=E1102
+def import_course(job_id):
+    """
+    Import the course uploaded for the CourseImportExportJob with id job_id.
+
+    The tarball is extracted and validated again if the job was interrupted
+    before it got to importing; otherwise the import, which only overwrites
+    what it writes, is run again on what was extracted.
+    """
+    job = CourseImportExportJob.objects.get(id=job_id)
+    if job.is_ready:
+        return
+
+    location = Location(job.course_location)
+    course_dir = course_import_dir(job)
+
+    try:
+        if job.stage < CourseImportExportJob.IMPORTING:
+            if not _extract(job, course_dir):
+                return
+
+        job.set_stage(CourseImportExportJob.IMPORTING)
+        _module_store, course_items = import_from_xml(
+            modulestore('direct'),
+            import_job_dir(job),
+            [course_dir.name],
+            load_error_modules=False,
+            static_content_store=contentstore(),
+            target_location_namespace=location,
+            draft_store=modulestore(),
+            defer_thumbnails=_defer_thumbnails
+        )
+        log.debug('new course at %s', course_items[0].location)
+
+        create_all_course_groups(job.requester, course_items[0].location)
+        log.debug('created all course groups at %s', course_items[0].location)
+
+        job.succeed(CourseImportExportJob.IMPORTED)
+
+    # Send errors to client with stage at which error occured.
+    except Exception as exception:  # pylint: disable=W0703
+        log.exception('There was an error importing course %s', job.course_location)
+        job.fail(400, ErrMsg=str(exception))
+
+    finally:
+        # If the worker dies, the files are kept for the job to be resumed
+        shutil.rmtree(import_job_dir(job), ignore_errors=True)
+
+
+@task()  # pylint: disable=E1102
+def generate_asset_thumbnails(asset_urls):
+    """
+    Generate the thumbnails of the imported assets at asset_urls.
+    """
+    contentstore().generate_thumbnails([Location(url) for url in asset_urls])
+
+
+def _defer_thumbnails(locations):
+    """
+    Generate the thumbnails of the assets at locations in another task, so
+    that the import doesn't wait for them.
+    """
+    generate_asset_thumbnails.delay([location.url() for location in locations])
+
+
+@task(acks_late=True)  # pylint: disable=E1102
+def export_course(job_id):
+    """
+    Export the course of the CourseImportExportJob with id job_id to a tar.gz
+    archive at export_archive_path(job).
+
+    The export only reads the course, so a job that was interrupted is run
+    again from the beginning.
+    """
+    job = CourseImportExportJob.objects.get(id=job_id)
+    if job.is_ready:
+        return
+
+    location = Location(job.course_location)
+    name = location.name
+    export_dir = course_export_dir()
+    if not export_dir.isdir():
+        os.makedirs(export_dir)
+    archive = export_archive_path(job)
+    root_dir = path(mkdtemp())
+
+    try:
+        job.set_stage(CourseImportExportJob.EXPORTING)
+        export_to_xml(modulestore('direct'), contentstore(), location, root_dir, name, modulestore())
+
+        job.set_stage(CourseImportExportJob.COMPRESSING)
+        log.debug('tar file being generated at %s', archive)
+        tar_file = tarfile.open(name=archive, mode='w:gz')
+        tar_file.add(root_dir / name, arcname=name)
+        tar_file.close()
+
+        job.succeed(CourseImportExportJob.EXPORTED)
+
+    except Exception as exception:  # pylint: disable=W0703
+        log.exception('There was an error exporting course %s', job.course_location)
+        job.fail(400, ErrMsg=unicode(exception))
+
+    finally:
+        shutil.rmtree(root_dir, ignore_errors=True)
@@ -18,7 +18,10 @@ from django.conf import settings
 from xmodule.modulestore.django import loc_mapper
 
 from xmodule.contentstore.django import _CONTENTSTORE
-from xmodule.modulestore.tests.factories import ItemFactory
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+from contentstore.models import CourseImportExportJob
+from contentstore.tasks import course_import_dir, import_job_dir, import_course, export_archive_path
 
 TEST_DATA_CONTENTSTORE = copy.deepcopy(settings.CONTENTSTORE)
 TEST_DATA_CONTENTSTORE['DOC_STORE_CONFIG']['db'] = 'test_xcontent_%s' % uuid4().hex
@@ -105,6 +108,73 @@ class ImportTestCase(CourseTestCase):
             resp = self.client.post(self.url, args)
 
         self.assertEquals(resp.status_code, 200)
+        resp_status = self.client.get(
+            self.new_location.url_reverse(
+                'import_status',
+                os.path.split(self.good_tar)[1]
+            )
+        )
+        self.assertEquals(json.loads(resp_status.content)["ImportStatus"], 4)
+
+    def test_import_status_error(self):
+        """
+        Check that `import_status` returns the error of a failed import.
+        """
+        with open(self.bad_tar) as btar:
+            self.client.post(self.url, {"name": self.bad_tar, "course-data": [btar]})
+        resp_status = self.client.get(
+            self.new_location.url_reverse(
+                'import_status',
+                os.path.split(self.bad_tar)[1]
+            )
+        )
+        self.assertIn("course.xml", json.loads(resp_status.content)["ErrMsg"])
+
+    def test_resume_import(self):
+        """
+        Check that an import job interrupted before importing is extracted and
+        imported again.
+        """
+        old_location = self.course.location
+        job = CourseImportExportJob.create(
+            CourseImportExportJob.IMPORT, old_location.url(), os.path.split(self.good_tar)[1], self.user
+        )
+        course_dir = course_import_dir(job)
+        os.makedirs(course_dir)
+        shutil.copy(self.good_tar, course_dir)
+        # What the interrupted job had extracted
+        os.mkdir(course_dir / "course")
+
+        job.set_stage(CourseImportExportJob.VALIDATING)
+        import_course(job.id)
+
+        job = CourseImportExportJob.objects.get(id=job.id)
+        self.assertEquals(job.state, CourseImportExportJob.SUCCESS)
+        self.assertEquals(job.stage, CourseImportExportJob.IMPORTED)
+        self.assertFalse(import_job_dir(job).exists())
+
+    def test_overlapping_imports(self):
+        """
+        Check that importing a course doesn't touch the files of another
+        import of the course which is still uploading.
+        """
+        old_location = self.course.location
+        filename = os.path.split(self.good_tar)[1]
+        uploading_job = CourseImportExportJob.create(
+            CourseImportExportJob.IMPORT, old_location.url(), 'other.tar.gz', self.user
+        )
+        uploading_dir = course_import_dir(uploading_job)
+        os.makedirs(uploading_dir)
+        shutil.copy(self.good_tar, uploading_dir / 'other.tar.gz')
+
+        with open(self.good_tar) as gtar:
+            resp = self.client.post(self.url, {"name": self.good_tar, "course-data": [gtar]})
+        self.assertEquals(resp.status_code, 200)
+        job = CourseImportExportJob.latest(CourseImportExportJob.IMPORT, old_location.url(), filename)
+        self.assertEquals(job.state, CourseImportExportJob.SUCCESS)
+        self.assertNotEquals(course_import_dir(job), uploading_dir)
+        self.assertEquals(os.listdir(uploading_dir), ['other.tar.gz'])
+        shutil.rmtree(import_job_dir(uploading_job))
 
     ## Unsafe tar methods #####################################################
     # Each of these methods creates a tarfile with a single type of unsafe
@@ -220,6 +290,8 @@ class ExportTestCase(CourseTestCase):
         resp = self.client.get_html(self.url)
         self.assertEquals(resp.status_code, 200)
         self.assertContains(resp, "Export My Course Content")
+        # The page exports in the background
+        self.assertContains(resp, 'data-start-url="{0}"'.format(self.url))
 
     def test_export_json_unsupported(self):
         """
@@ -242,6 +314,55 @@ class ExportTestCase(CourseTestCase):
         resp = self.client.get(self.url + '?_accept=application/x-tgz')
         self._verify_export_succeeded(resp)
 
+    def test_export_job(self):
+        """
+        Export in the background, then get the tar.gz file.
+        """
+        resp = self.client.post(self.url, HTTP_ACCEPT='application/json')
+        self.assertEquals(resp.status_code, 200)
+        status = json.loads(resp.content)
+        self.assertEquals(status["ExportStatus"], 3)
+
+        resp_status = self.client.get(status["StatusUrl"])
+        self.assertEquals(json.loads(resp_status.content), status)
+
+        resp = self.client.get(status["ExportUrl"])
+        self._verify_export_succeeded(resp)
+
+    def test_export_jobs_of_courses_sharing_a_run(self):
+        """
+        The archives of courses whose runs have the same name are kept apart.
+        """
+        other_course = CourseFactory.create(org='edX', number='888', display_name='Robot Super Course')
+        other_location = loc_mapper().translate_location(
+            other_course.location.course_id, other_course.location, False, True
+        )
+        status = json.loads(self.client.post(self.url, HTTP_ACCEPT='application/json').content)
+        other_status = json.loads(
+            self.client.post(other_location.url_reverse('export/', ''), HTTP_ACCEPT='application/json').content
+        )
+
+        archive = export_archive_path(CourseImportExportJob.objects.get(id=status["JobId"]))
+        other_archive = export_archive_path(CourseImportExportJob.objects.get(id=other_status["JobId"]))
+        self.assertNotEquals(archive, other_archive)
+        self.assertTrue(os.path.exists(archive))
+        self.assertTrue(os.path.exists(other_archive))
+
+        resp = self.client.get(status["ExportUrl"])
+        self._verify_export_succeeded(resp)
+        self.assertEquals(int(resp['Content-Length']), os.path.getsize(archive))
+
+    def test_export_job_failure(self):
+        """
+        Export failure in the background.
+        """
+        ItemFactory.create(parent_location=self.course.location, category='aawefawef')
+        resp = self.client.post(self.url, HTTP_ACCEPT='application/json')
+        status = json.loads(resp.content)
+        self.assertEquals(status["ExportStatus"], 1)
+        self.assertIn('Unable to create xml for module', status["ErrMsg"])
+        self.assertNotIn("ExportUrl", status)
+
     def _verify_export_succeeded(self, resp):
         """ Export success helper method. """
         self.assertEquals(resp.status_code, 200)
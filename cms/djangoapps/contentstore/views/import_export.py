@@ -10,34 +10,32 @@ import re
 from tempfile import mkdtemp
 from path import path
 
-from django.conf import settings
 from django.http import HttpResponse
 from django.contrib.auth.decorators import login_required
 from django_future.csrf import ensure_csrf_cookie
 from django.core.servers.basehttp import FileWrapper
 from django.core.files.temp import NamedTemporaryFile
-from django.core.exceptions import SuspiciousOperation, PermissionDenied
+from django.core.exceptions import PermissionDenied
 from django.http import HttpResponseNotFound
 from django.views.decorators.http import require_http_methods, require_GET
 from django.utils.translation import ugettext as _
 
 from edxmako.shortcuts import render_to_response
-from auth.authz import create_all_course_groups
 
-from xmodule.modulestore.xml_importer import import_from_xml
 from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.xml_exporter import export_to_xml
 from xmodule.modulestore.django import modulestore, loc_mapper
 from xmodule.exceptions import SerializationError
 
 from xmodule.modulestore.locator import BlockUsageLocator
+from contentstore.models import CourseImportExportJob
+from contentstore.tasks import course_import_dir, import_course, export_course, export_archive_path
 from .access import has_access
 
 from util.json_request import JsonResponse
-from extract_tar import safetar_extractall
 
 
-__all__ = ['import_handler', 'import_status_handler', 'export_handler']
+__all__ = ['import_handler', 'import_status_handler', 'export_handler', 'export_status_handler']
 
 
 log = logging.getLogger(__name__)
@@ -70,10 +68,6 @@ def import_handler(request, tag=None, course_id=None, branch=None, version_guid=
         if request.method == 'GET':
             raise NotImplementedError('coming soon')
         else:
-            data_root = path(settings.GITHUB_REPO_ROOT)
-            course_subdir = "{0}-{1}-{2}".format(old_location.org, old_location.course, old_location.name)
-            course_dir = data_root / course_subdir
-
             filename = request.FILES['course-data'].name
             if not filename.endswith('.tar.gz'):
                 return JsonResponse(
@@ -83,12 +77,6 @@ def import_handler(request, tag=None, course_id=None, branch=None, version_guid=
                     },
                     status=415
                 )
-            temp_filepath = course_dir / filename
-
-            if not course_dir.isdir():
-                os.mkdir(course_dir)
-
-            logging.debug('importing course to {0}'.format(temp_filepath))
 
             # Get upload chunks byte ranges
             try:
@@ -101,9 +89,27 @@ def import_handler(request, tag=None, course_id=None, branch=None, version_guid=
             # stream out the uploaded files in chunks to disk
             if int(content_range['start']) == 0:
                 mode = "wb+"
+                # The status of the import is that of the upload until the
+                # last chunk is in
+                job = CourseImportExportJob.create(
+                    CourseImportExportJob.IMPORT, old_location.url(), filename, request.user
+                )
+                course_dir = course_import_dir(job)
+                temp_filepath = course_dir / filename
+                os.makedirs(course_dir)
             else:
                 mode = "ab+"
-                size = os.path.getsize(temp_filepath)
+                # The chunks go to the latest upload of the file
+                job = CourseImportExportJob.latest(CourseImportExportJob.IMPORT, old_location.url(), filename)
+                if job is None:
+                    size = 0
+                elif job.state != CourseImportExportJob.QUEUED:
+                    # The upload has finished, so this is the last chunk
+                    # again (see below)
+                    return JsonResponse({'ImportStatus': 1})
+                else:
+                    temp_filepath = course_import_dir(job) / filename
+                    size = os.path.getsize(temp_filepath)
                 # Check to make sure we haven't missed a chunk
                 # This shouldn't happen, even if different instances are handling
                 # the same session, but it's always better to catch errors earlier.
@@ -125,6 +131,8 @@ def import_handler(request, tag=None, course_id=None, branch=None, version_guid=
                 elif size > int(content_range['stop']) and size == int(content_range['end']):
                     return JsonResponse({'ImportStatus': 1})
 
+            logging.debug('importing course to {0}'.format(temp_filepath))
+
             with open(temp_filepath, mode) as temp_file:
                 for chunk in request.FILES['course-data'].chunks():
                     temp_file.write(chunk)
@@ -145,108 +153,19 @@ def import_handler(request, tag=None, course_id=None, branch=None, version_guid=
                 })
 
             else:   # This was the last chunk.
-
-                # Use sessions to keep info about import progress
-                session_status = request.session.setdefault("import_status", {})
-                key = location.course_id + filename
-                session_status[key] = 1
-                request.session.modified = True
-
-                # Do everything from now on in a try-finally block to make sure
-                # everything is properly cleaned up.
-                try:
-
-                    tar_file = tarfile.open(temp_filepath)
-                    try:
-                        safetar_extractall(tar_file, (course_dir + '/').encode('utf-8'))
-                    except SuspiciousOperation as exc:
-                        return JsonResponse(
-                            {
-                                'ErrMsg': 'Unsafe tar file. Aborting import.',
-                                'SuspiciousFileOperationMsg': exc.args[0],
-                                'Stage': 1
-                            },
-                            status=400
-                        )
-                    finally:
-                        tar_file.close()
-
-                    session_status[key] = 2
-                    request.session.modified = True
-
-                    # find the 'course.xml' file
-                    def get_all_files(directory):
-                        """
-                        For each file in the directory, yield a 2-tuple of (file-name,
-                        directory-path)
-                        """
-                        for dirpath, _dirnames, filenames in os.walk(directory):
-                            for filename in filenames:
-                                yield (filename, dirpath)
-
-                    def get_dir_for_fname(directory, filename):
-                        """
-                        Returns the dirpath for the first file found in the directory
-                        with the given name.  If there is no file in the directory with
-                        the specified name, return None.
-                        """
-                        for fname, dirpath in get_all_files(directory):
-                            if fname == filename:
-                                return dirpath
-                        return None
-
-                    fname = "course.xml"
-
-                    dirpath = get_dir_for_fname(course_dir, fname)
-
-                    if not dirpath:
-                        return JsonResponse(
-                            {
-
-                                'ErrMsg': _('Could not find the course.xml file in the package.'),
-                                'Stage': 2
-                            },
-                            status=415
-                        )
-
-                    logging.debug('found course.xml at {0}'.format(dirpath))
-
-                    if dirpath != course_dir:
-                        for fname in os.listdir(dirpath):
-                            shutil.move(dirpath / fname, course_dir)
-
-                    _module_store, course_items = import_from_xml(
-                        modulestore('direct'),
-                        settings.GITHUB_REPO_ROOT,
-                        [course_subdir],
-                        load_error_modules=False,
-                        static_content_store=contentstore(),
-                        target_location_namespace=old_location,
-                        draft_store=modulestore()
-                    )
-
-                    logging.debug('new course at {0}'.format(course_items[0].location))
-
-                    session_status[key] = 3
-                    request.session.modified = True
-
-                    create_all_course_groups(request.user, course_items[0].location)
-                    logging.debug('created all course groups at {0}'.format(course_items[0].location))
-
-                # Send errors to client with stage at which error occured.
-                except Exception as exception:   # pylint: disable=W0703
-                    return JsonResponse(
-                        {
-                            'ErrMsg': str(exception),
-                            'Stage': session_status[key]
-                        },
-                        status=400
-                    )
-
-                finally:
-                    shutil.rmtree(course_dir)
-
-                return JsonResponse({'Status': 'OK'})
+                # The import is run by a celery worker. When celery runs
+                # tasks eagerly, it has finished by now.
+                import_course.apply_async((job.id,), task_id=job.task_id)
+                job = CourseImportExportJob.objects.get(id=job.id)
+
+                if job.state == CourseImportExportJob.FAILURE:
+                    output = job.get_output()
+                    status = output.pop('status')
+                    return JsonResponse(output, status=status)
+                elif job.state == CourseImportExportJob.SUCCESS:
+                    return JsonResponse({'Status': 'OK'})
+                else:
+                    return JsonResponse({'ImportStatus': job.stage})
     elif request.method == 'GET':  # assume html
         course_module = modulestore().get_item(old_location)
         return render_to_response('import.html', {
@@ -265,36 +184,46 @@ def import_status_handler(request, tag=None, course_id=None, branch=None, versio
     """
     Returns an integer corresponding to the status of a file import. These are:
 
-        0 : No status info found (import done or upload still in progress)
+        0 : No status info found (upload still in progress)
         1 : Extracting file
         2 : Validating.
         3 : Importing to mongo
+        4 : Imported
 
+    If the import failed, the integer is the stage it failed at, and the
+    error is returned as ErrMsg.
     """
     location = BlockUsageLocator(course_id=course_id, branch=branch, version_guid=version_guid, usage_id=block)
     if not has_access(request.user, location):
         raise PermissionDenied()
 
-    try:
-        session_status = request.session["import_status"]
-        status = session_status[location.course_id + filename]
-    except KeyError:
-        status = 0
+    old_location = loc_mapper().translate_locator_to_location(location)
+    job = CourseImportExportJob.latest(CourseImportExportJob.IMPORT, old_location.url(), filename)
+    if job is None:
+        return JsonResponse({"ImportStatus": 0})
 
-    return JsonResponse({"ImportStatus": status})
+    response = {"ImportStatus": job.stage}
+    if job.state == CourseImportExportJob.FAILURE:
+        response.update(job.get_output())
+        del response['status']
+    return JsonResponse(response)
 
 
 @ensure_csrf_cookie
 @login_required
-@require_http_methods(("GET",))
+@require_http_methods(("GET", "POST"))
 def export_handler(request, tag=None, course_id=None, branch=None, version_guid=None, block=None):
     """
     The restful handler for exporting a course.
 
     GET
         html: return html page for import page
-        application/x-tgz: return tar.gz file containing exported course
+        application/x-tgz: return tar.gz file containing exported course, or, with a job
+            parameter, the archive of that finished export job
         json: not supported
+    POST
+        json: start exporting the course in the background, returning the status of the
+            export job (see export_status_handler)
 
     Note that there are 2 ways to request the tar.gz file. The request header can specify
     application/x-tgz via HTTP_ACCEPT, or a query parameter can be used (?_accept=application/x-tgz).
@@ -313,7 +242,34 @@ def export_handler(request, tag=None, course_id=None, branch=None, version_guid=
     requested_format = request.REQUEST.get('_accept', request.META.get('HTTP_ACCEPT', 'text/html'))
 
     export_url = location.url_reverse('export') + '?_accept=application/x-tgz'
-    if 'application/x-tgz' in requested_format:
+    # The export page exports in the background, with a POST to this url
+    start_export_url = location.url_reverse('export')
+    if request.method == 'POST':
+        if 'application/json' not in request.META.get('HTTP_ACCEPT', 'application/json'):
+            return HttpResponse(status=406)
+        job = _start_export(request.user, old_location)
+        return JsonResponse(_export_status(job, location))
+
+    elif 'application/x-tgz' in requested_format and 'job' in request.GET:
+        try:
+            job = CourseImportExportJob.objects.get(
+                id=request.GET['job'],
+                job_type=CourseImportExportJob.EXPORT,
+                course_location=old_location.url(),
+                state=CourseImportExportJob.SUCCESS
+            )
+        except (CourseImportExportJob.DoesNotExist, ValueError):
+            return HttpResponseNotFound()
+        archive = export_archive_path(job)
+        if not os.path.exists(archive):
+            return HttpResponseNotFound()
+
+        response = HttpResponse(FileWrapper(open(archive, 'rb')), content_type='application/x-tgz')
+        response['Content-Disposition'] = 'attachment; filename=%s' % job.filename
+        response['Content-Length'] = os.path.getsize(archive)
+        return response
+
+    elif 'application/x-tgz' in requested_format:
         name = old_location.name
         export_file = NamedTemporaryFile(prefix=name + '.', suffix=".tar.gz")
         root_dir = path(mkdtemp())
@@ -348,7 +304,8 @@ def export_handler(request, tag=None, course_id=None, branch=None, version_guid=
                 'unit': unit,
                 'edit_unit_url': unit_locator.url_reverse("unit") if parent else "",
                 'course_home_url': location.url_reverse("course"),
-                'export_url': export_url
+                'export_url': export_url,
+                'start_export_url': start_export_url
 
             })
         except Exception, e:
@@ -359,7 +316,8 @@ def export_handler(request, tag=None, course_id=None, branch=None, version_guid=
                 'unit': None,
                 'raw_err_msg': str(e),
                 'course_home_url': location.url_reverse("course"),
-                'export_url': export_url
+                'export_url': export_url,
+                'start_export_url': start_export_url
             })
 
         logging.debug('tar file being generated at {0}'.format(export_file.name))
@@ -379,9 +337,82 @@ def export_handler(request, tag=None, course_id=None, branch=None, version_guid=
     elif 'text/html' in requested_format:
         return render_to_response('export.html', {
             'context_course': course_module,
-            'export_url': export_url
+            'export_url': export_url,
+            'start_export_url': start_export_url
         })
 
     else:
         # Only HTML or x-tgz request formats are supported (no JSON).
         return HttpResponse(status=406)
+
+
+@require_GET
+@ensure_csrf_cookie
+@login_required
+def export_status_handler(request, tag=None, course_id=None, branch=None, version_guid=None, block=None, job_id=None):
+    """
+    Returns the status of the export job with id job_id (see _export_status).
+    """
+    location = BlockUsageLocator(course_id=course_id, branch=branch, version_guid=version_guid, usage_id=block)
+    if not has_access(request.user, location):
+        raise PermissionDenied()
+
+    old_location = loc_mapper().translate_locator_to_location(location)
+    try:
+        job = CourseImportExportJob.objects.get(
+            id=job_id, job_type=CourseImportExportJob.EXPORT, course_location=old_location.url()
+        )
+    except CourseImportExportJob.DoesNotExist:
+        return HttpResponseNotFound()
+
+    return JsonResponse(_export_status(job, location))
+
+
+def _start_export(user, old_location):
+    """
+    Queue an export of the course at old_location for user, returning its
+    CourseImportExportJob.
+
+    The archives of the course's earlier exports are removed.
+    """
+    earlier_jobs = CourseImportExportJob.objects.filter(
+        job_type=CourseImportExportJob.EXPORT,
+        course_location=old_location.url(),
+        state=CourseImportExportJob.SUCCESS
+    )
+    for earlier_job in earlier_jobs:
+        archive = export_archive_path(earlier_job)
+        if os.path.exists(archive):
+            os.remove(archive)
+
+    job = CourseImportExportJob.create(
+        CourseImportExportJob.EXPORT, old_location.url(), old_location.name + '.tar.gz', user
+    )
+    export_course.apply_async((job.id,), task_id=job.task_id)
+    return CourseImportExportJob.objects.get(id=job.id)
+
+
+def _export_status(job, location):
+    """
+    Returns the status of the export job of the course at location. These are:
+
+        0 : Queued
+        1 : Exporting the course
+        2 : Compressing the export
+        3 : Exported, in which case the url to download it from is returned as
+            ExportUrl
+
+    If the export failed, the integer is the stage it failed at, and the error
+    is returned as ErrMsg.
+    """
+    status = {
+        'JobId': job.id,
+        'ExportStatus': job.stage,
+        'StatusUrl': location.url_reverse('export_status', str(job.id)),
+    }
+    if job.state == CourseImportExportJob.SUCCESS:
+        status['ExportUrl'] = location.url_reverse('export') + '?_accept=application/x-tgz&job={0}'.format(job.id)
+    elif job.state == CourseImportExportJob.FAILURE:
+        status.update(job.get_output())
+        del status['status']
+    return status
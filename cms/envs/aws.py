@@ -95,6 +95,8 @@ if STATIC_URL_BASE:
         STATIC_URL += "/"
     STATIC_URL += git.revision + "/"
 
+STATIC_REPLACE_CACHE_SIZE = ENV_TOKENS.get('STATIC_REPLACE_CACHE_SIZE', STATIC_REPLACE_CACHE_SIZE)
+
 # GITHUB_REPO_ROOT is the base directory
 # for course data
 GITHUB_REPO_ROOT = ENV_TOKENS.get('GITHUB_REPO_ROOT', GITHUB_REPO_ROOT)
@@ -244,6 +244,10 @@ MESSAGE_STORAGE = 'django.contrib.messages.storage.session.SessionStorage'
 
 STATICFILES_STORAGE = 'pipeline.storage.PipelineCachedStorage'
 
+# How many rewritten texts, and how many staticfiles lookups, static_replace
+# keeps in each process.  0 turns its caches off.
+STATIC_REPLACE_CACHE_SIZE = 1000
+
 from rooted_paths import rooted_glob
 
 PIPELINE_CSS = {
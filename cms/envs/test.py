@@ -34,6 +34,9 @@ TEST_ROOT = path('test_root')
 # Want static files in the same dir for running on jenkins.
 STATIC_ROOT = TEST_ROOT / "staticfiles"
 
+# Tests replace the staticfiles storage, so don't remember its lookups
+STATIC_REPLACE_CACHE_SIZE = 0
+
 GITHUB_REPO_ROOT = TEST_ROOT / "data"
 COMMON_TEST_DATA_ROOT = COMMON_ROOT / "test" / "data"
 
@@ -0,0 +1,111 @@
+/**
+ * Course export-related js.
+ */
+define(
+    ["domReady", "jquery", "underscore", "gettext", "js/views/feedback_notification", "js/views/feedback_prompt"],
+    function(domReady, $, _, gettext, NotificationView, PromptView) {
+
+        "use strict";
+
+        /********** Private functions ************************************************/
+
+        /**
+         * Tell the user the export failed, with the error message of the server.
+         * @param {string} msg Error message to display.
+         */
+        var showError = function (msg) {
+            var message = "<p>" + gettext("There has been a failure to export your course to XML. It is recommended that you inspect your courseware to identify any components in error and try again.") + "</p>";
+            if (msg) {
+                message += "<p>" + gettext("The raw error message is:") + "</p>" + _.escape(msg);
+            }
+            var dialog = new PromptView.Error({
+                title: gettext('There has been an error with your export.'),
+                message: message,
+                actions: {
+                    primary: {
+                        text: gettext('Return to Export'),
+                        click: function(view) {
+                            view.hide();
+                        }
+                    }
+                }
+            });
+            dialog.show();
+        };
+
+        /**
+         * Check for export status updates every `timeout` milliseconds until the
+         * export has finished, then download it, or until it has failed.
+         * @param {object} status The status of the export job, as returned by the
+         *     server.
+         * @param {int} timeout Number of milliseconds to wait in between ajax calls
+         *     for new updates.
+         * @param {function} done Called once the export has finished or failed.
+         */
+        var getStatus = function (status, timeout, done) {
+            if (status.hasOwnProperty("ErrMsg")) {
+                done();
+                showError(status.ErrMsg);
+                return;
+            }
+            if (status.hasOwnProperty("ExportUrl")) {
+                done();
+                window.location = status.ExportUrl;
+                return;
+            }
+            setTimeout(function () {
+                $.getJSON(status.StatusUrl, function (data) {
+                    getStatus(data, timeout, done);
+                }).fail(function () {
+                    done();
+                    showError();
+                });
+            }, timeout);
+        };
+
+        /********** Public functions *************************************************/
+
+        var CourseExport = {
+
+            /**
+             * Start exporting the course in the background, and download the
+             * export once it has finished.
+             * @param {string} url The url to POST to for starting the export.
+             */
+            start: function (url) {
+                var exporting = new NotificationView.Mini({
+                    title: gettext('Exporting&hellip;')
+                });
+                var button = $('.action-export');
+                var done = function () {
+                    exporting.hide();
+                    button.removeClass('is-disabled');
+                };
+                exporting.show();
+                button.addClass('is-disabled');
+                $.ajax({
+                    url: url,
+                    type: 'POST',
+                    dataType: 'json',
+                    success: function (data) {
+                        getStatus(data, 1000, done);
+                    },
+                    error: function () {
+                        done();
+                        showError();
+                    }
+                });
+            }
+        };
+
+        domReady(function () {
+            $('.view-export .action-export').bind('click', function (e) {
+                e.preventDefault();
+                if (!$(this).hasClass('is-disabled')) {
+                    CourseExport.start($(this).data('start-url'));
+                }
+            });
+        });
+
+        return CourseExport;
+    });
@@ -1,5 +1,10 @@
+import calendar
+import re
+
+from django.conf import settings
 from django.http import (HttpResponse, HttpResponseNotModified,
     HttpResponseForbidden)
+from django.utils.http import http_date, parse_http_date_safe
 from student.models import CourseEnrollment
 
 from xmodule.contentstore.django import contentstore
@@ -8,6 +13,40 @@ from xmodule.modulestore import InvalidLocationError
 from cache_toolbox.core import get_cached_content, set_cached_content
 from xmodule.exceptions import NotFoundError
 
+# A single byte range, e.g. "bytes=0-499", "bytes=500-" or "bytes=-500"
+BYTE_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_byte_range(range_header, length):
+    """
+    Parse an HTTP Range header for content of `length` bytes.
+
+    Returns (first_byte, last_byte), both inclusive, or None if the header
+    should be ignored (it is malformed, or asks for several ranges), and
+    raises ValueError if the range can't be satisfied.
+    """
+    match = BYTE_RANGE_RE.match(range_header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # a suffix range: the last `last` bytes
+        suffix_length = int(last)
+        if suffix_length == 0:
+            raise ValueError(range_header)
+        return max(length - suffix_length, 0), length - 1
+
+    first_byte = int(first)
+    last_byte = int(last) if last else length - 1
+    if last_byte < first_byte:
+        return None
+    if first_byte >= length:
+        raise ValueError(range_header)
+    return first_byte, min(last_byte, length - 1)
+
 
 class StaticContentServer(object):
     def process_request(self, request):
@@ -33,7 +72,8 @@ class StaticContentServer(object):
                     return response
 
                 # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
-                # this is because I haven't been able to find a means to stream data out of memcached
+                # this is because I haven't been able to find a means to stream data out of memcached.
+                # Larger content is streamed out of the DB as it is sent.
                 if content.length is not None:
                     if content.length < 1048576:
                         # since we've queried as a stream, let's read in the stream into memory to set in cache
@@ -44,7 +84,8 @@ class StaticContentServer(object):
                 pass
 
             # Check that user has access to content
-            if getattr(content, "locked", False):
+            locked = getattr(content, "locked", False)
+            if locked:
                 if not hasattr(request, "user") or not request.user.is_authenticated():
                     return HttpResponseForbidden('Unauthorized')
                 course_partial_id = "/".join([loc.org, loc.course])
@@ -52,18 +93,72 @@ class StaticContentServer(object):
                         request.user, course_partial_id):
                     return HttpResponseForbidden('Unauthorized')
 
-            # convert over the DB persistent last modified timestamp to a HTTP compatible
-            # timestamp, so we can simply compare the strings
-            last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+            # convert over the DB persistent last modified timestamp to a HTTP compatible timestamp
+            last_modified_timestamp = calendar.timegm(content.last_modified_at.utctimetuple())
+            last_modified_at_str = http_date(last_modified_timestamp)
+            # the md5 of the stored content makes a strong validator
+            # getattr b/c caching may mean some pickled instances don't have attr
+            content_digest = getattr(content, 'content_digest', None)
+            etag = '"{0}"'.format(content_digest) if content_digest else None
 
             # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+            # validators, if they are the same then just return a 304 (Not Modified)
+            if etag is not None and 'HTTP_IF_NONE_MATCH' in request.META:
+                if_none_match = request.META['HTTP_IF_NONE_MATCH']
+                if if_none_match == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]:
+                    return self._not_modified(last_modified_at_str, etag, locked)
+            elif 'HTTP_IF_MODIFIED_SINCE' in request.META:
+                if_modified_since = parse_http_date_safe(request.META['HTTP_IF_MODIFIED_SINCE'])
+                if if_modified_since is not None and if_modified_since >= last_modified_timestamp:
+                    return self._not_modified(last_modified_at_str, etag, locked)
 
-            response = HttpResponse(content.stream_data(), content_type=content.content_type)
-            response['Last-Modified'] = last_modified_at_str
+            byte_range = None
+            if 'HTTP_RANGE' in request.META and content.length is not None:
+                # Only honor the range if the client's copy is still current
+                if_range = request.META.get('HTTP_IF_RANGE')
+                if if_range is None or if_range in (etag, last_modified_at_str):
+                    try:
+                        byte_range = parse_byte_range(request.META['HTTP_RANGE'], content.length)
+                    except ValueError:
+                        response = HttpResponse()
+                        response.status_code = 416
+                        response['Content-Range'] = 'bytes */{0}'.format(content.length)
+                        return response
 
+            if byte_range is not None:
+                first_byte, last_byte = byte_range
+                response = HttpResponse(
+                    content.stream_data_in_range(first_byte, last_byte), content_type=content.content_type
+                )
+                response.status_code = 206
+                response['Content-Range'] = 'bytes {0}-{1}/{2}'.format(first_byte, last_byte, content.length)
+                response['Content-Length'] = str(last_byte - first_byte + 1)
+            else:
+                response = HttpResponse(content.stream_data(), content_type=content.content_type)
+                if content.length is not None:
+                    response['Content-Length'] = str(content.length)
+
+            response['Accept-Ranges'] = 'bytes'
+            self._set_cache_headers(response, last_modified_at_str, etag, locked)
             return response
+
+    def _not_modified(self, last_modified_at_str, etag, locked):
+        """
+        Return a 304 (Not Modified) response with the same caching headers as a full one
+        """
+        response = HttpResponseNotModified()
+        self._set_cache_headers(response, last_modified_at_str, etag, locked)
+        return response
+
+    def _set_cache_headers(self, response, last_modified_at_str, etag, locked):
+        """
+        Add the validators and cache control headers for the content to response
+        """
+        response['Last-Modified'] = last_modified_at_str
+        if etag is not None:
+            response['ETag'] = etag
+
+        # Locked content must not be kept by shared caches. Content can be
+        # replaced under the same url, so by default clients revalidate it.
+        max_age = getattr(settings, 'STATIC_CONTENT_MAX_AGE', 0)
+        response['Cache-Control'] = '{0}, max-age={1}'.format('private' if locked else 'public', max_age)
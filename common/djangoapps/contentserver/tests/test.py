@@ -134,3 +134,37 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         resp = self.client.get(self.url_locked)
         self.assertEqual(resp.status_code, 200) #pylint: disable=E1103
 
+
+    def test_range_request(self):
+        """
+        Test that a byte range of an asset is served with a 206.
+        """
+        self.client.logout()
+        full = self.client.get(self.url_unlocked).content
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(resp.status_code, 206) #pylint: disable=E1103
+        self.assertEqual(resp.content, full[10:20]) #pylint: disable=E1103
+        self.assertEqual(resp['Content-Range'], 'bytes 10-19/{0}'.format(len(full)))
+
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=-5')
+        self.assertEqual(resp.content, full[-5:]) #pylint: disable=E1103
+
+    def test_unsatisfiable_range_request(self):
+        """
+        Test that a range starting past the end of an asset is rejected.
+        """
+        self.client.logout()
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=100000-')
+        self.assertEqual(resp.status_code, 416) #pylint: disable=E1103
+
+    def test_etag(self):
+        """
+        Test that an asset is not sent again if the client's ETag matches.
+        """
+        self.client.logout()
+        resp = self.client.get(self.url_unlocked)
+        self.assertIn('ETag', resp)
+        self.assertEqual(resp['Cache-Control'], 'public, max-age=0')
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, 304) #pylint: disable=E1103
@@ -73,6 +73,19 @@ class CourseModeModelTest(TestCase):
         self.assertEqual(mode2, CourseMode.mode_for_course(self.course_id, u'verified'))
         self.assertIsNone(CourseMode.mode_for_course(self.course_id, 'DNE'))
 
+    def test_all_modes_for_courses(self):
+        """
+        Finding the modes of several courses at once
+        """
+        mode = Mode(u'verified', u'Verified Certificate', 0, '', 'usd', None)
+        self.create_mode(mode.slug, mode.name)
+
+        modes = CourseMode.all_modes_for_courses([self.course_id, 'OtherCourse'])
+        self.assertEqual(modes, {
+            self.course_id: [mode],
+            'OtherCourse': [CourseMode.DEFAULT_MODE],
+        })
+
     def test_min_course_price_for_currency(self):
         """
         Get the min course price for a course according to currency
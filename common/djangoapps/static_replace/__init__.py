@@ -1,5 +1,8 @@
+import hashlib
 import logging
 import re
+import threading
+from collections import OrderedDict
 
 from staticfiles.storage import staticfiles_storage
 from staticfiles import finders
@@ -12,6 +15,133 @@ from xmodule.contentstore.content import StaticContent
 log = logging.getLogger(__name__)
 
 
+class _LRUCache(object):
+    """
+    A bounded, least recently used cache, shared by all of the threads of a
+    process.
+    """
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the value cached under key, or default
+        """
+        with self._lock:
+            if key not in self._entries:
+                return default
+            # Reinsert the entry to mark it as the most recently used
+            value = self._entries.pop(key)
+            self._entries[key] = value
+            return value
+
+    def set(self, key, value, size):
+        """
+        Cache value under key, keeping at most size entries
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Empty the cache
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+# Texts that have been rewritten, and the results of staticfiles lookups.
+# Neither changes while a process runs.
+_REWRITTEN_TEXTS = _LRUCache()
+_STATICFILES_LOOKUPS = _LRUCache()
+
+# The compiled regexes, by prefix.
+_URL_REPLACE_PATTERNS = {}
+
+
+def _cache_size():
+    """
+    How many rewritten texts and staticfiles lookups to keep in each cache.
+    Caching is off if this is 0.
+    """
+    return getattr(settings, 'STATIC_REPLACE_CACHE_SIZE', 0)
+
+
+def clear_caches():
+    """
+    Forget the rewritten texts and staticfiles lookups
+    """
+    _REWRITTEN_TEXTS.clear()
+    _STATICFILES_LOOKUPS.clear()
+
+
+def _cached_rewrite(rewrite, text, *args):
+    """
+    Return rewrite(text, *args), from the cache if possible.
+    """
+    size = _cache_size()
+    if not size:
+        return rewrite(text, *args)
+
+    if isinstance(text, unicode):
+        text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
+    else:
+        text_hash = hashlib.md5(text).hexdigest()
+    key = (rewrite.__name__, text_hash, type(text)) + args
+    rewritten = _REWRITTEN_TEXTS.get(key)
+    if rewritten is None:
+        rewritten = rewrite(text, *args)
+        _REWRITTEN_TEXTS.set(key, rewritten, size)
+    return rewritten
+
+
+def _memoized_lookup(kind, lookup, path):
+    """
+    Return lookup(path), a staticfiles_storage method, remembering the result.
+    Lookups that raise exceptions aren't remembered.
+    """
+    size = _cache_size()
+    if not size:
+        return lookup(path)
+
+    key = (kind, path)
+    missing = object()
+    result = _STATICFILES_LOOKUPS.get(key, missing)
+    if result is missing:
+        result = lookup(path)
+        _STATICFILES_LOOKUPS.set(key, result, size)
+    return result
+
+
+def _staticfiles_exists(path):
+    """
+    Return whether path is in staticfiles_storage
+    """
+    return _memoized_lookup('exists', staticfiles_storage.exists, path)
+
+
+def _staticfiles_url(path):
+    """
+    Return the url of path in staticfiles_storage
+    """
+    return _memoized_lookup('url', staticfiles_storage.url, path)
+
+
+def _url_replace_pattern(prefix):
+    """
+    Return the compiled _url_replace_regex(prefix)
+    """
+    pattern = _URL_REPLACE_PATTERNS.get(prefix)
+    if pattern is None:
+        pattern = re.compile(_url_replace_regex(prefix))
+        _URL_REPLACE_PATTERNS[prefix] = pattern
+    return pattern
+
+
 def _url_replace_regex(prefix):
     """
     Match static urls in quotes that don't end in '?raw'.
@@ -34,7 +164,7 @@ def try_staticfiles_lookup(path):
     a dead link instead of raising an exception.
     """
     try:
-        url = staticfiles_storage.url(path)
+        url = _staticfiles_url(path)
     except Exception as err:
         log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
             path, str(err)))
@@ -63,13 +193,19 @@ def replace_jump_to_id_urls(text, course_id, jump_to_id_base_url):
 
     output: <text> after the link rewriting rules are applied
     """
+    return _cached_rewrite(_replace_jump_to_id_urls, text, course_id, jump_to_id_base_url)
 
+
+def _replace_jump_to_id_urls(text, course_id, jump_to_id_base_url):  # pylint: disable=unused-argument
+    """
+    Uncached replace_jump_to_id_urls
+    """
     def replace_jump_to_id_url(match):
         quote = match.group('quote')
         rest = match.group('rest')
         return "".join([quote, jump_to_id_base_url + rest, quote])
 
-    return re.sub(_url_replace_regex('/jump_to_id/'), replace_jump_to_id_url, text)
+    return _url_replace_pattern('/jump_to_id/').sub(replace_jump_to_id_url, text)
 
 
 def replace_course_urls(text, course_id):
@@ -81,13 +217,19 @@ def replace_course_urls(text, course_id):
 
     returns: text with the links replaced
     """
+    return _cached_rewrite(_replace_course_urls, text, course_id)
 
+
+def _replace_course_urls(text, course_id):
+    """
+    Uncached replace_course_urls
+    """
     def replace_course_url(match):
         quote = match.group('quote')
         rest = match.group('rest')
         return "".join([quote, '/courses/' + course_id + '/', rest, quote])
 
-    return re.sub(_url_replace_regex('/course/'), replace_course_url, text)
+    return _url_replace_pattern('/course/').sub(replace_course_url, text)
 
 
 def replace_static_urls(text, data_directory, course_id=None, static_asset_path=''):
@@ -102,7 +244,13 @@ def replace_static_urls(text, data_directory, course_id=None, static_asset_path=
     course_id: The course identifier used to distinguish static content for this course in studio
     static_asset_path: Path for static assets, which overrides data_directory and course_namespace, if nonempty
     """
+    return _cached_rewrite(_replace_static_urls, text, data_directory, course_id, static_asset_path)
+
 
+def _replace_static_urls(text, data_directory, course_id, static_asset_path):
+    """
+    Uncached replace_static_urls
+    """
     def replace_static_url(match):
         original = match.group(0)
         prefix = match.group('prefix')
@@ -123,13 +271,13 @@ def replace_static_urls(text, data_directory, course_id=None, static_asset_path=
 
             exists_in_staticfiles_storage = False
             try:
-                exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
+                exists_in_staticfiles_storage = _staticfiles_exists(rest)
             except Exception as err:
                 log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
                     rest, str(err)))
 
             if exists_in_staticfiles_storage:
-                url = staticfiles_storage.url(rest)
+                url = _staticfiles_url(rest)
             else:
                 # if not, then assume it's courseware specific content and then look in the
                 # Mongo-backed database
@@ -139,10 +287,10 @@ def replace_static_urls(text, data_directory, course_id=None, static_asset_path=
             course_path = "/".join((static_asset_path or data_directory, rest))
 
             try:
-                if staticfiles_storage.exists(rest):
-                    url = staticfiles_storage.url(rest)
+                if _staticfiles_exists(rest):
+                    url = _staticfiles_url(rest)
                 else:
-                    url = staticfiles_storage.url(course_path)
+                    url = _staticfiles_url(course_path)
             # And if that fails, assume that it's course content, and add manually data directory
             except Exception as err:
                 log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
@@ -151,11 +299,7 @@ def replace_static_urls(text, data_directory, course_id=None, static_asset_path=
 
         return "".join([quote, url, quote])
 
-    return re.sub(
-        _url_replace_regex('(?:{static_url}|/static/)(?!{data_dir})'.format(
-            static_url=settings.STATIC_URL,
-            data_dir=static_asset_path or data_directory
-        )),
-        replace_static_url,
-        text
-    )
+    return _url_replace_pattern('(?:{static_url}|/static/)(?!{data_dir})'.format(
+        static_url=settings.STATIC_URL,
+        data_dir=static_asset_path or data_directory
+    )).sub(replace_static_url, text)
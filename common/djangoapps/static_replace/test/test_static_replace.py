@@ -2,7 +2,7 @@ import re
 
 from nose.tools import assert_equals, assert_true, assert_false  # pylint: disable=E0611
 from static_replace import (replace_static_urls, replace_course_urls,
-                            _url_replace_regex)
+                            _url_replace_regex, clear_caches)
 from mock import patch, Mock
 from xmodule.modulestore import Location
 from xmodule.modulestore.mongo import MongoModuleStore
@@ -69,6 +69,7 @@ def test_mongo_filestore(mock_modulestore, mock_static_content):
 @patch('static_replace.modulestore')
 @patch('static_replace.staticfiles_storage')
 def test_data_dir_fallback(mock_storage, mock_modulestore, mock_settings):
+    mock_settings.STATIC_REPLACE_CACHE_SIZE = 0
     mock_modulestore.return_value = Mock(XMLModuleStore)
     mock_storage.url.side_effect = Exception
 
@@ -122,3 +123,38 @@ def test_regex():
     for s in no:
         print 'Should not match: {0!r}'.format(s)
         assert_false(re.match(regex, s))
+
+
+@patch('static_replace.settings')
+@patch('static_replace.modulestore')
+@patch('static_replace.staticfiles_storage')
+def test_cached_rewrite(mock_storage, mock_modulestore, mock_settings):
+    """
+    Rewritten texts and staticfiles lookups are remembered
+    """
+    mock_settings.STATIC_REPLACE_CACHE_SIZE = 10
+    mock_settings.STATIC_URL = '/static/'
+    mock_settings.DEBUG = False
+    mock_modulestore.return_value = Mock(XMLModuleStore)
+    mock_storage.exists.return_value = True
+    mock_storage.url.return_value = '/static/file.abc123.png'
+    clear_caches()
+
+    text = STATIC_SOURCE + ' ' + STATIC_SOURCE
+    for _ in range(2):
+        assert_equals(
+            '"/static/file.abc123.png" "/static/file.abc123.png"',
+            replace_static_urls(text, DATA_DIRECTORY)
+        )
+    assert_equals(mock_storage.exists.call_count, 1)
+    assert_equals(mock_storage.url.call_count, 1)
+
+    # Other texts and data directories are rewritten, reusing the lookups
+    assert_equals('"/static/file.abc123.png"', replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY))
+    assert_equals('"/static/file.abc123.png"', replace_static_urls(STATIC_SOURCE, 'other_dir'))
+    assert_equals(mock_storage.exists.call_count, 1)
+
+    clear_caches()
+    replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY)
+    assert_equals(mock_storage.exists.call_count, 2)
+    clear_caches()
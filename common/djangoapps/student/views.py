@@ -46,7 +46,9 @@ from student.models import (
 from student.forms import PasswordResetFormNoActive
 
 from verify_student.models import SoftwareSecurePhotoVerification
-from certificates.models import CertificateStatuses, certificate_status_for_student
+from certificates.models import (
+    CertificateStatuses, certificate_status_for_student, certificate_statuses_for_student
+)
 
 from xmodule.course_module import CourseDescriptor
 from xmodule.modulestore.exceptions import ItemNotFoundError
@@ -156,7 +158,7 @@ def process_survey_link(survey_link, user):
     return survey_link.format(UNIQUE_ID=unique_id_for_user(user))
 
 
-def cert_info(user, course):
+def cert_info(user, course, cert_status=None):
     """
     Get the certificate info needed to render the dashboard section for the given
     student and course.  Returns a dictionary with keys:
@@ -168,11 +170,15 @@ def cert_info(user, course):
     'show_survey_button': bool
     'survey_url': url, only if show_survey_button is True
     'grade': if status is not 'processing'
+
+    cert_status, if given, is the user's certificate_status_for_student for the course
     """
     if not course.has_ended():
         return {}
 
-    return _cert_info(user, course, certificate_status_for_student(user, course.id))
+    if cert_status is None:
+        cert_status = certificate_status_for_student(user, course.id)
+    return _cert_info(user, course, cert_status)
 
 
 def _cert_info(user, course, cert_status):
@@ -279,7 +285,7 @@ def register_user(request, extra_context=None):
     return render_to_response('register.html', context)
 
 
-def complete_course_mode_info(course_id, enrollment):
+def complete_course_mode_info(course_id, enrollment, modes=None):
     """
     We would like to compute some more information from the given course modes
     and the user's current enrollment
@@ -287,8 +293,11 @@ def complete_course_mode_info(course_id, enrollment):
     Returns the given information:
         - whether to show the course upsell information
         - numbers of days until they can't upsell anymore
+
+    modes, if given, is the CourseMode.modes_for_course_dict of the course
     """
-    modes = CourseMode.modes_for_course_dict(course_id)
+    if modes is None:
+        modes = CourseMode.modes_for_course_dict(course_id)
     mode_info = {'show_upsell': False, 'days_for_upsell': None}
     # we want to know if the user is already verified and if verified is an
     # option
@@ -310,13 +319,16 @@ def dashboard(request):
     # Build our (course, enrollment) list for the user, but ignore any courses that no
     # longer exist (because the course IDs have changed). Still, we don't delete those
     # enrollments, because it could have been a data push snafu.
+    enrollments = list(CourseEnrollment.enrollments_for_user(user))
+    courses = modulestore().get_courses_for_ids([enrollment.course_id for enrollment in enrollments])
     course_enrollment_pairs = []
-    for enrollment in CourseEnrollment.enrollments_for_user(user):
-        try:
-            course_enrollment_pairs.append((course_from_id(enrollment.course_id), enrollment))
-        except ItemNotFoundError:
+    for enrollment in enrollments:
+        if enrollment.course_id in courses:
+            course_enrollment_pairs.append((courses[enrollment.course_id], enrollment))
+        else:
             log.error("User {0} enrolled in non-existent course {1}"
                       .format(user.username, enrollment.course_id))
+    course_ids = [course.id for course, _enrollment in course_enrollment_pairs]
 
     course_optouts = Optout.objects.filter(user=user).values_list('course_id', flat=True)
 
@@ -335,23 +347,40 @@ def dashboard(request):
     show_courseware_links_for = frozenset(course.id for course, _enrollment in course_enrollment_pairs
                                           if has_access(request.user, course, 'load'))
 
-    course_modes = {course.id: complete_course_mode_info(course.id, enrollment) for course, enrollment in course_enrollment_pairs}
-    cert_statuses = {course.id: cert_info(request.user, course) for course, _enrollment in course_enrollment_pairs}
+    # Fetch the modes and certificates of all the courses at once rather than course by course
+    all_modes = dict(
+        (course_id, {mode.slug: mode for mode in modes})
+        for course_id, modes in CourseMode.all_modes_for_courses(course_ids).items()
+    )
+    course_modes = {
+        course.id: complete_course_mode_info(course.id, enrollment, all_modes[course.id])
+        for course, enrollment in course_enrollment_pairs
+    }
+    user_cert_statuses = certificate_statuses_for_student(
+        user, [course.id for course, _enrollment in course_enrollment_pairs if course.has_ended()]
+    )
+    cert_statuses = {
+        course.id: cert_info(request.user, course, user_cert_statuses.get(course.id))
+        for course, _enrollment in course_enrollment_pairs
+    }
 
     # only show email settings for Mongo course and when bulk email is turned on
-    show_email_settings_for = frozenset(
-        course.id for course, _enrollment in course_enrollment_pairs if (
-            settings.FEATURES['ENABLE_INSTRUCTOR_EMAIL'] and
-            modulestore().get_modulestore_type(course.id) == MONGO_MODULESTORE_TYPE and
-            CourseAuthorization.instructor_email_enabled(course.id)
+    show_email_settings_for = frozenset()
+    if settings.FEATURES['ENABLE_INSTRUCTOR_EMAIL']:
+        email_enabled_courses = CourseAuthorization.instructor_email_enabled_courses(course_ids)
+        show_email_settings_for = frozenset(
+            course.id for course, _enrollment in course_enrollment_pairs if (
+                modulestore().get_modulestore_type(course.id) == MONGO_MODULESTORE_TYPE and
+                course.id in email_enabled_courses
+            )
         )
-    )
 
     # Verification Attempts
     verification_status, verification_msg = SoftwareSecurePhotoVerification.user_status(user)
 
+    # equivalent to enrollment.refundable(), without a query per course
     show_refund_option_for = frozenset(course.id for course, _enrollment in course_enrollment_pairs
-                                       if _enrollment.refundable())
+                                       if 'verified' in all_modes[course.id])
 
     # get info w.r.t ExternalAuthMap
     external_auth_map = None
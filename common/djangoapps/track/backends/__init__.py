@@ -26,3 +26,8 @@ class BaseBackend(object):
     def send(self, event):
         """Send event to tracker."""
         pass
+
+    def send_batch(self, events):
+        """Send several events to tracker."""
+        for event in events:
+            self.send(event)
@@ -2,17 +2,24 @@
 
 from __future__ import absolute_import
 
+import datetime
 import logging
+from collections import defaultdict
 
 import pymongo
 from pymongo import MongoClient
 from pymongo.errors import PyMongoError
+from pytz import UTC
 
 from track.backends import BaseBackend
 
 
 log = logging.getLogger(__name__)
 
+# The index on the time of the events, which expires them if
+# `expire_after` is set
+TIME_INDEX = [('time', pymongo.DESCENDING)]
+
 
 class MongoBackend(BaseBackend):
     """Class for a MongoDB event tracker Backend"""
@@ -30,6 +37,16 @@ class MongoBackend(BaseBackend):
           - `database`: name of the database
           - `collection`: name of the collection
           - `extra`: parameters to pymongo.MongoClient not listed above
+          - `partition`: 'daily' to insert the events of each day in
+            their own collection, named after `collection` and the
+            day, e.g. events_20131031
+          - `expire_after`: seconds after which events are deleted by
+            a TTL index on their time. An existing index on time is
+            converted by the create_tracking_indexes command.
+          - `create_indexes`: whether to create the indexes when
+            connecting, or when a new daily collection is first used.
+            Set this to False and run the create_tracking_indexes
+            command instead to avoid locking a large collection.
 
         """
 
@@ -69,29 +86,172 @@ class MongoBackend(BaseBackend):
         if user or password:
             database.authenticate(user, password)
 
+        self.database = database
+        self.collection_name = collection_name
         self.collection = database[collection_name]
 
-        self._create_indexes()
+        self.partition = kwargs.get('partition')
+        if self.partition not in (None, 'daily'):
+            raise ValueError('Invalid partition %s' % self.partition)
+        self.expire_after = kwargs.get('expire_after')
+        self.auto_create_indexes = kwargs.get('create_indexes', True)
+
+        # The daily collections whose indexes have been created
+        self._indexed = set()
+
+        if self.auto_create_indexes and not self.partition:
+            self.create_indexes(self.collection)
+
+    def create_indexes(self, collection, background=True, convert=False):
+        """
+        Ensures the proper fields of collection are indexed.
+
+        MongoDB doesn't change the options of an existing index, so if
+        the index on time doesn't expire events after `expire_after`,
+        it is converted if `convert` is set, and a ValueError is raised
+        otherwise.
+        """
+        # Unless the indexes are built in the background, the
+        # collection will be locked during their creation. If the
+        # collection has a large number of documents in it, that can
+        # take a long time.
+        time_options = self._time_index_options()
+        existing = self._time_index(collection)
+        if existing is not None and existing[1].get('expireAfterSeconds') != time_options.get('expireAfterSeconds'):
+            if not convert:
+                raise ValueError(
+                    'The time index of {0} expires events after {1} seconds instead of {2}; run the '
+                    'create_tracking_indexes command to convert it'.format(
+                        collection.full_name,
+                        existing[1].get('expireAfterSeconds'),
+                        time_options.get('expireAfterSeconds'),
+                    )
+                )
+            self._convert_time_index(collection, existing, background)
+        else:
+            collection.ensure_index(TIME_INDEX, background=background, **time_options)
+        collection.ensure_index('event_type', background=background)
+        # For the events of a course
+        collection.ensure_index(
+            [('context.course_id', pymongo.ASCENDING), ('time', pymongo.DESCENDING)],
+            background=background
+        )
+
+    def _time_index_options(self):
+        """The options of the index on time"""
+        if self.expire_after:
+            return {'expireAfterSeconds': self.expire_after}
+        return {}
+
+    def _time_index(self, collection):
+        """The (name, information) of the index on time of collection, or None"""
+        for name, info in collection.index_information().iteritems():
+            if [tuple(key) for key in info['key']] == TIME_INDEX:
+                return name, info
+        return None
+
+    def _convert_time_index(self, collection, existing, background):
+        """
+        Make the existing (name, information) index on time of
+        collection expire events after `expire_after`
+        """
+        name, info = existing
+        if self.expire_after and 'expireAfterSeconds' in info:
+            # The expiry of a TTL index can be changed in place
+            collection.database.command(
+                'collMod', collection.name,
+                index={'keyPattern': dict(TIME_INDEX), 'expireAfterSeconds': self.expire_after}
+            )
+            return
+
+        # Otherwise the index has to be built again, during which
+        # queries on time can't use it.
+        log.warning('Rebuilding the time index of %s', collection.full_name)
+        collection.drop_index(name)
+        collection.ensure_index(TIME_INDEX, background=background, **self._time_index_options())
+
+    def create_all_indexes(self, background=True, days_ahead=1, convert=False):
+        """
+        Ensures the proper fields are indexed in the collection, or in
+        the existing daily collections and those of the next
+        `days_ahead` days, converting their time indexes if `convert`
+        is set (see create_indexes). Returns the names of the
+        collections.
+        """
+        if not self.partition:
+            names = [self.collection_name]
+        else:
+            prefix = self.collection_name + '_'
+            names = set(
+                name for name in self.database.collection_names()
+                if name.startswith(prefix)
+            )
+            today = datetime.datetime.now(UTC).date()
+            for days in range(days_ahead + 1):
+                names.add(self._partition_name(today + datetime.timedelta(days=days)))
+            names = sorted(names)
+
+        for name in names:
+            self.create_indexes(self.database[name], background=background, convert=convert)
+        return names
+
+    def _partition_name(self, day):
+        """The name of the collection of the events of day"""
+        return '{0}_{1:%Y%m%d}'.format(self.collection_name, day)
+
+    def _collection_name_for(self, event):
+        """The name of the collection to insert event in to"""
+        if not self.partition:
+            return self.collection_name
 
-    def _create_indexes(self):
-        """Ensures the proper fields are indexed"""
-        # WARNING: The collection will be locked during the index
-        # creation. If the collection has a large number of
-        # documents in it, the operation can take a long time.
+        time = event.get('time')
+        if not isinstance(time, datetime.datetime):
+            time = datetime.datetime.now(UTC)
+        elif time.tzinfo is not None:
+            time = time.astimezone(UTC)
+        return self._partition_name(time.date())
 
-        # TODO: The creation of indexes can be moved to a Django
-        # management command or equivalent. There is also an option to
-        # run the indexing on the background, without locking.
-        self.collection.ensure_index([('time', pymongo.DESCENDING)])
-        self.collection.ensure_index('event_type')
+    def _get_collection(self, name):
+        """The collection called name, with its indexes"""
+        if not self.partition:
+            return self.collection
+
+        collection = self.database[name]
+        if self.auto_create_indexes and name not in self._indexed:
+            # A new day's collection is empty, so this is quick.
+            self.create_indexes(collection)
+            self._indexed.add(name)
+        return collection
 
     def send(self, event):
         """Insert the event in to the Mongo collection"""
         try:
-            self.collection.insert(event, manipulate=False)
+            collection = self._get_collection(self._collection_name_for(event))
+            collection.insert(event, manipulate=False)
         except PyMongoError:
             # The event will be lost in case of a connection error.
             # pymongo will re-connect/re-authenticate automatically
             # during the next event.
             msg = 'Error inserting to MongoDB event tracker backend'
             log.exception(msg)
+
+    def send_batch(self, events):
+        """
+        Insert the events in to each Mongo collection at once.
+
+        Unlike `send`, errors are raised, so that the caller can count
+        the events as lost. Raises the first PyMongoError once the
+        other collections' events have been inserted.
+        """
+        batches = defaultdict(list)
+        for event in events:
+            batches[self._collection_name_for(event)].append(event)
+
+        error = None
+        for name, batch in batches.iteritems():
+            try:
+                self._get_collection(name).insert(batch, manipulate=False)
+            except PyMongoError as exc:
+                error = error or exc
+        if error is not None:
+            raise error
@@ -0,0 +1,152 @@
+"""
+Event tracker backend that hands events to another backend in the
+background.
+
+Events are put in a bounded in-process queue, which a thread drains,
+passing them to the wrapped backend in batches. Sending an event never
+waits for the backend, so a slow tracking database doesn't slow down
+requests. When the queue is full, events wait up to `put_timeout`
+seconds for room, then are dropped. Configure it around another
+backend::
+
+  TRACKING_BACKENDS = {
+      'mongo': {
+          'ENGINE': 'track.backends.queued.QueuedBackend',
+          'OPTIONS': {
+              'backend': {
+                  'ENGINE': 'track.backends.mongodb.MongoBackend',
+                  'OPTIONS': {...}
+              },
+              'max_queue_size': 10000,
+              'batch_size': 100,
+          }
+      }
+  }
+
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import logging
+import os
+import threading
+import weakref
+from Queue import Queue, Empty, Full
+
+from dogapi import dog_stats_api
+
+from track.backends import BaseBackend
+
+
+log = logging.getLogger(__name__)
+
+# The QueuedBackends whose events are sent when the process exits
+_BACKENDS = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all():
+    """Send the events still queued in every QueuedBackend"""
+    for backend in list(_BACKENDS):
+        backend.flush()
+
+
+class QueuedBackend(BaseBackend):
+    """Event tracker backend that sends events in a background thread"""
+
+    def __init__(self, backend, max_queue_size=10000, batch_size=100, put_timeout=0, **kwargs):
+        """
+        Wrap another backend.
+
+        :Parameters:
+
+          - `backend`: the backend to send the events to, a dict with
+            its 'ENGINE' and 'OPTIONS' like in TRACKING_BACKENDS
+          - `max_queue_size`: the number of events that can be waiting
+          - `batch_size`: the largest number of events sent at once
+          - `put_timeout`: seconds to wait for room in a full queue
+            before dropping an event
+
+        """
+        super(QueuedBackend, self).__init__(**kwargs)
+
+        # Imported here, since the tracker imports the backends.
+        from track.tracker import _instantiate_backend_from_name  # pylint: disable=protected-access
+        self.backend = _instantiate_backend_from_name(backend['ENGINE'], backend.get('OPTIONS', {}))
+
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.queue = Queue(max_queue_size)
+        self.stats = {'sent': 0, 'dropped': 0, 'failed': 0}
+
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+        _BACKENDS.add(self)
+
+    def send(self, event):
+        """Queue the event, or drop it if the queue stays full"""
+        self._start_worker()
+        try:
+            if self.put_timeout:
+                self.queue.put(event, timeout=self.put_timeout)
+            else:
+                self.queue.put_nowait(event)
+        except Full:
+            with self._lock:
+                self.stats['dropped'] += 1
+            dog_stats_api.increment('track.queued.dropped')
+
+    def flush(self):
+        """Send the queued events now, in this thread"""
+        while self._send_batch(block=False):
+            pass
+
+    def _start_worker(self):
+        """Start the thread draining the queue, unless it is running"""
+        # A forked process doesn't get the thread of its parent.
+        if self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._run, name='track.backends.queued')
+            self._worker.daemon = True
+            self._worker.start()
+            self._worker_pid = os.getpid()
+
+    def _run(self):
+        """Send events as they are queued"""
+        while True:
+            self._send_batch(block=True)
+
+    def _send_batch(self, block):
+        """
+        Send up to `batch_size` queued events to the backend, waiting for
+        the first one if `block`. Returns the number of events taken.
+        """
+        try:
+            events = [self.queue.get(block)]
+        except Empty:
+            return 0
+        while len(events) < self.batch_size:
+            try:
+                events.append(self.queue.get_nowait())
+            except Empty:
+                break
+
+        # Backends raise when the events couldn't be sent, which are
+        # then lost
+        try:
+            self.backend.send_batch(events)
+            outcome = 'sent'
+        except Exception:  # pylint: disable=broad-except
+            log.exception('Error sending events to the queued event tracker backend')
+            outcome = 'failed'
+
+        with self._lock:
+            self.stats[outcome] += len(events)
+        dog_stats_api.increment('track.queued.{0}'.format(outcome), len(events))
+        return len(events)
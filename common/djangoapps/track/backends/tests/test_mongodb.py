@@ -1,8 +1,11 @@
 from __future__ import absolute_import
 
+import datetime
 from uuid import uuid4
 
 from mock import patch
+from pymongo.errors import PyMongoError
+from pytz import UTC
 
 from django.test import TestCase
 
@@ -38,3 +41,83 @@ class TestMongoBackend(TestCase):
 
         self.assertEqual(events[0], first_argument(calls[0]))
         self.assertEqual(events[1], first_argument(calls[1]))
+
+    def test_mongo_backend_batch(self):
+        events = [{'test': 1}, {'test': 2}]
+
+        self.backend.send_batch(events)
+
+        # The events are inserted with a single call
+        self.backend.collection.insert.assert_called_once_with(events, manipulate=False)
+
+    def test_mongo_backend_batch_error(self):
+        # The error is raised, for QueuedBackend to count the events as failed
+        self.backend.collection.insert.side_effect = PyMongoError()
+        with self.assertRaises(PyMongoError):
+            self.backend.send_batch([{'test': 1}])
+
+    def test_indexes(self):
+        collection = self.backend.collection
+        self.assertEqual(collection.ensure_index.call_count, 3)
+        collection.ensure_index.assert_any_call(
+            [('context.course_id', 1), ('time', -1)], background=True
+        )
+
+    def test_no_indexes(self):
+        backend = MongoBackend(create_indexes=False, expire_after=3600)
+        backend.collection.ensure_index.reset_mock()
+
+        backend.create_indexes(backend.collection, background=False)
+        backend.collection.ensure_index.assert_any_call(
+            [('time', -1)], background=False, expireAfterSeconds=3600
+        )
+
+    def test_time_index_mismatch(self):
+        backend = MongoBackend(create_indexes=False, expire_after=3600)
+        backend.collection.index_information.return_value = {
+            'time_-1': {'key': [('time', -1)], 'v': 1},
+        }
+        with self.assertRaisesRegexp(ValueError, 'create_tracking_indexes'):
+            backend.create_indexes(backend.collection)
+
+    def test_convert_time_index(self):
+        backend = MongoBackend(create_indexes=False, expire_after=3600)
+        collection = backend.collection
+        collection.index_information.return_value = {
+            'time_-1': {'key': [('time', -1)], 'v': 1},
+        }
+        backend.create_indexes(collection, convert=True)
+        collection.drop_index.assert_called_once_with('time_-1')
+        collection.ensure_index.assert_any_call([('time', -1)], background=True, expireAfterSeconds=3600)
+
+    def test_change_time_index_expiry(self):
+        backend = MongoBackend(create_indexes=False, expire_after=3600)
+        collection = backend.collection
+        collection.index_information.return_value = {
+            'time_-1': {'key': [('time', -1)], 'v': 1, 'expireAfterSeconds': 60},
+        }
+        backend.create_indexes(collection, convert=True)
+        collection.database.command.assert_called_once_with(
+            'collMod', collection.name, index={'keyPattern': {'time': -1}, 'expireAfterSeconds': 3600}
+        )
+        self.assertFalse(collection.drop_index.called)
+
+    def test_daily_partitions(self):
+        backend = MongoBackend(partition='daily')
+        database = backend.database
+        events = [
+            {'test': 1, 'time': datetime.datetime(2013, 10, 31, 23, 59, tzinfo=UTC)},
+            {'test': 2, 'time': datetime.datetime(2013, 11, 1, 0, 1, tzinfo=UTC)},
+            {'test': 3, 'time': datetime.datetime(2013, 11, 1, 0, 2, tzinfo=UTC)},
+        ]
+
+        backend.send(events[0])
+        backend.send_batch(events[1:])
+
+        database.__getitem__.assert_any_call('events_20131031')
+        database.__getitem__.assert_any_call('events_20131101')
+        # One insert for the event and one for the day of the batch
+        insert_calls = database.__getitem__.return_value.insert.mock_calls
+        self.assertEqual(len(insert_calls), 2)
+        self.assertEqual(insert_calls[1][1][0], events[1:])
+        self.assertEqual(backend._indexed, set(['events_20131031', 'events_20131101']))
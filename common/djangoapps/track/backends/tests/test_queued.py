@@ -0,0 +1,96 @@
+from __future__ import absolute_import
+
+import gc
+import threading
+import weakref
+
+from mock import patch
+
+from django.test import TestCase
+
+from track.backends import BaseBackend
+from track.backends.queued import QueuedBackend, _flush_all
+
+
+BATCHING_BACKEND = {
+    'ENGINE': 'track.backends.tests.test_queued.BatchingBackend',
+}
+
+
+class TestQueuedBackend(TestCase):
+    def setUp(self):
+        # Drain the queue with flush() rather than in the background
+        self.worker_patcher = patch.object(QueuedBackend, '_start_worker')
+        self.addCleanup(self.worker_patcher.stop)
+        self.worker_patcher.start()
+
+    def test_batches(self):
+        backend = QueuedBackend(backend=BATCHING_BACKEND, batch_size=2)
+        for i in xrange(5):
+            backend.send({'test': i})
+
+        self.assertEqual(backend.backend.batches, [])
+        backend.flush()
+
+        self.assertEqual(
+            backend.backend.batches,
+            [[{'test': 0}, {'test': 1}], [{'test': 2}, {'test': 3}], [{'test': 4}]]
+        )
+        self.assertEqual(backend.stats['sent'], 5)
+
+    def test_full_queue(self):
+        backend = QueuedBackend(backend=BATCHING_BACKEND, max_queue_size=2)
+        for i in xrange(5):
+            backend.send({'test': i})
+        backend.flush()
+
+        self.assertEqual(backend.backend.batches, [[{'test': 0}, {'test': 1}]])
+        self.assertEqual(backend.stats['dropped'], 3)
+
+    def test_failure(self):
+        backend = QueuedBackend(backend=BATCHING_BACKEND)
+        backend.backend.fail = True
+        backend.send({'test': 1})
+        backend.flush()
+
+        self.assertEqual(backend.stats['failed'], 1)
+        self.assertEqual(backend.stats['sent'], 0)
+
+
+    def test_flush_at_exit(self):
+        backend = QueuedBackend(backend=BATCHING_BACKEND)
+        backend.send({'test': 1})
+        _flush_all()
+        self.assertEqual(backend.backend.batches, [[{'test': 1}]])
+
+    def test_not_kept_alive(self):
+        backend = weakref.ref(QueuedBackend(backend=BATCHING_BACKEND))
+        gc.collect()
+        self.assertIsNone(backend())
+
+
+class TestQueuedBackendWorker(TestCase):
+    def test_worker(self):
+        backend = QueuedBackend(backend=BATCHING_BACKEND)
+        backend.send({'test': 1})
+
+        # The event is sent in the background
+        self.assertTrue(backend.backend.sent.wait(5))
+        self.assertEqual(backend.backend.batches, [[{'test': 1}]])
+
+
+class BatchingBackend(BaseBackend):
+    def __init__(self, **options):
+        super(BatchingBackend, self).__init__(**options)
+        self.batches = []
+        self.fail = False
+        self.sent = threading.Event()
+
+    def send(self, event):
+        self.send_batch([event])
+
+    def send_batch(self, events):
+        if self.fail:
+            raise Exception('Failed')
+        self.batches.append(events)
+        self.sent.set()
@@ -0,0 +1,81 @@
+"""
+A Django command that measures how many events per second an event tracker
+backend in TRACKING_BACKENDS can take.
+
+It sends --events synthetic events to the backend, --batch-size at a time,
+and reports the rate. Queued backends are flushed before the time is taken,
+so the rate is that of the backend they wrap. The events are really sent:
+point the backend at a scratch database.
+"""
+
+import datetime
+import time
+from optparse import make_option
+from textwrap import dedent
+
+from django.core.management.base import BaseCommand, CommandError
+from pytz import UTC
+
+from track import tracker
+
+
+class Command(BaseCommand):
+    """
+    Measure the insert throughput of an event tracker backend.
+    """
+    args = "<backend_name>"
+    help = dedent(__doc__).strip()
+    option_list = BaseCommand.option_list + (
+        make_option('--events',
+                    action='store',
+                    type='int',
+                    default=10000,
+                    help='How many events to send'),
+        make_option('--batch-size',
+                    action='store',
+                    type='int',
+                    default=1,
+                    help='How many events to send at once'),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("backend_name not specified")
+        try:
+            backend = tracker.backends[args[0]]
+        except KeyError:
+            raise CommandError("Unknown event tracker backend {0}".format(args[0]))
+
+        num_events = options['events']
+        batch_size = max(options['batch_size'], 1)
+        events = [self._make_event(i) for i in xrange(num_events)]
+
+        start = time.time()
+        for i in xrange(0, num_events, batch_size):
+            batch = events[i:i + batch_size]
+            if batch_size == 1:
+                backend.send(batch[0])
+            else:
+                backend.send_batch(batch)
+        if hasattr(backend, 'flush'):
+            backend.flush()
+        elapsed = time.time() - start
+
+        self.stdout.write("Sent {0} events in {1:.2f}s: {2:.0f} events/s\n".format(
+            num_events, elapsed, num_events / elapsed if elapsed else float('inf')
+        ))
+
+    def _make_event(self, i):
+        """An event like those of the courseware"""
+        return {
+            "username": "benchmark{0}".format(i % 100),
+            "ip": "127.0.0.1",
+            "event_source": "server",
+            "event_type": "benchmark_tracking_backend",
+            "event": {"i": i},
+            "agent": "benchmark",
+            "page": None,
+            "time": datetime.datetime.now(UTC),
+            "host": "localhost",
+            "context": {"course_id": "edX/Benchmark/{0}".format(i % 10), "org_id": "edX"},
+        }
@@ -0,0 +1,60 @@
+"""
+A Django command that creates the indexes of the MongoDB event tracker
+backends in TRACKING_BACKENDS.
+
+The indexes are built in the background, so the collections stay usable
+while they are built. For backends with daily collections, the indexes of
+the existing collections and of the next --days-ahead days' are created. Run
+it when the backends are configured with 'create_indexes': False, e.g. daily
+from cron.
+
+Existing indexes on the time of the events are converted to expire them
+after the backends' 'expire_after' seconds, or to no longer expire them.
+Changing how long a TTL index keeps events is quick, but turning an index
+into a TTL index, or back, rebuilds it.
+"""
+
+from optparse import make_option
+from textwrap import dedent
+
+from django.core.management.base import BaseCommand, CommandError
+
+from track import tracker
+from track.backends.mongodb import MongoBackend
+
+
+class Command(BaseCommand):
+    """
+    Create the indexes of the MongoDB event tracker backends.
+    """
+    help = dedent(__doc__).strip()
+    option_list = BaseCommand.option_list + (
+        make_option('--days-ahead',
+                    action='store',
+                    type='int',
+                    default=1,
+                    help='How many days ahead to create the daily collections\' indexes for'),
+        make_option('--foreground',
+                    action='store_true',
+                    default=False,
+                    help='Build the indexes in the foreground, which is faster but locks the collections'),
+    )
+
+    def handle(self, *args, **options):
+        backends = []
+        for name, backend in tracker.backends.iteritems():
+            # Unwrap the backends of queued backends
+            backend = getattr(backend, 'backend', backend)
+            if isinstance(backend, MongoBackend):
+                backends.append((name, backend))
+
+        if not backends:
+            raise CommandError("No MongoDB event tracker backends are configured")
+
+        for name, backend in backends:
+            collections = backend.create_all_indexes(
+                background=not options['foreground'],
+                days_ahead=options['days_ahead'],
+                convert=True,
+            )
+            self.stdout.write("Indexed {0}: {1}\n".format(name, ", ".join(collections)))
@@ -7,10 +7,12 @@ Uses pyparsing to parse. Main function as of now is evaluator().
 import math
 import operator
 import numbers
+import threading
 import numpy
 import scipy.constants
 import functions
 
+from collections import OrderedDict
 from pyparsing import (
     Word, Literal, CaselessLiteral, ZeroOrMore, MatchFirst, Optional, Forward,
     Group, ParseResults, stringEnd, Suppress, Combine, alphas, nums, alphanums
@@ -72,6 +74,13 @@ SUFFIXES = {
     'c': 1e-2, 'm': 1e-3, 'u': 1e-6, 'n': 1e-9, 'p': 1e-12
 }
 
+# Evaluated values are numbers, or arrays of numbers (one per sample) when
+# evaluating many samples at once.
+VALUE_TYPES = (numbers.Number, numpy.ndarray)
+
+# How many parsed expressions to keep around for reuse.
+PARSE_CACHE_SIZE = 1000
+
 
 class UndefinedVariable(Exception):
     """
@@ -122,7 +131,7 @@ def eval_atom(parse_result):
     In the case of parenthesis, ignore them.
     """
     # Find first number in the list
-    result = next(k for k in parse_result if isinstance(k, numbers.Number))
+    result = next(k for k in parse_result if isinstance(k, VALUE_TYPES))
     return result
 
 
@@ -136,7 +145,7 @@ def eval_power(parse_result):
     # `reduce` will go from left to right; reverse the list.
     parse_result = reversed(
         [k for k in parse_result
-         if isinstance(k, numbers.Number)]  # Ignore the '^' marks.
+         if isinstance(k, VALUE_TYPES)]  # Ignore the '^' marks.
     )
     # Having reversed it, raise `b` to the power of `a`.
     power = reduce(lambda a, b: b ** a, parse_result)
@@ -158,7 +167,7 @@ def eval_parallel(parse_result):
     if 0 in parse_result:
         return float('nan')
     reciprocals = [1. / e for e in parse_result
-                   if isinstance(e, numbers.Number)]
+                   if isinstance(e, VALUE_TYPES)]
     return 1. / sum(reciprocals)
 
 
@@ -173,12 +182,12 @@ def eval_sum(parse_result):
     total = 0.0
     current_op = operator.add
     for token in parse_result:
-        if token == '+':
+        if isinstance(token, VALUE_TYPES):
+            total = current_op(total, token)
+        elif token == '+':
             current_op = operator.add
         elif token == '-':
             current_op = operator.sub
-        else:
-            total = current_op(total, token)
     return total
 
 
@@ -191,12 +200,12 @@ def eval_product(parse_result):
     prod = 1.0
     current_op = operator.mul
     for token in parse_result:
-        if token == '*':
+        if isinstance(token, VALUE_TYPES):
+            prod = current_op(prod, token)
+        elif token == '*':
             current_op = operator.mul
         elif token == '/':
             current_op = operator.truediv
-        else:
-            prod = current_op(prod, token)
     return prod
 
 
@@ -229,8 +238,7 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
         return float('nan')
 
     # Parse the tree.
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
+    math_interpreter = parse_expression(math_expr, case_sensitive)
 
     # Get our variables together.
     all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
@@ -238,13 +246,92 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     # ...and check them
     math_interpreter.check_variables(all_variables, all_functions)
 
+    return math_interpreter.reduce_tree(
+        evaluate_actions(all_variables, all_functions, case_sensitive)
+    )
+
+
+def evaluate_samples(variables_list, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression for each of a list of variable dictionaries.
+
+    Return a list of the values `evaluator` would give for each of them, and
+    raise what `evaluator` would raise for the first sample it fails on.
+
+    The expression is parsed once, and evaluated for all of the samples
+    together on arrays of their values. If that fails (e.g. a sample divides
+    by zero, or uses a function that doesn't take arrays, like `fact`), fall
+    back to evaluating the samples one by one.
+    """
+    if math_expr.strip() == "":
+        return [float('nan')] * len(variables_list)
+
+    math_interpreter = parse_expression(math_expr, case_sensitive)
+
+    sample_variables = stack_samples(variables_list)
+    if sample_variables is not None:
+        all_variables, all_functions = add_defaults(sample_variables, functions, case_sensitive)
+        math_interpreter.check_variables(all_variables, all_functions)
+        actions = evaluate_actions(all_variables, all_functions, case_sensitive)
+        try:
+            # Errors must not turn into nan/inf values that only some of the
+            # samples would have had.
+            with numpy.errstate(divide='raise', over='raise', invalid='raise'):
+                result = numpy.asarray(math_interpreter.reduce_tree(actions))
+        except Exception:  # pylint: disable=broad-except
+            pass
+        else:
+            if result.shape == ():
+                # The result doesn't depend on the samples.
+                return [result.item()] * len(variables_list)
+            if result.shape == (len(variables_list),):
+                return result.tolist()
+
+    return [
+        evaluator(variables, functions, math_expr, case_sensitive)
+        for variables in variables_list
+    ]
+
+
+def stack_samples(variables_list):
+    """
+    Turn a list of variable dictionaries into one dictionary of arrays of
+    their values.
+
+    Return None if that isn't possible, because the dictionaries don't all have
+    the same numeric variables.
+    """
+    if not variables_list:
+        return None
+
+    names = set(variables_list[0])
+    for variables in variables_list:
+        if set(variables) != names:
+            return None
+        if not all(isinstance(value, numbers.Number) for value in variables.itervalues()):
+            return None
+
+    stacked = {}
+    for name in names:
+        values = [variables[name] for variables in variables_list]
+        # Use floats even for integer values, which would overflow silently
+        dtype = complex if any(isinstance(value, numbers.Complex) and not isinstance(value, numbers.Real)
+                               for value in values) else float
+        stacked[name] = numpy.array(values, dtype=dtype)
+    return stacked
+
+
+def evaluate_actions(all_variables, all_functions, case_sensitive):
+    """
+    Return the actions that `reduce_tree` uses to evaluate a parse tree.
+    """
     # Create a recursion to evaluate the tree.
     if case_sensitive:
         casify = lambda x: x
     else:
         casify = lambda x: x.lower()  # Lowercase for case insens.
 
-    evaluate_actions = {
+    return {
         'number': eval_number,
         'variable': lambda x: all_variables[casify(x[0])],
         'function': lambda x: all_functions[casify(x[0])](x[1]),
@@ -255,7 +342,58 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
         'sum': eval_sum
     }
 
-    return math_interpreter.reduce_tree(evaluate_actions)
+
+class ParseCache(object):
+    """
+    A thread-safe LRU cache of parsed expressions.
+
+    Parsing with pyparsing costs much more than evaluating the parse tree, and
+    the same answers (and instructor formulas) get evaluated over and over.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._parsed = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, math_expr, case_sensitive):
+        """
+        Return the parsed `ParseAugmenter` for the expression, parsing it if
+        it isn't in the cache. Parse errors are raised, and not cached.
+        """
+        key = (math_expr, case_sensitive)
+        with self._lock:
+            math_interpreter = self._parsed.pop(key, None)
+            if math_interpreter is not None:
+                self._parsed[key] = math_interpreter
+                return math_interpreter
+
+        math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+        math_interpreter.parse_algebra()
+
+        with self._lock:
+            self._parsed[key] = math_interpreter
+            while len(self._parsed) > self.size:
+                self._parsed.popitem(last=False)
+        return math_interpreter
+
+    def clear(self):
+        """
+        Empty the cache.
+        """
+        with self._lock:
+            self._parsed.clear()
+
+
+PARSE_CACHE = ParseCache(PARSE_CACHE_SIZE)
+
+
+def parse_expression(math_expr, case_sensitive=False):
+    """
+    Return a `ParseAugmenter` holding the parse tree of the expression.
+
+    Parses are shared, so the result must not be modified.
+    """
+    return PARSE_CACHE.get(math_expr, case_sensitive)
 
 
 class ParseAugmenter(object):
@@ -558,3 +558,55 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+
+class EvaluateSamplesTest(unittest.TestCase):
+    """
+    Run tests for calc.evaluate_samples, which should agree with
+    calc.evaluator sample by sample
+    """
+    samples = [{'x': 1.0, 'y': 2.0}, {'x': -3.5, 'y': 0.25}, {'x': 0.0, 'y': 7.0}]
+
+    def assert_agrees_with_evaluator(self, math_expr, samples=None, case_sensitive=False):
+        """
+        Check that evaluate_samples gives what evaluator gives for each sample
+        """
+        if samples is None:
+            samples = self.samples
+        expected = [calc.evaluator(sample, {}, math_expr, case_sensitive) for sample in samples]
+        results = calc.evaluate_samples(samples, {}, math_expr, case_sensitive)
+        self.assertEqual(len(results), len(expected))
+        for result, value in zip(results, expected):
+            if numpy.isnan(value):
+                self.assertTrue(numpy.isnan(result))
+            else:
+                self.assertAlmostEqual(result, value)
+
+    def test_vectorized(self):
+        self.assert_agrees_with_evaluator("x^2 + 3*y - sin(x)/2")
+        self.assert_agrees_with_evaluator("X*Y + pi")
+        self.assert_agrees_with_evaluator("x*i + y")
+
+    def test_constant(self):
+        self.assert_agrees_with_evaluator("2^3^2 - 5k")
+        self.assertTrue(all(numpy.isnan(calc.evaluate_samples(self.samples, {}, ""))))
+
+    def test_falls_back_per_sample(self):
+        # sqrt of a negative number, and a parallel resistor of zero
+        self.assert_agrees_with_evaluator("sqrt(x)")
+        self.assert_agrees_with_evaluator("x || y")
+        self.assert_agrees_with_evaluator("fact(y)", [{'y': 2}, {'y': 3}])
+
+    def test_errors(self):
+        with self.assertRaises(ZeroDivisionError):
+            calc.evaluate_samples(self.samples, {}, "y/x")
+        with self.assertRaises(ValueError):
+            calc.evaluate_samples(self.samples, {}, "fact(y)")
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'z'):
+            calc.evaluate_samples(self.samples, {}, "x+z")
+
+    def test_parses_once(self):
+        calc.PARSE_CACHE.clear()
+        first = calc.parse_expression("x+y")
+        self.assertIs(calc.parse_expression("x+y"), first)
+        self.assertIsNot(calc.parse_expression("x+y", case_sensitive=True), first)
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+"""
+Commandline tool for benchmarking capa response types
+
+Builds a representative problem of each response type with the xml factories
+the tests use, then, under many seeds, times constructing it, rendering it,
+grading an answer and rescoring the answer.  For each response type and phase
+it reports latency percentiles and the objects allocated.
+
+  python -m capa.benchmark --seeds 200 numerical formula
+
+Allocations are counted as the net number of objects tracked by the garbage
+collector, which is disabled while a phase runs.  Problem code is executed
+as the rest of capa does: in codejail, if it has been configured.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import math
+import sys
+import timeit
+
+from capa import capa_problem
+from capa.capa_problem import LoncapaProblem
+from capa.checker import DemoSystem
+from capa.tests import test_system
+from capa.tests.response_xml_factory import (
+    ChoiceResponseXMLFactory,
+    CustomResponseXMLFactory,
+    FormulaResponseXMLFactory,
+    NumericalResponseXMLFactory,
+    SchematicResponseXMLFactory,
+    StringResponseXMLFactory,
+)
+
+logging.basicConfig(format="%(levelname)s %(message)s")
+log = logging.getLogger('capa.benchmark')
+
+PHASES = ['construct', 'get_html', 'grade_answers', 'rescore']
+
+PERCENTILES = [50, 90, 99]
+
+# The problems to benchmark, by name: the factory to build each with, the
+# arguments to build it with, and a correct answer to grade.
+BENCHMARKS = [
+    ('numerical', NumericalResponseXMLFactory, {
+        'question_text': 'What is 5 plus 2.3?',
+        'answer': '7.3',
+        'tolerance': '1%',
+    }, {'1_2_1': '7.3'}),
+
+    ('formula', FormulaResponseXMLFactory, {
+        'question_text': 'Expand (x + 1)^2',
+        'sample_dict': {'x': (-10, 10)},
+        'num_samples': 10,
+        'tolerance': 0.01,
+        'answer': '(x + 1)^2',
+        'math_display': True,
+    }, {'1_2_1': 'x^2 + 2*x + 1'}),
+
+    ('customresponse', CustomResponseXMLFactory, {
+        'question_text': 'Enter an even number',
+        'script': 'def check_even(expect, ans):\n    return int(ans) % 2 == 0\n',
+        'cfn': 'check_even',
+    }, {'1_2_1': '42'}),
+
+    ('choice', ChoiceResponseXMLFactory, {
+        'question_text': 'Which of these are prime?',
+        'choice_type': 'checkbox',
+        'choices': [True, False, True, False, True],
+        'choice_names': ['2', '4', '5', '6', '7'],
+    }, {'1_2_1': ['choice_0', 'choice_2', 'choice_4']}),
+
+    ('string', StringResponseXMLFactory, {
+        'question_text': 'What is the capital of Michigan?',
+        'answer': 'Lansing',
+        'case_sensitive': False,
+    }, {'1_2_1': 'lansing'}),
+
+    ('schematic', SchematicResponseXMLFactory, {
+        'answer': "correct = ['correct' if submission[0]['vout'] == 5 else 'incorrect']",
+    }, {'1_2_1': json.dumps({'vout': 5})}),
+
+    ('multi-input', CustomResponseXMLFactory, {
+        'question_text': 'Enter three numbers that add up to 6',
+        'script': 'def check_sum(expect, ans):\n    return sum(int(a) for a in ans) == int(expect)\n',
+        'cfn': 'check_sum',
+        'expect': '6',
+        'num_inputs': 3,
+    }, {'1_2_1': '1', '1_2_2': '2', '1_2_3': '3'}),
+]
+
+
+def make_system():
+    """
+    Return a system for the problems, which renders their html with the
+    real templates.
+    """
+    system = test_system()
+    system.render_template = DemoSystem().render_template
+    return system
+
+
+def measure(func):
+    """
+    Call func, returning the seconds it took and the objects it allocated.
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        allocated = gc.get_count()[0]
+        start = timeit.default_timer()
+        func()
+        elapsed = timeit.default_timer() - start
+        allocated = gc.get_count()[0] - allocated
+    finally:
+        gc.enable()
+    return elapsed, allocated
+
+
+def run_benchmark(factory_class, build_kwargs, answers, seeds, system, cold=False):
+    """
+    Benchmark the phases of the problem built by factory_class under each of
+    seeds.  If cold, the parsed problem templates aren't reused.
+
+    Returns a dict of the [(seconds, objects), ...] of each phase.
+    """
+    xml = factory_class().build_xml(**build_kwargs)
+    results = dict((phase, []) for phase in PHASES)
+
+    for seed in seeds:
+        if cold:
+            capa_problem.PROBLEM_TEMPLATES.clear()
+
+        problems = []
+        results['construct'].append(measure(
+            lambda: problems.append(LoncapaProblem(xml, '1', seed=seed, system=system))
+        ))
+        problem = problems[0]
+
+        results['get_html'].append(measure(problem.get_html))
+        results['grade_answers'].append(measure(lambda: problem.grade_answers(answers)))
+        results['rescore'].append(measure(problem.rescore_existing_answers))
+
+    return results
+
+
+def percentile(values, percent):
+    """
+    Return the nearest-rank percent percentile of values.
+    """
+    ordered = sorted(values)
+    rank = int(math.ceil(percent / 100.0 * len(ordered)))
+    return ordered[max(rank, 1) - 1]
+
+
+def summarize(results):
+    """
+    Summarize the results of run_benchmark as a dict of the latency
+    percentiles, in milliseconds, and mean allocations of each phase.
+    """
+    summary = {}
+    for phase, measurements in results.items():
+        if not measurements:
+            continue
+        times = [elapsed * 1000 for elapsed, _ in measurements]
+        allocations = [allocated for _, allocated in measurements]
+        stats = {
+            'count': len(measurements),
+            'max_ms': max(times),
+            'objects': sum(allocations) / float(len(allocations)),
+        }
+        for percent in PERCENTILES:
+            stats['p{0}_ms'.format(percent)] = percentile(times, percent)
+        summary[phase] = stats
+    return summary
+
+
+def print_report(summaries, stream):
+    """
+    Write a table of the summaries, {name: summary}, to stream.
+    """
+    columns = ['p{0}_ms'.format(percent) for percent in PERCENTILES] + ['max_ms', 'objects']
+    stream.write("{0:<16}{1:<15}{2:>6}".format('type', 'phase', 'n'))
+    stream.write("".join("{0:>10}".format(column) for column in columns) + "\n")
+    for name, _, _, _ in BENCHMARKS:
+        if name not in summaries:
+            continue
+        for phase in PHASES:
+            stats = summaries[name][phase]
+            stream.write("{0:<16}{1:<15}{2:>6}".format(name, phase, stats['count']))
+            stream.write("".join("{0:>10.2f}".format(stats[column]) for column in columns) + "\n")
+
+
+def main():
+    names = [name for name, _, _, _ in BENCHMARKS]
+
+    parser = argparse.ArgumentParser(description='Benchmark capa response types')
+    parser.add_argument("types", nargs="*",
+                        help="The response types to benchmark, of {0} [DEFAULT: all]".format(", ".join(names)))
+    parser.add_argument("--seeds", type=int, default=100,
+                        help="How many seeds to build each problem with")
+    parser.add_argument("--cold", action="store_true",
+                        help="Parse each problem again, rather than reusing its template")
+    parser.add_argument("--json", action="store_true",
+                        help="Write the results as JSON, for comparing runs")
+    parser.add_argument("--log-level", required=False, default="WARN",
+                        choices=['info', 'debug', 'warn', 'error',
+                                 'INFO', 'DEBUG', 'WARN', 'ERROR'])
+
+    args = parser.parse_args()
+    log.setLevel(args.log_level.upper())
+
+    unknown = set(args.types) - set(names)
+    if unknown:
+        parser.error("unknown response types: {0}".format(", ".join(sorted(unknown))))
+
+    system = make_system()
+    seeds = range(args.seeds)
+    summaries = {}
+
+    for name, factory_class, build_kwargs, answers in BENCHMARKS:
+        if args.types and name not in args.types:
+            continue
+        log.info("Benchmarking {0}".format(name))
+        try:
+            results = run_benchmark(factory_class, build_kwargs, answers, seeds, system, cold=args.cold)
+        except Exception as ex:
+            log.error("Could not benchmark {0}".format(name))
+            log.exception(ex)
+            continue
+        summaries[name] = summarize(results)
+
+    if args.json:
+        json.dump(summaries, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+    else:
+        print_report(summaries, sys.stdout)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,10 +13,13 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 '''
 
+from collections import namedtuple, OrderedDict
 from datetime import datetime
+import hashlib
 import logging
 import os.path
 import re
+import threading
 
 from lxml import etree
 from xml.sax.saxutils import unescape
@@ -63,6 +66,61 @@ html_problem_semantics = [
 
 log = logging.getLogger(__name__)
 
+# How many problem templates to keep around for reuse.
+PROBLEM_TEMPLATE_CACHE_SIZE = 500
+
+#-----------------------------------------------------------------------------
+# Problem templates
+
+
+# The parts of a parsed problem that don't depend on its seed or state:
+#  - problem_text: the problem's xml, with startouttext/endouttext converted
+#  - tree: the parsed xml, with includes resolved and response and input ids
+#          assigned. Must be copied before use.
+#  - layout: a list of (response, inputfields), as positions in tree.iter()
+#  - script_code: the code of the problem's <script>s
+#  - python_path: the Python path needed to run it
+ProblemTemplate = namedtuple('ProblemTemplate', 'problem_text tree layout script_code python_path')
+
+
+class ProblemTemplateCache(object):
+    """
+    A thread-safe LRU cache of ProblemTemplates.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the template stored under key, or None
+        """
+        with self._lock:
+            template = self._templates.pop(key, None)
+            if template is not None:
+                self._templates[key] = template
+            return template
+
+    def set(self, key, template):
+        """
+        Store template under key, evicting the least recently used templates
+        """
+        with self._lock:
+            self._templates[key] = template
+            while len(self._templates) > self.size:
+                self._templates.popitem(last=False)
+
+    def clear(self):
+        """
+        Empty the cache
+        """
+        with self._lock:
+            self._templates.clear()
+
+
+PROBLEM_TEMPLATES = ProblemTemplateCache(PROBLEM_TEMPLATE_CACHE_SIZE)
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -113,25 +171,25 @@ class LoncapaProblem(object):
         self.done = state.get('done', False)
         self.input_state = state.get('input_state', {})
 
-        # Convert startouttext and endouttext to proper <text></text>
-        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
-        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
-        self.problem_text = problem_text
-
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        # handle any <include file="foo"> tags
-        self._process_includes()
+        # Parsing the problem doesn't depend on the seed or state, so it's shared
+        # by every LoncapaProblem made from the same text
+        template = self._get_template(problem_text)
+        self.problem_text = template.problem_text
+        self.tree = deepcopy(template.tree)
 
         # construct script processor context (eg for customresponse problems)
-        self.context = self._extract_context(self.tree)
-
-        # Pre-parse the XML tree: modifies it to add ID's and perform some in-place
-        # transformations.  This also creates the dict (self.responders) of Response
-        # instances for each question in the problem. The dict has keys = xml subtree of
-        # Response, values = Response instance
-        self._preprocess_problem(self.tree)
+        self.context = self._extract_context(self.tree, script=(template.script_code, template.python_path))
+
+        # Finish preprocessing the XML tree: the template has the ID's added.  This
+        # creates the dict (self.responders) of Response instances for each question
+        # in the problem. The dict has keys = xml subtree of Response, values =
+        # Response instance
+        elements = list(self.tree.iter())
+        layout = [
+            (elements[response], [elements[inputfield] for inputfield in inputfields])
+            for response, inputfields in template.layout
+        ]
+        self._preprocess_problem(self.tree, layout)
 
         if not self.student_answers:  # True when student_answers is an empty dict
             self.set_initial_display()
@@ -406,12 +464,65 @@ class LoncapaProblem(object):
 
     # ======= Private Methods Below ========
 
-    def _process_includes(self):
+    def _get_template(self, problem_text):
+        """
+        Return the ProblemTemplate for problem_text, from the cache if possible.
+        """
+        # Included files can change without the problem text changing, so
+        # problems that may have includes are always parsed again
+        if '<include' in problem_text:
+            return self._make_template(problem_text)
+
+        if isinstance(problem_text, unicode):
+            text_hash = hashlib.sha1(problem_text.encode('utf-8')).hexdigest()
+        else:
+            text_hash = hashlib.sha1(problem_text).hexdigest()
+        # The python path is resolved in the filestore, and include errors are
+        # only ignored when debugging
+        key = (
+            text_hash,
+            self.problem_id,
+            getattr(self.system.filestore, 'root_path', None),
+            bool(self.system.get('DEBUG')),
+        )
+        template = PROBLEM_TEMPLATES.get(key)
+        if template is None:
+            template = self._make_template(problem_text)
+            PROBLEM_TEMPLATES.set(key, template)
+        return template
+
+    def _make_template(self, problem_text):
+        """
+        Parse problem_text into a ProblemTemplate.
+        """
+        # Convert startouttext and endouttext to proper <text></text>
+        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
+        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
+
+        # parse problem XML file into an element tree
+        tree = etree.XML(problem_text)
+
+        # handle any <include file="foo"> tags
+        self._process_includes(tree)
+
+        script_code, python_path = self._extract_script(tree)
+
+        layout = self._assign_ids(tree)
+        positions = dict((element, position) for position, element in enumerate(tree.iter()))
+        layout = [
+            (positions[response], [positions[inputfield] for inputfield in inputfields])
+            for response, inputfields in layout
+        ]
+        return ProblemTemplate(problem_text, tree, layout, script_code, python_path)
+
+    def _process_includes(self, tree=None):
         '''
         Handle any <include file="foo"> tags by reading in the specified file and inserting it
-        into our XML tree.  Fail gracefully if debugging.
+        into our XML tree (self.tree by default).  Fail gracefully if debugging.
         '''
-        includes = self.tree.findall('.//include')
+        if tree is None:
+            tree = self.tree
+        includes = tree.findall('.//include')
         for inc in includes:
             filename = inc.get('file')
             if filename is not None:
@@ -492,16 +603,12 @@ class LoncapaProblem(object):
 
         return path
 
-    def _extract_context(self, tree):
+    def _extract_script(self, tree):
         '''
-        Extract content of <script>...</script> from the problem.xml file, and exec it in the
-        context of this problem.  Provides ability to randomize problems, and also set
-        variables for problem answer checking.
+        Extract content of <script>...</script> from the problem.xml file.
 
-        Problem XML goes to Python execution context. Runs everything in script tags.
+        Returns the code of all the Python script tags, and the Python path needed to run it.
         '''
-        context = {}
-        context['seed'] = self.seed
         all_code = ''
 
         python_path = []
@@ -524,6 +631,25 @@ class LoncapaProblem(object):
             code = unescape(script.text, XMLESC)
             all_code += code
 
+        return all_code, python_path
+
+    def _extract_context(self, tree, script=None):
+        '''
+        Extract content of <script>...</script> from the problem.xml file, and exec it in the
+        context of this problem.  Provides ability to randomize problems, and also set
+        variables for problem answer checking.
+
+        Problem XML goes to Python execution context. Runs everything in script tags.
+
+        `script`, if given, is the result of `_extract_script(tree)`.
+        '''
+        context = {}
+        context['seed'] = self.seed
+
+        if script is None:
+            script = self._extract_script(tree)
+        all_code, python_path = script
+
         if all_code:
             try:
                 safe_exec(
@@ -639,19 +765,16 @@ class LoncapaProblem(object):
 
         return tree
 
-    def _preprocess_problem(self, tree):  # private
+    def _assign_ids(self, tree):  # private
         '''
         Assign IDs to all the responses
         Assign sub-IDs to all entries (textline, schematic, etc.)
-        Annoted correctness and value
         In-place transformation
 
-        Also create capa Response instances for each responsetype and save as self.responders
-
-        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        Returns a list of (response, inputfields) for the responses in the tree
         '''
+        layout = []
         response_id = 1
-        self.responders = {}
         for response in tree.xpath('//' + "|//".join(response_tag_dict)):
             response_id_str = self.problem_id + "_" + str(response_id)
             # create and save ID for this response
@@ -672,6 +795,26 @@ class LoncapaProblem(object):
                 entry.attrib['id'] = "%s_%i_%i" % (self.problem_id, response_id, answer_id)
                 answer_id = answer_id + 1
 
+            layout.append((response, inputfields))
+
+        return layout
+
+    def _preprocess_problem(self, tree, layout=None):  # private
+        '''
+        Assign IDs to all the responses, unless `layout` gives the responses that
+        already have them (see `_assign_ids`)
+        Annoted correctness and value
+        In-place transformation
+
+        Also create capa Response instances for each responsetype and save as self.responders
+
+        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        '''
+        if layout is None:
+            layout = self._assign_ids(tree)
+
+        self.responders = {}
+        for response, inputfields in layout:
             # instantiate capa Response
             responder = response_tag_dict[response.tag](response, inputfields,
                                                         self.context, self.system)
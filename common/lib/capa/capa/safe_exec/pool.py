@@ -0,0 +1,274 @@
+"""
+A pool of warm sandboxed Python processes for safe_exec.
+
+Starting a sandboxed Python and importing numpy and friends costs far more
+than running most problem code.  A pool worker is a sandboxed Python that has
+imported them once, and runs each piece of code in a child forked from itself
+(see sandbox_worker.py), so executions stay isolated from each other.
+
+Workers are started on demand, up to the pool size, and replaced after a
+number of executions.  When all of them are busy, or the code needs files from
+a python_path, execution falls back to codejail as before.
+"""
+
+import json
+import logging
+import os
+import resource
+import select
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from codejail import jail_code
+from codejail.safe_exec import safe_exec as codejail_safe_exec
+from codejail.safe_exec import json_safe, SafeExecException
+
+log = logging.getLogger(__name__)
+
+# Read the worker's code now, to give to the sandboxed Python.
+sandbox_worker_py_file = os.path.join(os.path.dirname(__file__), "sandbox_worker.py")
+sandbox_worker_py = open(sandbox_worker_py_file).read()
+
+# How many seconds past its REALTIME limit to wait for a worker to reply.
+REPLY_GRACE_SECONDS = 5
+
+# The configured pool, if any.
+POOL = None
+
+
+class SandboxWorkerError(Exception):
+    """
+    A worker failed to run the code, and should not be used again.
+    """
+    pass
+
+
+def set_worker_limits():
+    """
+    Limit the worker process.  The limits on the executed code are set in the
+    children it forks, since the worker itself has to be able to fork.
+    """
+    # Set a new session id so that the worker and its children are in their
+    # own process group.
+    os.setsid()
+    # Nothing can be written.
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+
+
+class SandboxWorker(object):
+    """
+    A sandboxed Python process running sandbox_worker.py.
+    """
+    def __init__(self, cmdline, preload):
+        self.executions = 0
+        self.tmpdir = tempfile.mkdtemp(prefix="codejail-pool-")
+        # The sandbox user has to be able to use the directory.
+        os.chmod(self.tmpdir, 0777)
+        with open(os.devnull, "w") as devnull:
+            self.process = subprocess.Popen(
+                cmdline + ["-c", sandbox_worker_py] + list(preload),
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=devnull,
+                preexec_fn=set_worker_limits, cwd=self.tmpdir, env={},
+            )
+
+    def execute(self, code, globals_dict, limits):
+        """
+        Execute `code` with the JSON-safe `globals_dict`.
+
+        Returns a pair: the error message, if any, else None; and the resulting
+        globals.  Raises SandboxWorkerError if the worker itself failed.
+        """
+        self.executions += 1
+        data = json.dumps({'code': code, 'globals': globals_dict, 'limits': limits})
+        realtime = limits.get('REALTIME')
+        timeout = realtime + REPLY_GRACE_SECONDS if realtime else None
+        try:
+            self.process.stdin.write("%d\n%s" % (len(data), data))
+            self.process.stdin.flush()
+
+            ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+            if not ready:
+                raise SandboxWorkerError("Timed out waiting for the sandbox")
+            header = self.process.stdout.readline()
+            if not header:
+                raise SandboxWorkerError("The sandbox exited")
+            reply = json.loads(self.process.stdout.read(int(header)))
+        except (IOError, OSError, ValueError) as err:
+            raise SandboxWorkerError(str(err))
+
+        if 'error' in reply:
+            return "Couldn't execute jailed code: %s" % reply['error'], {}
+        return None, reply['globals']
+
+    def close(self):
+        """
+        Stop the worker.  Closing its stdin makes it exit once it is idle.
+        """
+        for pipe in (self.process.stdin, self.process.stdout):
+            try:
+                pipe.close()
+            except (IOError, OSError):
+                pass
+        if self.process.poll() is None:
+            try:
+                self.process.kill()
+            except OSError:
+                pass
+        self.process.wait()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+class SandboxPool(object):
+    """
+    Up to `size` SandboxWorkers, each replaced after `max_executions`.
+
+    `cmdline` is the command to start a sandboxed Python, by default the one
+    codejail has been configured with.
+    """
+    def __init__(self, size, max_executions, preload=(), cmdline=None):
+        self.size = size
+        self.max_executions = max_executions
+        self.preload = list(preload)
+        self.cmdline = cmdline
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """
+        Forget all workers, e.g. in a forked copy of the pool's process.
+        """
+        self._pid = os.getpid()
+        self._idle = []
+        self._busy = 0
+        self._stats = {
+            'started': 0,
+            'recycled': 0,
+            'failed': 0,
+            'executions': 0,
+            'overflows': 0,
+        }
+
+    def _get_cmdline(self):
+        """
+        Return the command to start a sandboxed Python, or None if there isn't one.
+        """
+        if self.cmdline is not None:
+            return self.cmdline
+        if not jail_code.is_configured("python"):
+            return None
+        return list(jail_code.COMMANDS["python"]["cmdline_start"])
+
+    def _checkout(self):
+        """
+        Return an idle worker, starting one if the pool isn't full, or None.
+        """
+        with self._lock:
+            if os.getpid() != self._pid:
+                # The workers' pipes belong to the parent process.
+                self._reset()
+            if self._idle:
+                self._busy += 1
+                return self._idle.pop()
+            if self._busy >= self.size:
+                self._stats['overflows'] += 1
+                return None
+            self._busy += 1
+
+        cmdline = self._get_cmdline()
+        worker = None
+        if cmdline is not None:
+            try:
+                worker = SandboxWorker(cmdline, self.preload)
+            except (IOError, OSError):
+                log.exception("Couldn't start a sandbox worker")
+        with self._lock:
+            if worker is None:
+                self._busy -= 1
+            else:
+                self._stats['started'] += 1
+        return worker
+
+    def _checkin(self, worker, healthy):
+        """
+        Return `worker` to the pool, or stop it if it has failed or is used up.
+        """
+        with self._lock:
+            pid = self._pid
+            self._busy -= 1
+            self._stats['executions'] += 1
+            if not healthy:
+                self._stats['failed'] += 1
+            elif worker.executions >= self.max_executions:
+                self._stats['recycled'] += 1
+            elif pid == os.getpid():
+                self._idle.append(worker)
+                return
+        worker.close()
+
+    def execute(self, code, globals_dict):
+        """
+        Execute `code` as codejail's safe_exec would, in a pooled worker.
+
+        Returns False, having done nothing, if no worker is available.
+        """
+        worker = self._checkout()
+        if worker is None:
+            return False
+
+        healthy = False
+        try:
+            emsg, results = worker.execute(code, json_safe(globals_dict), dict(jail_code.LIMITS))
+            healthy = True
+        except SandboxWorkerError as err:
+            emsg, results = "Couldn't execute jailed code: %s" % err, {}
+        finally:
+            self._checkin(worker, healthy)
+
+        globals_dict.update(results)
+        if emsg:
+            raise SafeExecException(emsg)
+        return True
+
+    def stats(self):
+        """
+        Return a dict of statistics about the pool.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self.size,
+                'idle': len(self._idle),
+                'busy': self._busy,
+            })
+        return stats
+
+
+def configure(size, max_executions, preload=()):
+    """
+    Use a pool of up to `size` workers, each replaced after `max_executions`.
+    A size of 0 turns the pool off.
+    """
+    global POOL  # pylint: disable=global-statement
+    POOL = SandboxPool(size, max_executions, preload) if size else None
+
+
+def stats():
+    """
+    Return a dict of statistics about the pool, empty if there is no pool.
+    """
+    if POOL is None:
+        return {}
+    return POOL.stats()
+
+
+def pooled_safe_exec(code, globals_dict, python_path=None, slug=None):
+    """
+    Execute code as codejail's safe_exec does, in a pool worker if possible.
+    """
+    # The workers can't see the files on a python_path.
+    if POOL is not None and not python_path:
+        if POOL.execute(code, globals_dict):
+            return
+    codejail_safe_exec(code, globals_dict, python_path=python_path, slug=slug)
@@ -1,9 +1,9 @@
 """Capa's specialized use of codejail.safe_exec."""
 
-from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
 from . import lazymod
+from . import pool
 from dogapi import dog_stats_api
 
 import hashlib
@@ -47,6 +47,22 @@ for name, modname in ASSUMED_IMPORTS:
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
 
+def configure_pool(size, max_executions=100):
+    """
+    Execute sandboxed code in a pool of up to `size` warm sandbox processes
+    that have already imported the ASSUMED_IMPORTS, each replaced after
+    `max_executions`.  A size of 0 turns the pool off.
+    """
+    pool.configure(size, max_executions, preload=[modname for _, modname in ASSUMED_IMPORTS])
+
+
+def pool_stats():
+    """
+    Return a dict of statistics about the sandbox pool, empty if there is none.
+    """
+    return pool.stats()
+
+
 def update_hash(hasher, obj):
     """
     Update a `hashlib` hasher with a nested object.
@@ -117,7 +133,7 @@ def safe_exec(code, globals_dict, random_seed=None, python_path=None, cache=None
     if unsafely:
         exec_fn = codejail_not_safe_exec
     else:
-        exec_fn = codejail_safe_exec
+        exec_fn = pool.pooled_safe_exec
 
     # Run the code!  Results are side effects in globals_dict.
     try:
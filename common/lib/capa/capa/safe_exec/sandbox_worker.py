@@ -0,0 +1,239 @@
+"""
+A long-lived process that executes code for safe_exec, run in the sandbox by
+`pool.SandboxWorker`.  This file is not imported, its source is given to the
+sandboxed Python with -c, and the modules to pre-import as arguments.
+
+Requests are read from stdin and replies written to stdout, each a JSON
+document preceded by a line giving its length.  A request is a dict with the
+code to run, the globals to run it with, and the codejail limits.  A reply is
+a dict with either the resulting "globals", or an "error" message.
+
+The modules are imported once, when the worker starts.  Each request is then
+read, executed and replied to by a child forked from the worker before the
+request is read, so the code finds the modules already imported, and neither
+the worker nor later children ever hold the code, globals or results of
+another request.  The worker itself only learns each child's REALTIME limit,
+and kills the child once it is exceeded.
+"""
+
+import json
+import os
+import resource
+import select
+import signal
+import sys
+import time
+import traceback
+
+
+# The globals that can be sent back, as in codejail.
+OK_TYPES = (type(None), int, long, float, str, unicode, list, tuple, dict)
+BAD_KEYS = ("__builtins__",)
+
+
+class DevNull(object):
+    """
+    Keep executed code from printing to stdout, where the replies go.
+    """
+    def write(self, *args, **kwargs):
+        pass
+
+
+def jsonable(value):
+    """
+    Can `value` be sent back as JSON?
+    """
+    if not isinstance(value, OK_TYPES):
+        return False
+    try:
+        json.dumps(value)
+    except Exception:
+        return False
+    return True
+
+
+def read_exactly(fd, size):
+    """
+    Read `size` bytes from `fd`, or fewer at EOF.  Reads are unbuffered, so
+    nothing past the message is taken from the pipe.
+    """
+    chunks = []
+    while size > 0:
+        chunk = os.read(fd, size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return "".join(chunks)
+
+
+def read_message(fd):
+    """
+    Read a length-prefixed message from `fd`, or None at EOF.
+    """
+    header = ""
+    while not header.endswith("\n"):
+        char = os.read(fd, 1)
+        if not char:
+            return None
+        header += char
+    return read_exactly(fd, int(header))
+
+
+def write_all(fd, data):
+    """
+    Write all of `data` to `fd`.
+    """
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def write_message(fd, data):
+    """
+    Write `data` to `fd` as a length-prefixed message.
+    """
+    write_all(fd, "%d\n%s" % (len(data), data))
+
+
+def isolate_child(*keep_fds):
+    """
+    Point stdin, stdout and stderr of this forked child at /dev/null, and close
+    every other file descriptor but `keep_fds`, so that the executed code can
+    neither read the worker's later requests nor write replies of its own.
+    """
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    try:
+        max_fd = os.sysconf('SC_OPEN_MAX')
+    except (AttributeError, ValueError):
+        max_fd = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+    low_fd = 3
+    for fd in sorted(keep_fds):
+        os.closerange(low_fd, fd)
+        low_fd = fd + 1
+    os.closerange(low_fd, max_fd)
+
+
+def run_child(control_fd):
+    """
+    In this forked child, read a request from stdin, execute it, write the
+    reply to stdout, and exit.
+
+    The worker is told on `control_fd` when the request has "started", with
+    its REALTIME limit, and when it has been "executed" and the reply is
+    about to be written.  Nothing is written at EOF.
+    """
+    status = 1
+    try:
+        data = read_message(0)
+        if data is None:
+            os._exit(0)  # pylint: disable=protected-access
+        reply_fd = os.dup(1)
+        try:
+            request = json.loads(data)
+            limits = request['limits']
+            write_all(control_fd, "started %s\n" % (limits.get('REALTIME') or 0))
+
+            isolate_child(control_fd, reply_fd)
+            # No subprocesses or threads.
+            resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+            cpu = limits.get('CPU')
+            if cpu:
+                resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+            vmem = limits.get('VMEM')
+            if vmem:
+                resource.setrlimit(resource.RLIMIT_AS, (vmem, vmem))
+
+            globals_dict = request['globals']
+            exec request['code'] in globals_dict  # pylint: disable=exec-used
+            reply = {'globals': dict(
+                (key, value) for key, value in globals_dict.iteritems()
+                if key not in BAD_KEYS and jsonable(value)
+            )}
+        except BaseException:  # pylint: disable=broad-except
+            reply = {'error': traceback.format_exc()}
+
+        reply = json.dumps(reply)
+        write_all(control_fd, "executed\n")
+        write_message(reply_fd, reply)
+        status = 0
+    finally:
+        os._exit(status)  # pylint: disable=protected-access
+
+
+def serve_request():
+    """
+    Fork a child to serve the next request, and wait for it to finish,
+    killing it if it outlives its REALTIME limit.
+
+    Returns False when the worker should exit: at EOF, or when a child died
+    while it may have been writing its reply.
+    """
+    control_fd, child_control_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(control_fd)
+        run_child(child_control_fd)
+    os.close(child_control_fd)
+
+    started = executed = timed_out = False
+    realtime = deadline = None
+    buf = ""
+    while True:
+        timeout = None if deadline is None else max(deadline - time.time(), 0)
+        ready, _, _ = select.select([control_fd], [], [], timeout)
+        if not ready:
+            timed_out = True
+            break
+        chunk = os.read(control_fd, 512)
+        if not chunk:
+            break
+        buf += chunk
+        while "\n" in buf:
+            line, buf = buf.split("\n", 1)
+            if line.startswith("started ") and not started:
+                started = True
+                realtime = line.split()[1]
+                if float(realtime):
+                    deadline = time.time() + float(realtime)
+            elif line == "executed":
+                executed = True
+    os.close(control_fd)
+    try:
+        os.kill(pid, signal.SIGKILL)
+    except OSError:
+        pass
+    _, status = os.waitpid(pid, 0)
+
+    if not started:
+        return False
+    if executed:
+        # The reply may only have been partly written.
+        return not timed_out and status == 0
+    if timed_out:
+        write_message(1, json.dumps({'error': "Timed out after %s seconds" % realtime}))
+    else:
+        write_message(1, json.dumps({'error': "Killed with status %d" % status}))
+    return True
+
+
+def main(preload):
+    """
+    Import the `preload` modules, then serve requests until stdin is closed.
+    """
+    for modname in preload:
+        try:
+            __import__(modname)
+        except Exception:  # pylint: disable=broad-except
+            # The code will get the ImportError when it uses the module.
+            pass
+
+    # Keep anything the modules print away from the replies.
+    sys.stdout = DevNull()
+    while serve_request():
+        pass
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,94 @@
+"""Test pool.py"""
+
+import os
+import sys
+import unittest
+import uuid
+
+from capa.safe_exec.pool import SandboxPool
+from codejail.safe_exec import SafeExecException
+
+
+class TestSandboxPool(unittest.TestCase):
+    """
+    Run the pool's workers with this Python, unsandboxed, to test the pooling.
+    """
+    def setUp(self):
+        self.pool = SandboxPool(2, 3, preload=["math"], cmdline=[sys.executable, "-E", "-B"])
+
+    def tearDown(self):
+        for worker in self.pool._idle:  # pylint: disable=protected-access
+            worker.close()
+
+    def test_execute(self):
+        g = {'a': 17}
+        self.assertTrue(self.pool.execute("import math\nb = a + int(math.pi)", g))
+        self.assertEqual(g['b'], 20)
+
+    def test_error(self):
+        g = {}
+        with self.assertRaisesRegexp(SafeExecException, "ZeroDivisionError"):
+            self.pool.execute("a = 1/0", g)
+        # The worker survives errors in the code.
+        self.assertEqual(self.pool.stats()['idle'], 1)
+
+    def test_executions_are_isolated(self):
+        g = {}
+        self.pool.execute("import math\nmath.pi = 3", g)
+        self.pool.execute("import math\npi = math.pi", g)
+        self.assertNotEqual(g['pi'], 3)
+
+    @unittest.skipUnless(os.path.exists("/proc/self/maps"), "needs /proc")
+    def test_earlier_globals_not_in_memory(self):
+        # Search the whole memory of the process running the code for a
+        # secret given to an earlier execution, without ever building the
+        # secret itself: look for its head directly followed by its tail.
+        secret = uuid.uuid4().hex
+        self.pool.execute("a = 1", {'secret': secret})
+        probe = "\n".join([
+            "head, tail = str(head), str(tail)",
+            "found = 0",
+            "mem = open('/proc/self/mem', 'rb')",
+            "for line in open('/proc/self/maps'):",
+            "    addresses, perms = line.split()[:2]",
+            "    if not perms.startswith('r'):",
+            "        continue",
+            "    start, end = [int(address, 16) for address in addresses.split('-')]",
+            "    try:",
+            "        mem.seek(start)",
+            "        region = mem.read(end - start)",
+            "    except (IOError, OSError, OverflowError, ValueError):",
+            "        continue",
+            "    at = region.find(head)",
+            "    while at != -1:",
+            "        if region[at + len(head):at + len(head) + len(tail)] == tail:",
+            "            found += 1",
+            "        at = region.find(head, at + 1)",
+        ])
+        g = {'head': secret[:16], 'tail': secret[16:]}
+        self.pool.execute(probe, g)
+        self.assertEqual(g['found'], 0)
+
+    def test_code_cannot_reply(self):
+        # The code can't write to the worker's stdout, where the replies go.
+        g = {}
+        self.pool.execute("import os\nos.write(1, '7\\n{\"a\": 1}')\nb = 2", g)
+        self.assertEqual(g, {'b': 2})
+        self.pool.execute("c = 3", g)
+        self.assertEqual(g['c'], 3)
+
+    def test_recycling(self):
+        for _ in range(7):
+            self.pool.execute("a = 1", {})
+        stats = self.pool.stats()
+        self.assertEqual(stats['executions'], 7)
+        self.assertEqual(stats['started'], 3)
+        self.assertEqual(stats['recycled'], 2)
+
+    def test_overflow(self):
+        # With all the workers busy, the pool declines to execute code.
+        workers = [self.pool._checkout(), self.pool._checkout()]  # pylint: disable=protected-access
+        self.assertFalse(self.pool.execute("a = 1", {}))
+        self.assertEqual(self.pool.stats()['overflows'], 1)
+        for worker in workers:
+            self.pool._checkin(worker, True)  # pylint: disable=protected-access
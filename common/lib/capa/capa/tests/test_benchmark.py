@@ -0,0 +1,34 @@
+"""Test benchmark.py"""
+
+import unittest
+
+from capa import benchmark
+from capa.tests import new_loncapa_problem
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_answers_are_correct(self):
+        # The benchmarks should time the grading of correct answers
+        for name, factory_class, build_kwargs, answers in benchmark.BENCHMARKS:
+            problem = new_loncapa_problem(factory_class().build_xml(**build_kwargs))
+            correct_map = problem.grade_answers(answers)
+            for answer_id in answers:
+                self.assertEqual(correct_map.get_correctness(answer_id), 'correct', name)
+
+    def test_run_benchmark(self):
+        system = benchmark.make_system()
+        for name, factory_class, build_kwargs, answers in benchmark.BENCHMARKS:
+            results = benchmark.run_benchmark(factory_class, build_kwargs, answers, [1, 2, 3], system)
+            summary = benchmark.summarize(results)
+            self.assertEqual(sorted(summary), sorted(benchmark.PHASES), name)
+            for stats in summary.values():
+                self.assertEqual(stats['count'], 3)
+                self.assertTrue(stats['p50_ms'] <= stats['p99_ms'] <= stats['max_ms'])
+
+    def test_percentile(self):
+        values = range(1, 101)
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([3], 90), 3)
+        self.assertEqual(benchmark.percentile([2, 1], 0), 1)
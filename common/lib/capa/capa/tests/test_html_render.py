@@ -252,6 +252,32 @@ class CapaHtmlRenderTest(unittest.TestCase):
         the_html = problem.get_html()
         self.assertRegexpMatches(the_html, r"<div>\s+</div>")
 
+    def test_parsed_problem_is_reused(self):
+        # Problems made from the same xml share a parse, but not its tree
+        xml_str = StringResponseXMLFactory().build_xml(answer="Test String")
+        with mock.patch('capa.capa_problem.etree.XML', wraps=etree.XML) as mock_xml:
+            problem = new_loncapa_problem(xml_str)
+            other_problem = new_loncapa_problem(xml_str)
+        # The problem text is only parsed once, though responders may parse other xml
+        xml_str_calls = [call for call in mock_xml.call_args_list if call[0][0] == xml_str]
+        self.assertLessEqual(len(xml_str_calls), 1)
+
+        self.assertIsNot(problem.tree, other_problem.tree)
+        self.assertEqual(etree.tostring(problem.tree), etree.tostring(other_problem.tree))
+        self.assertEqual(problem.get_answer_ids(), other_problem.get_answer_ids())
+        self.assertEqual(problem.get_html(), other_problem.get_html())
+
+    def test_included_file_edited(self):
+        # Problems with includes aren't reused, as the included files may change
+        xml_str = '<problem><include file="test_edited_include.xml"/></problem>'
+        self._create_test_file('test_edited_include.xml', '<test>Before</test>')
+        new_loncapa_problem(xml_str, system=self.system)
+        test_fp = self.system.filestore.open('test_edited_include.xml', "w")
+        test_fp.write('<test>After</test>')
+        test_fp.close()
+        problem = new_loncapa_problem(xml_str, system=self.system)
+        self.assertEqual(etree.XML(problem.get_html()).find("test").text, "After")
+
     def _create_test_file(self, path, content_str):
         test_fp = self.system.filestore.open(path, "w")
         test_fp.write(content_str)
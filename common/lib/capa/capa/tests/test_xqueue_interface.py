@@ -0,0 +1,101 @@
+"""Tests for the xqueue client"""
+
+import errno
+import json
+import socket
+import unittest
+from StringIO import StringIO
+
+from mock import Mock, patch
+import requests
+from requests.packages.urllib3.exceptions import MaxRetryError
+
+from capa.xqueue_interface import XQueueInterface
+
+
+def xqueue_reply(return_code=0, content='1'):
+    """A successful HTTP response from xqueue"""
+    return Mock(status_code=200, text=json.dumps({'return_code': return_code, 'content': content}))
+
+
+class XQueueInterfaceTest(unittest.TestCase):
+    """Test XQueueInterface"""
+
+    def make_interface(self, **kwargs):
+        """Make an interface whose HTTP requests are mocked"""
+        interface = XQueueInterface('http://xqueue', {'username': 'lms', 'password': 'secret'}, **kwargs)
+        interface.session = Mock()
+        return interface
+
+    def test_send_to_queue(self):
+        interface = self.make_interface(timeout=3)
+        interface.session.post.return_value = xqueue_reply()
+        self.assertEqual(interface.send_to_queue('header', 'body'), (0, '1'))
+        _, kwargs = interface.session.post.call_args
+        self.assertEqual(kwargs['timeout'], 3)
+
+    def test_retry_connection_error(self):
+        interface = self.make_interface(retries=1)
+        refused = MaxRetryError(None, 'http://xqueue', socket.error(errno.ECONNREFUSED, 'Connection refused'))
+        interface.session.post.side_effect = [requests.exceptions.ConnectionError(refused), xqueue_reply()]
+        self.assertEqual(interface.send_to_queue('header', 'body'), (0, '1'))
+        self.assertEqual(interface.session.post.call_count, 2)
+
+    def test_no_retry_after_sending(self):
+        # The submission may already have reached xqueue
+        interface = self.make_interface(retries=1)
+        reset = MaxRetryError(None, 'http://xqueue', socket.error(errno.ECONNRESET, 'Connection reset by peer'))
+        interface.session.post.side_effect = [requests.exceptions.ConnectionError(reset), xqueue_reply()]
+        error, _ = interface.send_to_queue('header', 'body')
+        self.assertTrue(error)
+        self.assertEqual(interface.session.post.call_count, 1)
+
+    def test_no_retry_timeout(self):
+        interface = self.make_interface(retries=1)
+        interface.session.post.side_effect = requests.exceptions.Timeout()
+        error, _ = interface.send_to_queue('header', 'body')
+        self.assertTrue(error)
+        self.assertEqual(interface.session.post.call_count, 1)
+
+    def test_circuit_breaker(self):
+        interface = self.make_interface(failure_threshold=2, recovery_time=30)
+        interface.session.post.side_effect = requests.exceptions.ConnectionError()
+        for _ in range(2):
+            interface.send_to_queue('header', 'body')
+        self.assertEqual(interface.session.post.call_count, 2)
+
+        # xqueue isn't called while the circuit is open
+        error, msg = interface.send_to_queue('header', 'body')
+        self.assertTrue(error)
+        self.assertEqual(msg, 'the grading queue is unavailable')
+        self.assertEqual(interface.session.post.call_count, 2)
+
+        # and is called again once the recovery time has passed
+        interface.session.post.side_effect = None
+        interface.session.post.return_value = xqueue_reply()
+        with patch('capa.xqueue_interface.time.time', return_value=interface.circuit.opened_at + 30):
+            self.assertEqual(interface.send_to_queue('header', 'body'), (0, '1'))
+        self.assertIsNone(interface.circuit.opened_at)
+
+    def test_async_submit(self):
+        interface = self.make_interface(async_submit=True)
+        upload = StringIO('print "hello"')
+        upload.name = 'prog.py'
+        with patch.object(XQueueInterface, '_start_worker'):
+            self.assertEqual(interface.send_to_queue('header', 'body', [upload]), (0, '0'))
+        self.assertFalse(interface.session.post.called)
+
+        # The files are copied, so they can be sent after the request is over
+        upload.close()
+        interface.session.post.return_value = xqueue_reply()
+        header, body, files = interface.submissions.get_nowait()
+        self.assertEqual(interface._submit(header, body, files), (0, '1'))  # pylint: disable=protected-access
+        _, kwargs = interface.session.post.call_args
+        self.assertEqual(kwargs['files']['prog.py'].read(), 'print "hello"')
+
+    def test_async_submit_full(self):
+        interface = self.make_interface(async_submit=True, max_queued=1)
+        with patch.object(XQueueInterface, '_start_worker'):
+            interface.send_to_queue('header', 'body')
+            error, _ = interface.send_to_queue('header', 'body')
+        self.assertTrue(error)
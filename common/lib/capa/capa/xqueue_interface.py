@@ -1,15 +1,28 @@
 #
 #  LMS Interface to external queueing system (xqueue)
 #
+import errno
 import hashlib
 import json
 import logging
+import os
+import socket
+import threading
+import time
+from Queue import Queue, Full
+from StringIO import StringIO
+
 import requests
+from requests.adapters import HTTPAdapter
 
 
 log = logging.getLogger(__name__)
 dateformat = '%Y%m%d%H%M%S'
 
+# Socket errors raised while opening a connection, before any of the request
+# can have been sent
+CONNECT_ERRNOS = (errno.ECONNREFUSED, errno.EHOSTUNREACH, errno.ENETUNREACH, errno.EADDRNOTAVAIL)
+
 
 def make_hashkey(seed):
     '''
@@ -56,16 +69,99 @@ def parse_xreply(xreply):
     return (return_code, content)
 
 
+def failed_to_connect(err):
+    """
+    Was the requests ConnectionError `err` raised while connecting to the
+    server, so that nothing was sent?
+
+    requests also raises ConnectionError for errors after the request was
+    sent, e.g. when the connection is reset while waiting for the response.
+    """
+    reason = err.args[0] if err.args else None
+    # urllib3 wraps the socket error in a MaxRetryError
+    reason = getattr(reason, 'reason', reason)
+    if isinstance(reason, socket.gaierror):
+        return True
+    return isinstance(reason, socket.error) and reason.errno in CONNECT_ERRNOS
+
+
+class CircuitBreaker(object):
+    """
+    Stop calling a failing service for a while.
+
+    After `failure_threshold` failures in a row the circuit opens, and `allow()`
+    returns False until `recovery_time` seconds have passed. Then calls are let
+    through again, and the first failure opens the circuit again.
+    """
+    def __init__(self, failure_threshold, recovery_time):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Can the service be called?
+        """
+        with self._lock:
+            return self.opened_at is None or time.time() - self.opened_at >= self.recovery_time
+
+    def succeeded(self):
+        """
+        Record a successful call, which closes the circuit.
+        """
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def failed(self):
+        """
+        Record a failed call.
+        """
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    log.error("xqueue failed %d times in a row: not calling it for %d seconds",
+                              self.failures, self.recovery_time)
+                self.opened_at = time.time()
+
+
 class XQueueInterface(object):
     '''
     Interface to the external grading system
+
+    Requests time out after `timeout` seconds, and are retried up to `retries`
+    times if xqueue can't be connected to. Requests that fail once they may
+    have been sent aren't retried, so that xqueue doesn't receive a submission
+    twice. Up to `pool_size` connections are
+    kept open for reuse. If `failure_threshold` requests fail in a row, xqueue
+    isn't called for `recovery_time` seconds, and requests fail at once.
+
+    With `async_submit`, submissions are put in a queue of up to `max_queued`
+    and sent by a background thread, and send_to_queue returns as soon as they
+    are queued.
     '''
 
-    def __init__(self, url, django_auth, requests_auth=None):
+    def __init__(self, url, django_auth, requests_auth=None, timeout=None, retries=0, pool_size=10,
+                 failure_threshold=None, recovery_time=30, async_submit=False, max_queued=1000):
         self.url = url
         self.auth = django_auth
         self.session = requests.Session()
         self.session.auth = requests_auth
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.timeout = timeout
+        self.retries = retries
+        self.circuit = CircuitBreaker(failure_threshold, recovery_time) if failure_threshold else None
+
+        self.async_submit = async_submit
+        self.submissions = Queue(max_queued)
+        self._worker = None
+        self._worker_pid = None
+        self._worker_lock = threading.Lock()
 
     def send_to_queue(self, header, body, files_to_upload=None):
         """
@@ -80,6 +176,14 @@ class XQueueInterface(object):
 
         Returns (error_code, msg) where error_code != 0 indicates an error
         """
+        if self.async_submit:
+            return self._queue_submission(header, body, files_to_upload)
+        return self._submit(header, body, files_to_upload)
+
+    def _submit(self, header, body, files_to_upload):
+        """
+        Submit a request to xqueue, logging in if need be.
+        """
         # Attempt to send to queue
         (error, msg) = self._send_to_queue(header, body, files_to_upload)
 
@@ -98,6 +202,58 @@ class XQueueInterface(object):
 
         return (error, msg)
 
+    def _queue_submission(self, header, body, files_to_upload):
+        """
+        Queue a request to be submitted to xqueue in the background.
+        """
+        if self.circuit is not None and not self.circuit.allow():
+            return (1, 'the grading queue is unavailable')
+
+        copies = None
+        if files_to_upload is not None:
+            # The uploaded files go away with the request
+            copies = []
+            for f in files_to_upload:
+                copy = StringIO(f.read())
+                copy.name = f.name
+                copies.append(copy)
+
+        self._start_worker()
+        # As from xqueue, the message is the number of submissions ahead of this one
+        queue_len = self.submissions.qsize()
+        try:
+            self.submissions.put_nowait((header, body, copies))
+        except Full:
+            return (1, 'too many submissions are waiting to be sent to the grading queue')
+        return (0, str(queue_len))
+
+    def _start_worker(self):
+        """
+        Start the thread sending queued submissions, unless it is running.
+        """
+        # A forked process doesn't get the thread of its parent.
+        with self._worker_lock:
+            if self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._send_queued, name='xqueue_interface')
+            self._worker.daemon = True
+            self._worker.start()
+            self._worker_pid = os.getpid()
+
+    def _send_queued(self):
+        """
+        Send queued submissions to xqueue.
+        """
+        while True:
+            header, body, files_to_upload = self.submissions.get()
+            try:
+                (error, msg) = self._submit(header, body, files_to_upload)
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Error sending a queued submission to xqueue")
+                continue
+            if error:
+                log.error("Failed to send a queued submission to xqueue: %s, header %s", msg, header)
+
     def _login(self):
         payload = {
             'username': self.auth['username'],
@@ -116,13 +272,45 @@ class XQueueInterface(object):
         return self._http_post(self.url + '/xqueue/submit/', payload, files=files)
 
     def _http_post(self, url, data, files=None):
-        try:
-            r = self.session.post(url, data=data, files=files)
-        except requests.exceptions.ConnectionError, err:
-            log.error(err)
-            return (1, 'cannot connect to server')
+        if self.circuit is not None and not self.circuit.allow():
+            return (1, 'the grading queue is unavailable')
+
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                r = self.session.post(url, data=data, files=files, timeout=self.timeout)
+                break
+            except requests.exceptions.ConnectionError, err:
+                log.error(err)
+                # Only retry if nothing was sent, so that submissions aren't
+                # graded twice
+                if attempts <= self.retries and failed_to_connect(err):
+                    if files:
+                        for f in files.values():
+                            f.seek(0)
+                    continue
+                self._record_failure()
+                return (1, 'cannot connect to server')
+            except requests.exceptions.Timeout, err:
+                # The request may have been received, so it isn't retried
+                log.error(err)
+                self._record_failure()
+                return (1, 'timed out waiting for the server')
+
+        if r.status_code >= 500:
+            self._record_failure()
+        elif self.circuit is not None:
+            self.circuit.succeeded()
 
         if r.status_code not in [200]:
             return (1, 'unexpected HTTP status code [%d]' % r.status_code)
 
         return parse_xreply(r.text)
+
+    def _record_failure(self):
+        """
+        Record a failure to reach xqueue in the circuit breaker.
+        """
+        if self.circuit is not None:
+            self.circuit.failed()
@@ -33,9 +33,10 @@ NUM_RANDOMIZATION_BINS = 20
 MAX_RANDOMIZATION_BINS = 1000
 
 
-def randomization_bin(seed, problem_id):
+def randomization_bin(seed, problem_id, num_bins=NUM_RANDOMIZATION_BINS):
     """
-    Pick a randomization bin for the problem given the user's seed and a problem id.
+    Pick one of `num_bins` randomization bins for the problem given the user's seed
+    and a problem id.
 
     We do this because we only want e.g. 20 randomizations of a problem to make analytics
     interesting.  To avoid having sets of students that always get the same problems,
@@ -45,7 +46,7 @@ def randomization_bin(seed, problem_id):
     r_hash.update(str(seed))
     r_hash.update(str(problem_id))
     # get the first few digits of the hash, convert to an int, then mod.
-    return int(r_hash.hexdigest()[:7], 16) % NUM_RANDOMIZATION_BINS
+    return int(r_hash.hexdigest()[:7], 16) % num_bins
 
 
 class Randomization(String):
@@ -134,6 +135,14 @@ class CapaFields(object):
             {"display_name": "Per Student", "value": "per_student"}
         ]
     )
+    seed_pool_size = Integer(
+        display_name="Randomization Variants",
+        help=("Defines how many different variants of a randomized problem are given to students. "
+              "The problem's code runs once per variant, rather than once per student. "
+              "If the value is not set, Per Student problems have 20 variants and other randomized problems 1000."),
+        values={"min": 1, "max": MAX_RANDOMIZATION_BINS},
+        scope=Scope.settings
+    )
     data = String(help="XML data for the problem", scope=Scope.content, default="<problem></problem>")
     correct_map = Dict(help="Dictionary with the correctness of current student answers",
                        scope=Scope.user_state, default={})
@@ -257,13 +266,49 @@ class CapaModule(CapaFields, XModule):
             self.seed = 1
         elif self.rerandomize == "per_student" and hasattr(self.system, 'seed'):
             # see comment on randomization_bin
-            self.seed = randomization_bin(self.system.seed, self.location.url)
+            self.seed = randomization_bin(
+                self.system.seed, self.location.url, self._num_variants or NUM_RANDOMIZATION_BINS
+            )
         else:
             self.seed = struct.unpack('i', os.urandom(4))[0]
 
             # So that sandboxed code execution can be cached, but still have an interesting
             # number of possibilities, cap the number of different random seeds.
-            self.seed %= MAX_RANDOMIZATION_BINS
+            self.seed %= self._num_variants or MAX_RANDOMIZATION_BINS
+
+    @property
+    def _num_variants(self):
+        """
+        The number of variants set for this problem, if any, no more than MAX_RANDOMIZATION_BINS.
+        """
+        if not self.seed_pool_size:
+            return None
+        return min(self.seed_pool_size, MAX_RANDOMIZATION_BINS)
+
+    def seed_pool(self):
+        """
+        Return the seeds of this problem's variants, or None if it doesn't have a seed pool.
+        """
+        if self.rerandomize == 'never' or not self._num_variants:
+            return None
+        return range(self._num_variants)
+
+    def warm_seed_pool(self):
+        """
+        Build the problem for each seed in its seed pool, so that the results of
+        running its code are in the system's cache before students ask for them.
+
+        Returns the number of variants built.
+        """
+        seeds = self.seed_pool() or []
+        for seed in seeds:
+            LoncapaProblem(
+                problem_text=self.data,
+                id=self.location.html_id(),
+                seed=seed,
+                system=self.system,
+            )
+        return len(seeds)
 
     def new_lcp(self, state, text=None):
         """
@@ -1254,8 +1299,10 @@ class CapaDescriptor(CapaFields, RawDescriptor):
     rescore_problem = module_attr('rescore_problem')
     reset_problem = module_attr('reset_problem')
     save_problem = module_attr('save_problem')
+    seed_pool = module_attr('seed_pool')
     set_state_from_lcp = module_attr('set_state_from_lcp')
     should_show_check_button = module_attr('should_show_check_button')
     should_show_reset_button = module_attr('should_show_reset_button')
     should_show_save_button = module_attr('should_show_save_button')
+    warm_seed_pool = module_attr('warm_seed_pool')
     update_score = module_attr('update_score')
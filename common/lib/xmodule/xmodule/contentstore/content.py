@@ -16,7 +16,7 @@ from PIL import Image
 
 class StaticContent(object):
     def __init__(self, loc, name, content_type, data, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False):
+                 length=None, locked=False, content_digest=None):
         self.location = loc
         self.name = name  # a display string which can be edited, and thus not part of the location which needs to be fixed
         self.content_type = content_type
@@ -28,6 +28,8 @@ class StaticContent(object):
         # cycles
         self.import_path = import_path
         self.locked = locked
+        # the md5 hex digest of the data, if the store recorded one
+        self.content_digest = content_digest
 
     @property
     def is_thumbnail(self):
@@ -138,20 +140,49 @@ class StaticContent(object):
     def stream_data(self):
         yield self._data
 
+    def stream_data_in_range(self, first_byte, last_byte):
+        """
+        Yields the data from first_byte to last_byte, inclusive
+        """
+        yield self._data[first_byte:last_byte + 1]
+
 
 class StaticContentStream(StaticContent):
+    # the size of the reads from streams which don't have a chunk size of their own
+    DEFAULT_CHUNK_SIZE = 64 * 1024
+
     def __init__(self, loc, name, content_type, stream, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False):
+                 length=None, locked=False, content_digest=None):
         super(StaticContentStream, self).__init__(loc, name, content_type, None, last_modified_at=last_modified_at,
                                                   thumbnail_location=thumbnail_location, import_path=import_path,
-                                                  length=length, locked=locked)
+                                                  length=length, locked=locked, content_digest=content_digest)
         self._stream = stream
+        # GridFS files are stored in chunks of chunk_size bytes, so reading a
+        # chunk at a time means each read fetches a single chunk
+        self._chunk_size = getattr(stream, 'chunk_size', None) or self.DEFAULT_CHUNK_SIZE
 
     def stream_data(self):
         while True:
-            chunk = self._stream.read(1024)
+            chunk = self._stream.read(self._chunk_size)
+            if len(chunk) == 0:
+                break
+            yield chunk
+
+    def stream_data_in_range(self, first_byte, last_byte):
+        """
+        Yields the data from first_byte to last_byte, inclusive, without reading
+        any of the stream before first_byte
+        """
+        self._stream.seek(first_byte)
+        remaining = last_byte - first_byte + 1
+        # read up to the end of the chunk containing first_byte, and then whole chunks
+        read_size = self._chunk_size - first_byte % self._chunk_size
+        while remaining > 0:
+            chunk = self._stream.read(min(read_size, remaining))
             if len(chunk) == 0:
                 break
+            remaining -= len(chunk)
+            read_size = self._chunk_size
             yield chunk
 
     def close(self):
@@ -161,7 +192,8 @@ class StaticContentStream(StaticContent):
         self._stream.seek(0)
         content = StaticContent(self.location, self.name, self.content_type, self._stream.read(),
                                 last_modified_at=self.last_modified_at, thumbnail_location=self.thumbnail_location,
-                                import_path=self.import_path, length=self.length, locked=self.locked)
+                                import_path=self.import_path, length=self.length, locked=self.locked,
+                                content_digest=self.content_digest)
         return content
 
 
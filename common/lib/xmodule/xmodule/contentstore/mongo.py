@@ -59,6 +59,19 @@ class MongoContentStore(ContentStore):
 
         return content
 
+    def generate_thumbnails(self, locations):
+        """
+        Generate the thumbnails of the assets at locations, e.g. in the
+        background after they were imported, and set them on the assets.
+        """
+        for location in locations:
+            content = self.find(location, throw_on_not_found=False)
+            if content is None:
+                continue
+            thumbnail_content, thumbnail_location = self.generate_thumbnail(content)
+            if thumbnail_content is not None:
+                self.set_attr(location, 'thumbnail_location', thumbnail_location)
+
     def delete(self, content_id):
         if self.fs.exists({"_id": content_id}):
             self.fs.delete(content_id)
@@ -72,7 +85,8 @@ class MongoContentStore(ContentStore):
                     location, fp.displayname, fp.content_type, fp, last_modified_at=fp.uploadDate,
                     thumbnail_location=getattr(fp, 'thumbnail_location', None),
                     import_path=getattr(fp, 'import_path', None),
-                    length=fp.length, locked=getattr(fp, 'locked', False)
+                    length=fp.length, locked=getattr(fp, 'locked', False),
+                    content_digest=getattr(fp, 'md5', None)
                 )
             else:
                 with self.fs.get(content_id) as fp:
@@ -80,7 +94,8 @@ class MongoContentStore(ContentStore):
                         location, fp.displayname, fp.content_type, fp.read(), last_modified_at=fp.uploadDate,
                         thumbnail_location=getattr(fp, 'thumbnail_location', None),
                         import_path=getattr(fp, 'import_path', None),
-                        length=fp.length, locked=getattr(fp, 'locked', False)
+                        length=fp.length, locked=getattr(fp, 'locked', False),
+                        content_digest=getattr(fp, 'md5', None)
                     )
         except NoFile:
             if throw_on_not_found:
@@ -10,7 +10,7 @@ from collections import namedtuple
 
 from abc import ABCMeta, abstractmethod
 
-from .exceptions import InvalidLocationError, InsufficientSpecificationError
+from .exceptions import InvalidLocationError, InsufficientSpecificationError, ItemNotFoundError
 from xmodule.errortracker import make_error_tracker
 
 log = logging.getLogger('edx.modulestore')
@@ -485,6 +485,22 @@ class ModuleStoreReadBase(ModuleStoreRead):
                 return c
         return None
 
+    def get_courses_for_ids(self, course_ids):
+        """
+        Returns a dict mapping each of course_ids whose course is in this
+        modulestore to its course descriptor.
+
+        Default impl--look up each course with get_instance
+        """
+        courses = {}
+        for course_id in course_ids:
+            org, course, name = course_id.split('/')
+            try:
+                courses[course_id] = self.get_instance(course_id, Location('i4x', org, course, 'course', name))
+            except ItemNotFoundError:
+                pass
+        return courses
+
 
 class ModuleStoreWriteBase(ModuleStoreReadBase, ModuleStoreWrite):
     '''
@@ -24,6 +24,10 @@ except ImportError:
 
 _MODULESTORES = {}
 
+# Sent by all the modulestores when a course is updated, so that receivers
+# can be connected once, when they are imported
+modulestore_update_signal = Signal(providing_args=['modulestore', 'course_id', 'location'])
+
 FUNCTION_KEYS = ['render_template']
 
 
@@ -64,7 +68,7 @@ def create_modulestore_instance(engine, doc_store_config, options):
     return class_(
         metadata_inheritance_cache_subsystem=metadata_inheritance_cache,
         request_cache=request_cache,
-        modulestore_update_signal=Signal(providing_args=['modulestore', 'course_id', 'location']),
+        modulestore_update_signal=modulestore_update_signal,
         xblock_mixins=getattr(settings, 'XBLOCK_MIXINS', ()),
         doc_store_config=doc_store_config,
         **_options
@@ -36,6 +36,9 @@ class MixedModuleStore(ModuleStoreWriteBase):
                 store.get('DOC_STORE_CONFIG', {}),
                 store['OPTIONS']
             )
+            # Updates to any of the stores are signalled to the receivers of this one's
+            if self.modulestore_update_signal is not None:
+                self.modulestores[key].modulestore_update_signal = self.modulestore_update_signal
 
     def _get_modulestore_for_courseid(self, course_id):
         """
@@ -130,6 +133,20 @@ class MixedModuleStore(ModuleStoreWriteBase):
         """
         return self._get_modulestore_for_courseid(course_id).get_course(course_id)
 
+    def get_courses_for_ids(self, course_ids):
+        """
+        Returns a dict mapping each of course_ids whose course is found to its
+        course descriptor, asking each modulestore for all of its courses at once
+        """
+        course_ids_by_store = {}
+        for course_id in course_ids:
+            course_ids_by_store.setdefault(self.mappings.get(course_id, 'default'), []).append(course_id)
+
+        courses = {}
+        for key, store_course_ids in course_ids_by_store.items():
+            courses.update(self.modulestores[key].get_courses_for_ids(store_course_ids))
+        return courses
+
     def get_parent_locations(self, location, course_id):
         """
         returns the parent locations for a given lcoation and course_id
@@ -146,6 +163,17 @@ class MixedModuleStore(ModuleStoreWriteBase):
         """
         return self._get_modulestore_for_courseid(course_id).get_modulestore_type(course_id)
 
+    def get_edit_version(self, location):
+        """
+        Return the edit version of the course whose course module is at
+        location, or None if the modulestore of the course doesn't keep one
+        (like the XML modulestore, whose courses only change when it is loaded)
+        """
+        store = self._get_modulestore_for_courseid(location.course_id)
+        if hasattr(store, 'get_edit_version'):
+            return store.get_edit_version(location)
+        return None
+
     def get_errored_courses(self):
         """
         Return a dictionary of course_dir -> [(msg, exception_str)], for each
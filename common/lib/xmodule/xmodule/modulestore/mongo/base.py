@@ -16,11 +16,15 @@ import pymongo
 import sys
 import logging
 import copy
+import threading
 
 from bson.son import SON
+from collections import OrderedDict
+from contextlib import contextmanager
 from fs.osfs import OSFS
 from itertools import repeat
 from path import path
+from uuid import uuid4
 
 from importlib import import_module
 from xmodule.errortracker import null_error_tracker, exc_info_to_str
@@ -250,6 +254,55 @@ def metadata_cache_key(location):
     return u"{0.org}/{0.course}".format(location)
 
 
+def edit_version_cache_key(location):
+    """The cache key of the edit version of the course containing `location`"""
+    return u"{0.org}/{0.course}/edit_version".format(location)
+
+
+def parent_index_cache_key(location):
+    """The cache key of the parent index of the course containing `location`"""
+    return u"{0.org}/{0.course}/parent_index".format(location)
+
+
+class ModuleDataCache(object):
+    """
+    A bounded, least recently used cache of module documents, shared by all
+    of the threads of a process.
+
+    Each document is stored with the edit version of its course at the time
+    it was read, and is only returned while the course has that version.
+    Documents are copied in and out of the cache, because loading a
+    descriptor modifies the document it is loaded from.
+    """
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, location, edit_version):
+        """
+        Return a copy of the document cached for location at edit_version, or None
+        """
+        with self._lock:
+            entry = self._entries.pop(location, None)
+            if entry is None or entry[0] != edit_version:
+                return None
+            # Reinsert the entry to mark it as the most recently used
+            self._entries[location] = entry
+        return copy.deepcopy(entry[1])
+
+    def set(self, location, edit_version, item):
+        """
+        Cache a copy of the document item for location at edit_version
+        """
+        entry = (edit_version, copy.deepcopy(item))
+        with self._lock:
+            self._entries.pop(location, None)
+            self._entries[location] = entry
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
 class MongoModuleStore(ModuleStoreWriteBase):
     """
     A Mongodb backed ModuleStore
@@ -261,9 +314,12 @@ class MongoModuleStore(ModuleStoreWriteBase):
     def __init__(self, doc_store_config, fs_root, render_template,
                  default_class=None,
                  error_tracker=null_error_tracker,
+                 module_data_cache_size=0,
                  **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param module_data_cache_size: the number of module documents to keep in a process-wide cache,
+            to save querying for them again. 0 disables the cache.
         """
 
         super(MongoModuleStore, self).__init__(**kwargs)
@@ -310,10 +366,86 @@ class MongoModuleStore(ModuleStoreWriteBase):
         self.render_template = render_template
         self.ignore_write_events_on_courses = []
 
+        self.module_data_cache = None
+        if module_data_cache_size:
+            self.module_data_cache = ModuleDataCache(module_data_cache_size)
+        # Edit versions of courses, used if there is no metadata_inheritance_cache_subsystem
+        self._local_edit_versions = {}
+
+        # The pseudo course ids of the courses in bulk_write_operations, and
+        # the (location, update) of the last item written in one, which is
+        # combined with the item's next update. They are kept per thread, so
+        # that other requests writing to the same course aren't affected.
+        self._bulk_write_state = threading.local()
+
+    @property
+    def _bulk_write_courses(self):
+        """
+        The pseudo course ids of the courses this thread is in bulk_write_operations for
+        """
+        if not hasattr(self._bulk_write_state, 'courses'):
+            self._bulk_write_state.courses = set()
+        return self._bulk_write_state.courses
+
+    @property
+    def _pending_write(self):
+        """
+        The (location, update) held back by this thread's bulk_write_operations, or None
+        """
+        return getattr(self._bulk_write_state, 'pending_write', None)
+
+    @_pending_write.setter
+    def _pending_write(self, pending):
+        self._bulk_write_state.pending_write = pending
+
+    @contextmanager
+    def bulk_write_operations(self, location):
+        """
+        Write to the course containing location in bulk, e.g. while importing it.
+
+        While in the context, writes to the course made by this thread don't
+        recompute its metadata inheritance tree or send signals, and consecutive
+        updates of an item are combined into one. On exit, even if the writes
+        failed, the tree is recomputed and a signal is sent for the course, once.
+        """
+        location = Location(location)
+        pseudo_course_id = '/'.join([location.org, location.course])
+        if pseudo_course_id in self._bulk_write_courses:
+            # The outermost context finishes up
+            yield
+            return
+
+        self._bulk_write_courses.add(pseudo_course_id)
+        already_ignored = pseudo_course_id in self.ignore_write_events_on_courses
+        if not already_ignored:
+            self.ignore_write_events_on_courses.append(pseudo_course_id)
+        try:
+            yield
+        finally:
+            try:
+                self.flush_bulk_writes()
+            finally:
+                self._bulk_write_courses.discard(pseudo_course_id)
+                if not already_ignored:
+                    self.ignore_write_events_on_courses.remove(pseudo_course_id)
+                # Whatever was written, the cached tree and edit version must not
+                # describe the course as it was before
+                self.refresh_cached_metadata_inheritance_tree(location)
+                self.fire_updated_modulestore_signal(get_course_id_no_run(location), location)
+
+    def flush_bulk_writes(self):
+        """
+        Write the update held back by bulk_write_operations, if there is one
+        """
+        pending, self._pending_write = self._pending_write, None
+        if pending is not None:
+            self._write_single_item(*pending)
+
     def compute_metadata_inheritance_tree(self, location):
         '''
         TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
         '''
+        self.flush_bulk_writes()
 
         # get all collections in the course, this query should not return any leaf nodes
         # note this is a bit ugly as when we add new categories of containers, we have to add it here
@@ -430,6 +562,47 @@ class MongoModuleStore(ModuleStoreWriteBase):
         pseudo_course_id = '/'.join([location.org, location.course])
         if pseudo_course_id not in self.ignore_write_events_on_courses:
             self.get_cached_metadata_inheritance_tree(location, force_refresh=True)
+            self.bump_edit_version(location)
+
+    def get_edit_version(self, location):
+        """
+        Return the edit version of the course containing location. The version
+        changes whenever the course's content does, and is used to tell which
+        documents in self.module_data_cache are current.
+        """
+        key = edit_version_cache_key(location)
+
+        # Like the metadata inheritance tree, the version is only read once per request
+        if self.request_cache is not None and key in self.request_cache.data.get('edit_versions', {}):
+            return self.request_cache.data['edit_versions'][key]
+
+        if self.metadata_inheritance_cache_subsystem is not None:
+            version = self.metadata_inheritance_cache_subsystem.get(key)
+            if version is None:
+                # Start a new version. If another process got there first, use its value.
+                self.metadata_inheritance_cache_subsystem.add(key, uuid4().hex)
+                version = self.metadata_inheritance_cache_subsystem.get(key)
+        else:
+            version = self._local_edit_versions.setdefault(key, uuid4().hex)
+
+        if self.request_cache is not None:
+            self.request_cache.data.setdefault('edit_versions', {})[key] = version
+        return version
+
+    def bump_edit_version(self, location):
+        """
+        Give the course containing location a new edit version, so that any
+        documents cached before it was changed are no longer used
+        """
+        key = edit_version_cache_key(location)
+        version = uuid4().hex
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self.metadata_inheritance_cache_subsystem.set(key, version)
+        else:
+            self._local_edit_versions[key] = version
+
+        if self.request_cache is not None:
+            self.request_cache.data.setdefault('edit_versions', {})[key] = version
 
     def _clean_item_data(self, item):
         """
@@ -439,11 +612,37 @@ class MongoModuleStore(ModuleStoreWriteBase):
         del item['_id']
 
     def _query_children_for_cache_children(self, items):
-        # first get non-draft in a round-trip
-        query = {
-            '_id': {'$in': [namedtuple_to_son(Location(item)) for item in items]}
-        }
-        return list(self.collection.find(query))
+        self.flush_bulk_writes()
+        if self.module_data_cache is None:
+            # first get non-draft in a round-trip
+            query = {
+                '_id': {'$in': [namedtuple_to_son(Location(item)) for item in items]}
+            }
+            return list(self.collection.find(query))
+
+        found = []
+        # maps the Location of each uncached item to the edit version it was missed at
+        missing = {}
+        for item in items:
+            location = Location(item)
+            edit_version = self.get_edit_version(location)
+            data = self.module_data_cache.get(location, edit_version)
+            if data is None:
+                missing[location] = edit_version
+            else:
+                found.append(data)
+
+        if missing:
+            query = {
+                '_id': {'$in': [namedtuple_to_son(location) for location in missing]}
+            }
+            for data in self.collection.find(query):
+                location = Location(data['_id'])
+                # Cache under the version read before querying, so that a
+                # concurrent edit leaves the document stale rather than wrong
+                self.module_data_cache.set(location, missing[location], data)
+                found.append(data)
+        return found
 
     def _cache_children(self, items, depth=0):
         """
@@ -537,17 +736,46 @@ class MongoModuleStore(ModuleStoreWriteBase):
             )
         ]
 
+    def get_courses_for_ids(self, course_ids):
+        """
+        Returns a dict mapping each of course_ids whose course is in this
+        modulestore to its course descriptor, loading them all in one query
+        """
+        if not course_ids:
+            return {}
+        self.flush_bulk_writes()
+        queries = []
+        for course_id in course_ids:
+            org, course, name = course_id.split('/')
+            queries.append(location_to_query(Location('i4x', org, course, 'course', name)))
+        items = self.collection.find({'$or': queries})
+        return dict(
+            (course.id, course)
+            for course in self._load_items(list(items))
+        )
+
     def _find_one(self, location):
         '''Look for a given location in the collection.  If revision is not
         specified, returns the latest.  If the item is not present, raise
         ItemNotFoundError.
         '''
+        self.flush_bulk_writes()
+        if self.module_data_cache is not None:
+            location = Location(location)
+            edit_version = self.get_edit_version(location)
+            item = self.module_data_cache.get(location, edit_version)
+            if item is not None:
+                return item
+
         item = self.collection.find_one(
             location_to_query(location, wildcard=False),
             sort=[('revision', pymongo.ASCENDING)],
         )
         if item is None:
             raise ItemNotFoundError(location)
+
+        if self.module_data_cache is not None:
+            self.module_data_cache.set(location, edit_version, item)
         return item
 
     def has_item(self, course_id, location):
@@ -594,6 +822,7 @@ class MongoModuleStore(ModuleStoreWriteBase):
         return self.get_item(location, depth=depth)
 
     def get_items(self, location, course_id=None, depth=0):
+        self.flush_bulk_writes()
         items = self.collection.find(
             location_to_query(location),
             sort=[('revision', pymongo.ASCENDING)],
@@ -656,6 +885,7 @@ class MongoModuleStore(ModuleStoreWriteBase):
         """
         # Save any changes to the xmodule to the MongoKeyValueStore
         xmodule.save()
+        self.flush_bulk_writes()
         self.collection.save({
                 '_id': xmodule.location.dict(),
                 'metadata': own_metadata(xmodule),
@@ -705,8 +935,11 @@ class MongoModuleStore(ModuleStoreWriteBase):
 
     def fire_updated_modulestore_signal(self, course_id, location):
         """
-        Send a signal using `self.modulestore_update_signal`, if that has been set
+        Send a signal using `self.modulestore_update_signal`, if that has been set,
+        unless the course is in bulk_write_operations
         """
+        if course_id in self._bulk_write_courses:
+            return
         if self.modulestore_update_signal is not None:
             self.modulestore_update_signal.send(self, modulestore=self, course_id=course_id,
                                                 location=location)
@@ -739,11 +972,30 @@ class MongoModuleStore(ModuleStoreWriteBase):
         return courses[0]
 
     def _update_single_item(self, location, update):
+        """
+        Set update on the specified item, and raises ItemNotFoundError
+        if the location doesn't exist. In bulk_write_operations, the update
+        is held back until a different item is written.
+        """
+        location = Location(location)
+        if '/'.join([location.org, location.course]) in self._bulk_write_courses:
+            pending = self._pending_write
+            if pending is not None and pending[0] == location:
+                pending[1].update(update)
+                return
+            self._pending_write = (location, dict(update))
+            if pending is not None:
+                self._write_single_item(*pending)
+            return
+
+        self.flush_bulk_writes()
+        self._write_single_item(location, update)
+
+    def _write_single_item(self, location, update):
         """
         Set update on the specified item, and raises ItemNotFoundError
         if the location doesn't exist
         """
-
         # See http://www.mongodb.org/display/DOCS/Updating for
         # atomic update syntax
         result = self.collection.update(
@@ -772,6 +1024,12 @@ class MongoModuleStore(ModuleStoreWriteBase):
             if not allow_not_found:
                 raise
 
+        # The inheritance tree doesn't depend on definition data, so only the
+        # edit version needs to change
+        loc = Location(location)
+        if '/'.join([loc.org, loc.course]) not in self.ignore_write_events_on_courses:
+            self.bump_edit_version(loc)
+
     def update_children(self, location, children):
         """
         Set the children for the item specified by the location to
@@ -835,6 +1093,7 @@ class MongoModuleStore(ModuleStoreWriteBase):
             course.save()
             self.update_metadata(course.location, own_metadata(course))
 
+        self.flush_bulk_writes()
         # Must include this to avoid the django debug toolbar (which defines the deprecated "safe=False")
         # from overriding our default value set in the init method.
         self.collection.remove({'_id': Location(location).dict()}, safe=self.collection.safe)
@@ -847,10 +1106,63 @@ class MongoModuleStore(ModuleStoreWriteBase):
         course.  Needed for path_to_location().
         '''
         location = Location.ensure_fully_specified(location)
+        pseudo_course_id = '/'.join([location.org, location.course])
+        # The index is only worth building if it can be cached, and is not kept
+        # up to date while a course is being imported
+        if (self.metadata_inheritance_cache_subsystem is not None and
+                pseudo_course_id not in self.ignore_write_events_on_courses):
+            parent_index = self.get_cached_parent_index(location)
+            return [Location(parent) for parent in parent_index.get(location.url(), [])]
+
+        self.flush_bulk_writes()
         items = self.collection.find({'definition.children': location.url()},
                                      {'_id': True})
         return [i['_id'] for i in items]
 
+    def compute_parent_index(self, location):
+        """
+        Return a dict mapping the url of each child in the course containing
+        location to the urls of its parents, drafts included
+        """
+        query = {
+            '_id.org': location.org,
+            '_id.course': location.course,
+            'definition.children': {'$exists': True},
+        }
+        self.flush_bulk_writes()
+        parent_index = {}
+        for result in self.collection.find(query, {'_id': True, 'definition.children': True}):
+            parent_url = Location(result['_id']).url()
+            for child in result.get('definition', {}).get('children', []):
+                parent_index.setdefault(child, []).append(parent_url)
+        return parent_index
+
+    def get_cached_parent_index(self, location):
+        """
+        Return the parent index (see compute_parent_index) of the course
+        containing location, computing it only if the course has changed since
+        it was last computed
+        """
+        key = parent_index_cache_key(location)
+        edit_version = self.get_edit_version(location)
+
+        cached = None
+        if self.request_cache is not None:
+            cached = self.request_cache.data.get('parent_index', {}).get(key)
+        if cached is None and self.metadata_inheritance_cache_subsystem is not None:
+            cached = self.metadata_inheritance_cache_subsystem.get(key)
+
+        if cached is None or cached[0] != edit_version:
+            # The edit version was read before computing the index, so a
+            # concurrent change leaves the cached index stale rather than wrong
+            cached = (edit_version, self.compute_parent_index(location))
+            if self.metadata_inheritance_cache_subsystem is not None:
+                self.metadata_inheritance_cache_subsystem.set(key, cached)
+
+        if self.request_cache is not None:
+            self.request_cache.data.setdefault('parent_index', {})[key] = cached
+        return cached[1]
+
     def get_modulestore_type(self, course_id):
         """
         Returns an enumeration-like type reflecting the type of this modulestore
@@ -865,6 +1177,7 @@ class MongoModuleStore(ModuleStoreWriteBase):
         """
         Return an array all of the locations for orphans in the course.
         """
+        self.flush_bulk_writes()
         all_items = self.collection.find({
             '_id.org': course_location.org,
             '_id.course': course_location.course,
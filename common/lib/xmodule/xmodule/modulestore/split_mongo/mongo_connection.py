@@ -1,17 +1,165 @@
 """
 Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
 """
+import threading
+from collections import OrderedDict
+from uuid import uuid4
+
 import pymongo
+from bson import BSON
+
+
+class StructureCache(object):
+    """
+    A least recently used cache of structures keyed by their _id, shared by
+    all of the threads of a process, and optionally backed by a cache shared
+    between processes (e.g. memcached).
+
+    Structures are kept BSON encoded. Decoding them is cheap, and gives every
+    caller its own copy to modify, as loading a course modifies its structure.
+
+    Most structures never change once written, but the head of a course can
+    be updated in place (see `update`). So, given a shared cache, each
+    structure has a revision token in it, which every lookup reads, and which
+    is replaced when the structure is updated: copies cached at an older
+    revision, in any process, are then ignored. Without a shared cache, only
+    the copies of this process can be invalidated.
+    """
+    # Passed for a revision to read the current one
+    CURRENT = object()
+
+    def __init__(self, size, tz_aware=True, shared_cache=None, share_structures=True):
+        """
+        :param size: the number of structures to keep in this process
+        :param tz_aware: whether decoded datetimes should be timezone aware
+        :param shared_cache: an optional django-style cache shared between
+            processes, which holds the structures' revision tokens
+        :param share_structures: whether to also keep the structures themselves
+            in shared_cache, so that other processes can use them
+        """
+        self.size = size
+        self.tz_aware = tz_aware
+        self.shared_cache = shared_cache
+        self.share_structures = share_structures
+        # Maps the _id of each structure to its (revision, encoded structure)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _shared_key(key, revision):
+        """
+        The key of the structure with _id key at revision in the shared cache
+        """
+        return 'split_structure.{}.{}'.format(key, revision)
+
+    @staticmethod
+    def _revision_key(key):
+        """
+        The key of the revision token of the structure with _id key in the shared cache
+        """
+        return 'split_structure_revision.{}'.format(key)
+
+    def revision(self, key):
+        """
+        Return the current revision token of the structure whose _id is key,
+        or None if there is no shared cache to hold it.
+
+        A structure is given a token when it is first looked up. If the token
+        is evicted from the shared cache, the structure gets a new one, so that
+        all the cached copies are dropped rather than possibly being stale.
+        """
+        if self.shared_cache is None:
+            return None
+        revision_key = self._revision_key(str(key))
+        revision = self.shared_cache.get(revision_key)
+        if revision is None:
+            self.shared_cache.add(revision_key, uuid4().hex)
+            revision = self.shared_cache.get(revision_key)
+        return revision
+
+    def get(self, key, revision=CURRENT):
+        """
+        Return a copy of the structure whose _id is key, or None if it isn't
+        cached at revision (by default, its current revision)
+        """
+        key = str(key)
+        if revision is self.CURRENT:
+            revision = self.revision(key)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and entry[0] == revision:
+                # Reinsert the entry to mark it as the most recently used
+                self._entries[key] = entry
+                data = entry[1]
+            else:
+                data = None
+
+        if data is None and self.shared_cache is not None and self.share_structures:
+            data = self.shared_cache.get(self._shared_key(key, revision))
+            if data is not None:
+                self._store(key, revision, data)
+
+        if data is None:
+            return None
+        return BSON(data).decode(tz_aware=self.tz_aware)
+
+    def set(self, structure, revision=CURRENT):
+        """
+        Cache a copy of structure, as it was at revision (by default, its
+        current revision). Pass the revision read before the structure was
+        fetched, so that a copy fetched before an update isn't cached as
+        the updated revision.
+        """
+        key = str(structure['_id'])
+        if revision is self.CURRENT:
+            revision = self.revision(key)
+        self._set(key, revision, BSON.encode(structure))
+
+    def update(self, structure):
+        """
+        Cache a copy of structure, which has been updated in place, giving it a
+        new revision so that the copies cached before are no longer used
+        """
+        key = str(structure['_id'])
+        revision = None
+        if self.shared_cache is not None:
+            revision = uuid4().hex
+            self.shared_cache.set(self._revision_key(key), revision)
+        self._set(key, revision, BSON.encode(structure))
+
+    def _set(self, key, revision, data):
+        """
+        Store the encoded structure data at revision in this process and, if
+        structures are shared, in the shared cache
+        """
+        self._store(key, revision, data)
+        if self.shared_cache is not None and self.share_structures:
+            self.shared_cache.set(self._shared_key(key, revision), data)
+
+    def _store(self, key, revision, data):
+        """
+        Store the encoded structure data at revision in this process, evicting
+        the least recently used structures if there are too many
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (revision, data)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
 
 class MongoConnection(object):
     """
     Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
     """
     def __init__(
-        self, db, collection, host, port=27017, tz_aware=True, user=None, password=None, **kwargs
+        self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
+        structure_cache=None, **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        :param structure_cache: an optional StructureCache to save fetching structures again
         """
         self.database = pymongo.database.Database(
             pymongo.MongoClient(
@@ -38,11 +186,23 @@ class MongoConnection(object):
         self.structures.write_concern = {'w': 1}
         self.definitions.write_concern = {'w': 1}
 
+        self.structure_cache = structure_cache
+
     def get_structure(self, key):
         """
         Get the structure from the persistence mechanism whose id is the given key
         """
-        return self.structures.find_one({'_id': key})
+        if self.structure_cache is not None:
+            # Read before fetching, so that an update made meanwhile invalidates what is fetched
+            revision = self.structure_cache.revision(key)
+            structure = self.structure_cache.get(key, revision)
+            if structure is not None:
+                return structure
+
+        structure = self.structures.find_one({'_id': key})
+        if structure is not None and self.structure_cache is not None:
+            self.structure_cache.set(structure, revision)
+        return structure
 
     def find_matching_structures(self, query):
         """
@@ -56,12 +216,16 @@ class MongoConnection(object):
         Create the structure in the db
         """
         self.structures.insert(structure)
+        if self.structure_cache is not None:
+            self.structure_cache.set(structure)
 
     def update_structure(self, structure):
         """
         Update the db record for structure
         """
         self.structures.update({'_id': structure['_id']}, structure)
+        if self.structure_cache is not None:
+            self.structure_cache.update(structure)
 
     def get_course_index(self, key):
         """
@@ -67,7 +67,7 @@ from .caching_descriptor_system import CachingDescriptorSystem
 from xblock.fields import Scope
 from xblock.runtime import Mixologist
 from bson.objectid import ObjectId
-from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection
+from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, StructureCache
 
 log = logging.getLogger(__name__)
 #==============================================================================
@@ -100,20 +100,38 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
                  default_class=None,
                  error_tracker=null_error_tracker,
                  loc_mapper=None,
+                 structure_cache_size=0,
+                 share_structure_cache=False,
+                 course_cache_size=20,
                  **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param structure_cache_size: the number of structures to keep in a cache shared by all threads
+            of the process. 0 disables the cache.
+        :param share_structure_cache: if True, also keep cached structures in the
+            metadata_inheritance_cache_subsystem so that other processes can use them.
+            Their revision tokens are kept there regardless (see StructureCache).
+        :param course_cache_size: the number of course descriptor systems each thread keeps
         """
 
         super(SplitMongoModuleStore, self).__init__(**kwargs)
         self.loc_mapper = loc_mapper
 
-        self.db_connection = MongoConnection(**doc_store_config)
+        structure_cache = None
+        if structure_cache_size:
+            structure_cache = StructureCache(
+                structure_cache_size,
+                tz_aware=doc_store_config.get('tz_aware', True),
+                shared_cache=self.metadata_inheritance_cache_subsystem,
+                share_structures=share_structure_cache,
+            )
+        self.db_connection = MongoConnection(structure_cache=structure_cache, **doc_store_config)
         self.db = self.db_connection.database
 
-        # Code review question: How should I expire entries?
-        # _add_cache could use a lru mechanism to control the cache size?
+        # Descriptor systems hold descriptors that are modified as they're used, so
+        # unlike structures, they are cached per thread
         self.thread_cache = threading.local()
+        self.course_cache_size = course_cache_size
 
         if default_class is not None:
             module_path, _, class_name = default_class.rpartition('.')
@@ -196,9 +214,13 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         :param course_version_guid:
         """
         if not hasattr(self.thread_cache, 'course_cache'):
-            self.thread_cache.course_cache = {}
-        system = self.thread_cache.course_cache
-        return system.get(course_version_guid)
+            self.thread_cache.course_cache = collections.OrderedDict()
+        course_cache = self.thread_cache.course_cache
+        system = course_cache.pop(course_version_guid, None)
+        if system is not None:
+            # Reinsert the entry to mark it as the most recently used
+            course_cache[course_version_guid] = system
+        return system
 
     def _add_cache(self, course_version_guid, system):
         """
@@ -207,8 +229,12 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         :param system:
         """
         if not hasattr(self.thread_cache, 'course_cache'):
-            self.thread_cache.course_cache = {}
-        self.thread_cache.course_cache[course_version_guid] = system
+            self.thread_cache.course_cache = collections.OrderedDict()
+        course_cache = self.thread_cache.course_cache
+        course_cache.pop(course_version_guid, None)
+        course_cache[course_version_guid] = system
+        while len(course_cache) > self.course_cache_size:
+            course_cache.popitem(last=False)
         return system
 
     def _clear_cache(self, course_version_guid=None):
@@ -217,9 +243,10 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         :param course_version_guid: if provided, clear only this entry
         """
         if course_version_guid:
-            del self.thread_cache.course_cache[course_version_guid]
+            # The entry may already have been evicted
+            self.thread_cache.course_cache.pop(course_version_guid, None)
         else:
-            self.thread_cache.course_cache = {}
+            self.thread_cache.course_cache = collections.OrderedDict()
 
     def _lookup_course(self, course_locator):
         '''
@@ -6,6 +6,9 @@ from itertools import ifilter
 # pylint: enable=E0611
 import pymongo
 import logging
+import threading
+from mock import Mock, patch
+from path import path
 from uuid import uuid4
 
 from xblock.fields import Scope
@@ -15,8 +18,9 @@ from xblock.exceptions import InvalidScopeError
 from xmodule.tests import DATA_DIR
 from xmodule.modulestore import Location, MONGO_MODULESTORE_TYPE
 from xmodule.modulestore.mongo import MongoModuleStore, MongoKeyValueStore
+from xmodule.modulestore.mongo.base import ModuleDataCache
 from xmodule.modulestore.draft import DraftModuleStore
-from xmodule.modulestore.xml_importer import import_from_xml, perform_xlint
+from xmodule.modulestore.xml_importer import import_from_xml, import_static_content, perform_xlint
 from xmodule.contentstore.mongo import MongoContentStore
 
 from xmodule.modulestore.tests.test_modulestore import check_path_to_location
@@ -138,6 +142,12 @@ class TestMongoModuleStore(object):
         assert self.course_with_id_exists('edX/test_unicode/2012_Fall')
         assert self.course_with_id_exists('edX/toy/2012_Fall')
 
+    def test_get_courses_for_ids(self):
+        '''Make sure several courses can be loaded at once by id'''
+        courses = self.store.get_courses_for_ids(['edX/toy/2012_Fall', 'edX/simple/2012_Fall', 'edX/nope/2012_Fall'])
+        assert_equals(sorted(courses.keys()), ['edX/simple/2012_Fall', 'edX/toy/2012_Fall'])
+        assert_equals(courses['edX/toy/2012_Fall'].location, Location('i4x://edX/toy/course/2012_Fall'))
+
     def test_loads(self):
         assert_not_equals(
             self.store.get_item("i4x://edX/toy/course/2012_Fall"),
@@ -180,10 +190,129 @@ class TestMongoModuleStore(object):
             self.store._find_one(Location("i4x://edX/toy/video/Welcome")),
             None)
 
+    def test_module_data_cache(self):
+        '''Make sure that a store with a module data cache only queries for an item once'''
+        doc_store_config = {
+            'host': HOST,
+            'db': DB,
+            'collection': COLLECTION,
+        }
+        store = MongoModuleStore(
+            doc_store_config, FS_ROOT, RENDER_TEMPLATE, default_class=DEFAULT_CLASS, module_data_cache_size=100
+        )
+        location = Location("i4x://edX/toy/chapter/Overview")
+        assert_equals(store.get_item(location, depth=1).location, location)
+
+        store.collection = Mock(wraps=store.collection)
+        chapter = store.get_item(location, depth=1)
+        assert_equals(chapter.location, location)
+        assert_not_equals(chapter.get_children(), [])
+        assert_false(store.collection.find_one.called)
+        # the only queries left are for the metadata inheritance tree
+        for call_args in store.collection.find.call_args_list:
+            assert_false('_id' in call_args[0][0])
+
     def test_path_to_location(self):
         '''Make sure that path_to_location works'''
         check_path_to_location(self.store)
 
+    def test_parent_index(self):
+        '''Make sure that a store with a cache finds parents from the course's parent index'''
+        doc_store_config = {
+            'host': HOST,
+            'db': DB,
+            'collection': COLLECTION,
+        }
+        store = MongoModuleStore(
+            doc_store_config, FS_ROOT, RENDER_TEMPLATE, default_class=DEFAULT_CLASS,
+            metadata_inheritance_cache_subsystem=DictCache()
+        )
+        check_path_to_location(store)
+
+        location = Location("i4x://edX/toy/video/Welcome")
+        assert_equals(
+            [Location(parent) for parent in self.store.get_parent_locations(location, None)],
+            store.get_parent_locations(location, None)
+        )
+
+        # once built, the index answers without querying
+        store.collection = Mock(wraps=store.collection)
+        store.get_parent_locations(location, None)
+        assert_false(store.collection.find.called)
+
+    def test_bulk_write_operations(self):
+        '''Make sure that bulk writes to an item are combined, and signal once'''
+        doc_store_config = {
+            'host': HOST,
+            'db': DB,
+            'collection': COLLECTION,
+        }
+        store = MongoModuleStore(doc_store_config, FS_ROOT, RENDER_TEMPLATE, default_class=DEFAULT_CLASS)
+        store.modulestore_update_signal = Mock()
+        location = Location('i4x', 'edX', 'bulk', 'html', 'test')
+
+        try:
+            with patch.object(store.collection, 'update', wraps=store.collection.update) as update:
+                with store.bulk_write_operations(location):
+                    store.update_item(location, '<p>bulk</p>')
+                    store.update_metadata(location, {'display_name': 'Bulk'})
+                    assert_false(update.called)
+                    # reading the item writes it first
+                    assert_equals(store._find_one(location)['metadata'], {'display_name': 'Bulk'})
+                    assert_equals(update.call_count, 1)
+                    store.update_children(location, [])
+                    assert_false(store.modulestore_update_signal.send.called)
+
+            assert_equals(update.call_count, 2)
+            assert_equals(store.modulestore_update_signal.send.call_count, 1)
+            item = store.collection.find_one({'_id': location.dict()})
+            assert_equals(item['definition'], {'data': '<p>bulk</p>', 'children': []})
+            assert_equals(item['metadata'], {'display_name': 'Bulk'})
+        finally:
+            store.collection.remove({'_id': location.dict()})
+
+    def test_bulk_write_operations_failure(self):
+        '''Make sure that the course is refreshed and signalled even if the bulk writes fail'''
+        doc_store_config = {
+            'host': HOST,
+            'db': DB,
+            'collection': COLLECTION,
+        }
+        store = MongoModuleStore(doc_store_config, FS_ROOT, RENDER_TEMPLATE, default_class=DEFAULT_CLASS)
+        store.modulestore_update_signal = Mock()
+        location = Location('i4x', 'edX', 'bulk', 'html', 'test')
+        edit_version = store.get_edit_version(location)
+
+        with patch.object(store, '_write_single_item', side_effect=ValueError):
+            with assert_raises(ValueError):
+                with store.bulk_write_operations(location):
+                    store.update_metadata(location, {'display_name': 'Bulk'})
+
+        assert_equals(store.modulestore_update_signal.send.call_count, 1)
+        assert_not_equals(store.get_edit_version(location), edit_version)
+
+    def test_bulk_write_operations_other_threads(self):
+        '''Make sure that writes from other threads aren't held back by bulk writes'''
+        doc_store_config = {
+            'host': HOST,
+            'db': DB,
+            'collection': COLLECTION,
+        }
+        store = MongoModuleStore(doc_store_config, FS_ROOT, RENDER_TEMPLATE, default_class=DEFAULT_CLASS)
+        store.modulestore_update_signal = Mock()
+        location = Location('i4x', 'edX', 'bulk', 'html', 'test')
+
+        try:
+            with store.bulk_write_operations(location):
+                thread = threading.Thread(target=store.update_metadata, args=(location, {'display_name': 'Other'}))
+                thread.start()
+                thread.join()
+                assert_equals(store.modulestore_update_signal.send.call_count, 1)
+                item = store.collection.find_one({'_id': location.dict()})
+                assert_equals(item['metadata'], {'display_name': 'Other'})
+        finally:
+            store.collection.remove({'_id': location.dict()})
+
     def test_xlinter(self):
         '''
         Run through the xlinter, we know the 'toy' course has violations, but the
@@ -218,6 +347,23 @@ class TestMongoModuleStore(object):
         assert_equals('Resources', get_tab_name(3))
         assert_equals('Discussion', get_tab_name(4))
 
+    def test_import_static_content_unchanged(self):
+        """
+        Test that importing static content again doesn't save the unchanged files.
+        """
+        content_store = TestMongoModuleStore.content_store
+        namespace = Location('i4x', 'edX', 'toy_reimport', 'course', '2012_Fall')
+        course_data_path = path(DATA_DIR) / 'toy'
+        remap_dict = import_static_content(None, None, course_data_path, content_store, namespace)
+        assert_in('sample_static.txt', remap_dict)
+
+        with patch.object(content_store, 'save') as save:
+            assert_equals(
+                import_static_content(None, None, course_data_path, content_store, namespace),
+                remap_dict
+            )
+        assert_false(save.called)
+
     def test_contentstore_attrs(self):
         """
         Test getting, setting, and defaulting the locked attr and arbitrary attrs.
@@ -273,6 +419,20 @@ class TestMongoModuleStore(object):
         )
 
 
+class DictCache(dict):
+    """
+    A minimal stand-in for a django cache, for the metadata inheritance cache subsystem
+    """
+    def get(self, key, default=None):
+        return super(DictCache, self).get(key, default)
+
+    def set(self, key, value):
+        self[key] = value
+
+    def add(self, key, value):
+        self.setdefault(key, value)
+
+
 class TestMongoKeyValueStore(object):
     """
     Tests for MongoKeyValueStore.
@@ -347,3 +507,36 @@ class TestMongoKeyValueStore(object):
         for scope in (Scope.preferences, Scope.user_info, Scope.user_state, Scope.parent):
             with assert_raises(InvalidScopeError):
                 self.kvs.delete(KeyValueStore.Key(scope, None, None, 'foo'))
+
+
+class TestModuleDataCache(object):
+    """
+    Tests for ModuleDataCache.
+    """
+
+    def setUp(self):
+        self.cache = ModuleDataCache(2)
+        self.location = Location('i4x://org/course/category/name')
+        self.item = {'_id': self.location.dict(), 'metadata': {'meta': 'meta_val'}}
+
+    def test_get(self):
+        self.cache.set(self.location, 'v1', self.item)
+        assert_equals(self.item, self.cache.get(self.location, 'v1'))
+        assert_equals(None, self.cache.get(self.location, 'v2'))
+        # a stale entry is dropped
+        assert_equals(None, self.cache.get(self.location, 'v1'))
+
+    def test_copies(self):
+        self.cache.set(self.location, 'v1', self.item)
+        self.item['metadata']['meta'] = 'changed'
+        self.cache.get(self.location, 'v1')['metadata']['meta'] = 'changed again'
+        assert_equals('meta_val', self.cache.get(self.location, 'v1')['metadata']['meta'])
+
+    def test_least_recently_used_evicted(self):
+        other_locations = [self.location.replace(name=name) for name in ('a', 'b')]
+        self.cache.set(self.location, 'v1', self.item)
+        self.cache.set(other_locations[0], 'v1', self.item)
+        self.cache.get(self.location, 'v1')
+        self.cache.set(other_locations[1], 'v1', self.item)
+        assert_equals(None, self.cache.get(other_locations[0], 'v1'))
+        assert_equals(self.item, self.cache.get(self.location, 'v1'))
@@ -21,6 +21,10 @@ from path import path
 import re
 import random
 
+from bson.objectid import ObjectId
+from mock import Mock
+from xmodule.modulestore.split_mongo.mongo_connection import StructureCache
+
 
 class SplitModuleTest(unittest.TestCase):
     '''
@@ -1216,6 +1220,74 @@ class TestPublish(SplitModuleTest):
         self.assertEqual(dest_cursor, len(dest_children))
 
 
+class TestStructureCache(unittest.TestCase):
+    """
+    Test the process-wide structure cache
+    """
+    def setUp(self):
+        self.structure_cache = StructureCache(2)
+
+    @staticmethod
+    def make_structure():
+        """Return a minimal structure with a new _id"""
+        return {'_id': ObjectId(), 'root': 'head', 'blocks': {'head': {'category': 'course', 'fields': {}}}}
+
+    def test_get_returns_copies(self):
+        structure = self.make_structure()
+        self.structure_cache.set(structure)
+        cached = self.structure_cache.get(structure['_id'])
+        self.assertEqual(cached, structure)
+        cached['blocks']['head']['fields']['display_name'] = 'changed'
+        self.assertEqual(self.structure_cache.get(structure['_id']), structure)
+
+    def test_least_recently_used_evicted(self):
+        structures = [self.make_structure() for _ in range(3)]
+        self.structure_cache.set(structures[0])
+        self.structure_cache.set(structures[1])
+        self.structure_cache.get(structures[0]['_id'])
+        self.structure_cache.set(structures[2])
+        self.assertIsNone(self.structure_cache.get(structures[1]['_id']))
+        self.assertEqual(self.structure_cache.get(structures[0]['_id']), structures[0])
+
+    @staticmethod
+    def make_shared_cache():
+        """Return a dict-backed stand-in for a django cache"""
+        shared = {}
+        return Mock(get=shared.get, set=shared.__setitem__, add=shared.setdefault)
+
+    def test_shared_cache(self):
+        shared_cache = self.make_shared_cache()
+        structure = self.make_structure()
+        StructureCache(2, shared_cache=shared_cache).set(structure)
+        # another process finds it in the shared cache
+        self.assertEqual(StructureCache(2, shared_cache=shared_cache).get(structure['_id']), structure)
+
+    def test_update_invalidates_other_processes(self):
+        for share_structures in (True, False):
+            shared_cache = self.make_shared_cache()
+            structure = self.make_structure()
+            other_process = StructureCache(2, shared_cache=shared_cache, share_structures=share_structures)
+            other_process.set(structure)
+
+            structure['blocks']['head']['fields']['display_name'] = 'changed'
+            StructureCache(2, shared_cache=shared_cache, share_structures=share_structures).update(structure)
+            if share_structures:
+                self.assertEqual(other_process.get(structure['_id']), structure)
+            else:
+                self.assertIsNone(other_process.get(structure['_id']))
+
+    def test_fetched_before_update(self):
+        # A copy fetched before an update is cached at the revision read before fetching
+        shared_cache = self.make_shared_cache()
+        structure = self.make_structure()
+        cache = StructureCache(2, shared_cache=shared_cache, share_structures=False)
+        revision = cache.revision(structure['_id'])
+        updated = dict(structure, root='changed')
+        StructureCache(2, shared_cache=shared_cache, share_structures=False).update(updated)
+        cache.set(structure, revision)
+        self.assertIsNone(cache.get(structure['_id']))
+
+
 #===========================================
 # This mocks the django.modulestore() function and is intended purely to disentangle
 # the tests from django
@@ -1,6 +1,9 @@
+import hashlib
 import logging
 import os
 import mimetypes
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
 from path import path
 import json
 
@@ -15,9 +18,74 @@ from .store_utilities import rewrite_nonportable_content_links
 
 log = logging.getLogger(__name__)
 
+# The size of the reads static content is imported in
+STATIC_CONTENT_CHUNK_SIZE = 256 * 1024
+
+# How many static content files are imported at once
+STATIC_CONTENT_IMPORT_THREADS = 4
+
+
+def _file_md5(file_path):
+    """
+    Return the hex md5 digest of the file at file_path, as GridFS computes it.
+    """
+    md5 = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(STATIC_CONTENT_CHUNK_SIZE), ''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _import_static_file(static_content_store, stored_assets, content_path, content_loc, attrs):
+    """
+    Save the file at content_path into the static_content_store as content_loc,
+    with the attrs (contentType, displayname, import_path and locked).
+
+    If the asset stored there, according to stored_assets, has the same md5
+    as the file, only the attrs which changed are updated.
+
+    Returns whether the file was saved.
+    """
+    stored = stored_assets.get(content_loc.name)
+    if stored is not None and stored.get('md5') == _file_md5(content_path):
+        changed_attrs = dict(
+            (attr, value) for attr, value in attrs.iteritems() if stored.get(attr) != value
+        )
+        if changed_attrs:
+            static_content_store.set_attrs(content_loc, changed_attrs)
+        return False
+
+    with open(content_path, 'rb') as asset_file:
+        # stream the file into the content store, rather than reading
+        # all of a (possibly large) asset into memory
+        content = StaticContent(
+            content_loc, attrs['displayname'], attrs['contentType'],
+            iter(lambda: asset_file.read(STATIC_CONTENT_CHUNK_SIZE), ''),
+            import_path=attrs['import_path'], locked=attrs['locked']
+        )
+        try:
+            static_content_store.save(content)
+        except Exception as err:
+            log.exception('Error importing {0}, error={1}'.format(attrs['import_path'], err))
+            return False
+    return True
+
 
 def import_static_content(modules, course_loc, course_data_path, static_content_store, target_location_namespace,
-                          subpath='static', verbose=False):
+                          subpath='static', verbose=False, defer_thumbnails=None):
+    """
+    Import the files in the subpath directory of the course into the
+    static_content_store, returning the map of their paths to their names in
+    the store.
+
+    The files are saved by a pool of STATIC_CONTENT_IMPORT_THREADS threads.
+    Files which are already in the store, unchanged, aren't saved again.
+
+    The thumbnails of the images saved are generated after all the files are
+    saved, unless defer_thumbnails is given: then it is called with the list
+    of their locations, to generate them in the background (see
+    MongoContentStore.generate_thumbnails).
+    """
 
     remap_dict = {}
 
@@ -33,6 +101,13 @@ def import_static_content(modules, course_loc, course_data_path, static_content_
 
     verbose = True
 
+    # what the store already has, so unchanged files aren't uploaded again
+    stored_assets = dict(
+        (asset['_id']['name'], asset)
+        for asset in static_content_store.get_all_content_for_course(target_location_namespace)
+    )
+    static_files = []
+
     for dirname, _, filenames in os.walk(static_dir):
         for filename in filenames:
 
@@ -40,15 +115,9 @@ def import_static_content(modules, course_loc, course_data_path, static_content_
             if verbose:
                 log.debug('importing static content %s...', content_path)
 
-            try:
-                with open(content_path, 'rb') as f:
-                    data = f.read()
-            except IOError:
-                if filename.startswith('._'):
-                    # OS X "companion files". See http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
-                    continue
-                # Not a 'hidden file', then re-raise exception
-                raise
+            if filename.startswith('._') and not os.access(content_path, os.R_OK):
+                # OS X "companion files". See http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
+                continue
 
             fullname_with_subpath = content_path.replace(static_dir, '')  # strip away leading path from the name
             if fullname_with_subpath.startswith('/'):
@@ -57,29 +126,41 @@ def import_static_content(modules, course_loc, course_data_path, static_content_
 
 
             policy_ele = policy.get(content_loc.name, {})
-            displayname = policy_ele.get('displayname', filename)
-            locked = policy_ele.get('locked', False)
-            mime_type = policy_ele.get('contentType', mimetypes.guess_type(filename)[0])
-            content = StaticContent(
-                content_loc, displayname, mime_type, data,
-                import_path=fullname_with_subpath, locked=locked
-            )
-
-            # first let's save a thumbnail so we can get back a thumbnail location
-            (thumbnail_content, thumbnail_location) = static_content_store.generate_thumbnail(content)
-
-            if thumbnail_content is not None:
-                content.thumbnail_location = thumbnail_location
-
-            #then commit the content
-            try:
-                static_content_store.save(content)
-            except Exception as err:
-                log.exception('Error importing {0}, error={1}'.format(fullname_with_subpath, err))
+            attrs = {
+                'displayname': policy_ele.get('displayname', filename),
+                'locked': policy_ele.get('locked', False),
+                'contentType': policy_ele.get('contentType', mimetypes.guess_type(filename)[0]),
+                'import_path': fullname_with_subpath,
+            }
+            static_files.append((content_path, content_loc, attrs))
 
             #store the remapping information which will be needed to subsitute in the module data
             remap_dict[fullname_with_subpath] = content_loc.name
 
+    if not static_files:
+        return remap_dict
+
+    pool = ThreadPool(STATIC_CONTENT_IMPORT_THREADS)
+    try:
+        saved = pool.map(
+            lambda static_file: _import_static_file(static_content_store, stored_assets, *static_file),
+            static_files
+        )
+    finally:
+        pool.close()
+        pool.join()
+
+    thumbnail_locations = [
+        content_loc
+        for (_, content_loc, attrs), was_saved in zip(static_files, saved)
+        if was_saved and attrs['contentType'] is not None and attrs['contentType'].split('/')[0] == 'image'
+    ]
+    if thumbnail_locations:
+        if defer_thumbnails is not None:
+            defer_thumbnails(thumbnail_locations)
+        else:
+            static_content_store.generate_thumbnails(thumbnail_locations)
+
     return remap_dict
 
 
@@ -87,7 +168,7 @@ def import_from_xml(store, data_dir, course_dirs=None,
                     default_class='xmodule.raw_module.RawDescriptor',
                     load_error_modules=True, static_content_store=None, target_location_namespace=None,
                     verbose=False, draft_store=None,
-                    do_import_static=True):
+                    do_import_static=True, defer_thumbnails=None):
     """
     Import the specified xml data_dir into the "store" modulestore,
     using org and course as the location org and course.
@@ -104,6 +185,9 @@ def import_from_xml(store, data_dir, course_dirs=None,
                       have substantial unchanging static content, which is to inefficient to import every time the course is loaded.
                       Static content for some courses may also be served directly by nginx, instead of going through django.
 
+    defer_thumbnails: if given, it's called with the locations of the static content images imported, whose thumbnails
+                      it should generate in the background, rather than during the import.
+
     """
 
     xml_module_store = XMLModuleStore(
@@ -121,18 +205,13 @@ def import_from_xml(store, data_dir, course_dirs=None,
     for course_id in xml_module_store.modules.keys():
 
         if target_location_namespace is not None:
-            pseudo_course_id = '/'.join([target_location_namespace.org, target_location_namespace.course])
+            bulk_location = target_location_namespace
         else:
-            course_id_components = course_id.split('/')
-            pseudo_course_id = '/'.join([course_id_components[0], course_id_components[1]])
-
-        try:
-            # turn off all write signalling while importing as this is a high volume operation
-            # on stores that need it
-            if (hasattr(store, 'ignore_write_events_on_courses') and
-                    pseudo_course_id not in store.ignore_write_events_on_courses):
-                store.ignore_write_events_on_courses.append(pseudo_course_id)
+            bulk_location = Location(['i4x'] + course_id.split('/')[:2] + ['course', None])
 
+        # turn off all write signalling while importing as this is a high volume operation
+        # on stores that need it
+        with _bulk_write_operations(store, bulk_location):
             course_data_path = None
             course_location = None
 
@@ -178,7 +257,8 @@ def import_from_xml(store, data_dir, course_dirs=None,
 
                 # first pass to find everything in /static/
                 import_static_content(xml_module_store.modules[course_id], course_location, course_data_path, static_content_store,
-                                      _namespace_rename, subpath='static', verbose=verbose)
+                                      _namespace_rename, subpath='static', verbose=verbose,
+                                      defer_thumbnails=defer_thumbnails)
 
             elif verbose and not do_import_static:
                 log.debug('Skipping import of static content, since do_import_static={0}'.format(do_import_static))
@@ -195,7 +275,8 @@ def import_from_xml(store, data_dir, course_dirs=None,
                 _namespace_rename = target_location_namespace if target_location_namespace is not None else course_location
 
                 import_static_content(xml_module_store.modules[course_id], course_location, course_data_path, static_content_store,
-                                      _namespace_rename, subpath=simport, verbose=verbose)
+                                      _namespace_rename, subpath=simport, verbose=verbose,
+                                      defer_thumbnails=defer_thumbnails)
 
             # finally loop through all the modules
             for module in xml_module_store.modules[course_id].itervalues():
@@ -217,28 +298,35 @@ def import_from_xml(store, data_dir, course_dirs=None,
 
             # now import any 'draft' items
             if draft_store is not None:
-                import_course_draft(
-                    xml_module_store,
-                    store,
-                    draft_store,
-                    course_data_path,
-                    static_content_store,
-                    course_location,
-                    target_location_namespace if target_location_namespace else course_location
-                )
-
-        finally:
-            # turn back on all write signalling on stores that need it
-            if (hasattr(store, 'ignore_write_events_on_courses') and
-                    pseudo_course_id in store.ignore_write_events_on_courses):
-                store.ignore_write_events_on_courses.remove(pseudo_course_id)
-                store.refresh_cached_metadata_inheritance_tree(
-                    target_location_namespace if target_location_namespace is not None else course_location
-                )
+                # the draft store reads what store has written
+                if hasattr(store, 'flush_bulk_writes'):
+                    store.flush_bulk_writes()
+                with _bulk_write_operations(draft_store, bulk_location):
+                    import_course_draft(
+                        xml_module_store,
+                        store,
+                        draft_store,
+                        course_data_path,
+                        static_content_store,
+                        course_location,
+                        target_location_namespace if target_location_namespace else course_location
+                    )
 
     return xml_module_store, course_items
 
 
+@contextmanager
+def _bulk_write_operations(store, location):
+    """
+    Write to the course containing location in bulk, on stores that support it
+    """
+    if hasattr(store, 'bulk_write_operations'):
+        with store.bulk_write_operations(location):
+            yield
+    else:
+        yield
+
+
 def import_module(module, store, course_data_path, static_content_store,
                   source_course_location, dest_course_location, allow_not_found=False,
                   do_import_static=True):
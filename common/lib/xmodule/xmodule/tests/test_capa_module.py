@@ -88,7 +88,8 @@ class CapaFactory(object):
                problem_state=None,
                correct=False,
                done=None,
-               text_customization=None
+               text_customization=None,
+               seed_pool_size=None
                ):
         """
         All parameters are optional, and are added to the created problem if specified.
@@ -126,6 +127,8 @@ class CapaFactory(object):
             field_data['done'] = done
         if text_customization is not None:
             field_data['text_customization'] = text_customization
+        if seed_pool_size is not None:
+            field_data['seed_pool_size'] = seed_pool_size
 
         descriptor = Mock(weight="1")
         if problem_state is not None:
@@ -783,6 +786,26 @@ class CapaModuleTest(unittest.TestCase):
         # Expect that the problem was NOT reset
         self.assertTrue('success' in result and not result['success'])
 
+    def test_seed_pool(self):
+        # Randomized problems with a seed pool only get seeds from the pool
+        for rerandomize in ['always', 'onreset', 'per_student']:
+            module = CapaFactory.create(rerandomize=rerandomize, seed_pool_size=5)
+            self.assertEqual(module.seed_pool(), range(5))
+            for _ in range(20):
+                module.choose_new_seed()
+                self.assertIn(module.seed, module.seed_pool())
+
+        # Problems that aren't randomized, or have no pool, don't have one
+        self.assertIsNone(CapaFactory.create(rerandomize='never', seed_pool_size=5).seed_pool())
+        self.assertIsNone(CapaFactory.create(rerandomize='always').seed_pool())
+
+    def test_warm_seed_pool(self):
+        module = CapaFactory.create(rerandomize='always', seed_pool_size=3)
+        with patch('xmodule.capa_module.LoncapaProblem') as mock_problem:
+            self.assertEqual(module.warm_seed_pool(), 3)
+        seeds = [kwargs['seed'] for _args, kwargs in mock_problem.call_args_list]
+        self.assertEqual(seeds, [0, 1, 2])
+
     def test_rescore_problem_correct(self):
 
         module = CapaFactory.create(attempts=1, done=True)
@@ -145,3 +145,18 @@ class CourseAuthorizationTest(TestCase):
 
         # Now, course should STILL be authorized!
         self.assertTrue(CourseAuthorization.instructor_email_enabled(course_id))
+
+    @patch.dict(settings.FEATURES, {'REQUIRE_COURSE_EMAIL_AUTH': True})
+    def test_enabled_courses_auth_on(self):
+        course_ids = ['abc/123/doremi', 'abc/123/fasola', 'abc/123/tido']
+        CourseAuthorization(course_id=course_ids[0], email_enabled=True).save()
+        CourseAuthorization(course_id=course_ids[1], email_enabled=False).save()
+
+        self.assertEquals(CourseAuthorization.instructor_email_enabled_courses(course_ids), set(course_ids[:1]))
+
+    @patch.dict(settings.FEATURES, {'REQUIRE_COURSE_EMAIL_AUTH': False})
+    def test_enabled_courses_auth_off(self):
+        course_ids = ['blahx/blah101/ehhhhhhh', 'blahx/blah102/ehhhhhhh']
+        CourseAuthorization(course_id=course_ids[0], email_enabled=False).save()
+
+        self.assertEquals(CourseAuthorization.instructor_email_enabled_courses(course_ids), set(course_ids))
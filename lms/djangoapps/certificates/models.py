@@ -131,14 +131,35 @@ def certificate_status_for_student(student, course_id):
     try:
         generated_certificate = GeneratedCertificate.objects.get(
             user=student, course_id=course_id)
-        d = {'status': generated_certificate.status,
-             'mode': generated_certificate.mode}
-        if generated_certificate.grade:
-            d['grade'] = generated_certificate.grade
-        if generated_certificate.status == CertificateStatuses.downloadable:
-            d['download_url'] = generated_certificate.download_url
-
-        return d
+        return _certificate_status(generated_certificate)
     except GeneratedCertificate.DoesNotExist:
         pass
     return {'status': CertificateStatuses.unavailable, 'mode': GeneratedCertificate.MODES.honor}
+
+
+def certificate_statuses_for_student(student, course_ids):
+    '''
+    Returns a dict mapping each of course_ids to the dictionary that
+    certificate_status_for_student would return for it, using a single query.
+    '''
+    statuses = dict(
+        (course_id, {'status': CertificateStatuses.unavailable, 'mode': GeneratedCertificate.MODES.honor})
+        for course_id in course_ids
+    )
+    for generated_certificate in GeneratedCertificate.objects.filter(user=student, course_id__in=course_ids):
+        statuses[generated_certificate.course_id] = _certificate_status(generated_certificate)
+    return statuses
+
+
+def _certificate_status(generated_certificate):
+    '''
+    Returns the status dictionary for a GeneratedCertificate
+    '''
+    d = {'status': generated_certificate.status,
+         'mode': generated_certificate.mode}
+    if generated_certificate.grade:
+        d['grade'] = generated_certificate.grade
+    if generated_certificate.status == CertificateStatuses.downloadable:
+        d['download_url'] = generated_certificate.download_url
+
+    return d
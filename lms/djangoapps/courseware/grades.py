@@ -1,6 +1,8 @@
 # Compute grades using real division, with no integer truncation
 from __future__ import division
 from collections import defaultdict
+import hashlib
+import json
 import random
 import logging
 
@@ -8,22 +10,26 @@ from contextlib import contextmanager
 from collections import defaultdict
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import transaction
+from django.db import transaction, IntegrityError
 from django.test.client import RequestFactory
 
 from dogapi import dog_stats_api
 
 from courseware import courses
+from courseware.access import has_access
 from courseware.model_data import FieldDataCache
 from xblock.fields import Scope
 from xmodule import graders
 from xmodule.capa_module import CapaModule
 from xmodule.graders import Score
-from .models import StudentModule
+from .models import StudentModule, StudentSectionGrade
 from .module_render import get_module, get_module_for_descriptor
 
 log = logging.getLogger("edx.courseware")
 
+# Number of students whose StudentModules are loaded at once when bulk grading
+BULK_GRADING_CHUNK_SIZE = 100
+
 
 def yield_module_descendents(module):
     stack = module.get_display_items()
@@ -100,6 +106,107 @@ def yield_problems(request, course, student):
                 yield problem
 
 
+def _section_signature(section):
+    """
+    Return a hash of everything in a graded section (an entry of
+    `course.grading_context['graded_sections']`) that affects how it is scored,
+    so that cached scores can be discarded once the course content changes.
+
+    Descriptors can't compute their `max_score()` without being bound to a
+    student, so the content it is computed from (e.g. the XML of a problem)
+    is hashed instead.
+    """
+    signature = hashlib.sha1()
+    for descriptor in section['xmoduledescriptors']:
+        signature.update(u"{0}|{1}|{2}|{3}\n".format(
+            descriptor.location.url(),
+            getattr(descriptor, 'weight', None),
+            descriptor.graded,
+            json.dumps(descriptor.get_explicitly_set_fields_by_scope(Scope.content), sort_keys=True),
+        ).encode('utf-8'))
+    return signature.hexdigest()
+
+
+class SectionGradeCache(object):
+    """
+    Persistent cache of the scores a student earned in each graded section of a
+    course, backed by StudentSectionGrade.
+
+    Only sections that take part in `course.grading_context` are cached, and
+    never sections containing descriptors that set `always_recalculate_grades`.
+    Cached rows are invalidated per section when a grade is published (see
+    `StudentSectionGrade.invalidate`), and are ignored once the graded content
+    of their section changes.
+
+    The cache is a no-op unless FEATURES['ENABLE_PERSISTENT_GRADE_CACHE'] is set.
+    """
+    def __init__(self, student, course):
+        self.student = student
+        self.course_id = course.id
+        self.enabled = (
+            settings.FEATURES.get('ENABLE_PERSISTENT_GRADE_CACHE', False) and
+            not settings.GENERATE_PROFILE_SCORES and
+            student.is_authenticated()
+        )
+        self._signatures = {}
+        self._rows = None
+
+        if self.enabled:
+            for sections in course.grading_context['graded_sections'].itervalues():
+                for section in sections:
+                    if any(descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']):
+                        continue
+                    section_key = section['section_descriptor'].location.url()
+                    self._signatures[section_key] = _section_signature(section)
+
+    def _cached_rows(self):
+        """
+        Fetch all of the student's cached sections for the course in one query.
+        """
+        if self._rows is None:
+            self._rows = dict(
+                (row.section_key, row)
+                for row in StudentSectionGrade.objects.filter(student=self.student, course_id=self.course_id)
+            )
+        return self._rows
+
+    def get(self, location):
+        """
+        Return the cached list of Scores for the section at `location`, or None
+        if there is no up to date entry.
+        """
+        section_key = location.url()
+        if section_key not in self._signatures:
+            return None
+
+        row = self._cached_rows().get(section_key)
+        if row is None or row.content_signature != self._signatures[section_key]:
+            return None
+
+        return [Score(*score) for score in json.loads(row.scores)]
+
+    def set(self, location, scores):
+        """
+        Store the list of Scores computed for the section at `location`.
+        """
+        section_key = location.url()
+        if section_key not in self._signatures:
+            return
+
+        row = self._cached_rows().get(section_key)
+        if row is None:
+            row = StudentSectionGrade(student=self.student, course_id=self.course_id, section_key=section_key)
+        row.content_signature = self._signatures[section_key]
+        row.scores = json.dumps([list(score) for score in scores])
+        try:
+            row.save()
+        except IntegrityError:
+            # Another request cached this section concurrently; theirs is just as good.
+            log.info("Section grade for %s was cached concurrently, skipping", section_key)
+            return
+        self._rows[section_key] = row
+
+
 def answer_distributions(request, course):
     """
     Given a course_descriptor, compute frequencies of answers for each problem:
@@ -160,6 +267,7 @@ def _grade(student, request, course, keep_raw_scores):
     """
     grading_context = course.grading_context
     raw_scores = []
+    section_cache = SectionGradeCache(student, course)
 
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
@@ -170,10 +278,13 @@ def _grade(student, request, course, keep_raw_scores):
             section_descriptor = section['section_descriptor']
             section_name = section_descriptor.display_name_with_default
 
+            with manual_transaction():
+                cached_scores = section_cache.get(section_descriptor.location)
+
             # some problems have state that is updated independently of interaction
             # with the LMS, so they need to always be scored. (E.g. foldit.,
             # combinedopenended)
-            should_grade_section = any(
+            should_grade_section = cached_scores is not None or any(
                 descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
             )
 
@@ -187,7 +298,9 @@ def _grade(student, request, course, keep_raw_scores):
                         ]
                     ).exists()
 
-            if should_grade_section:
+            if cached_scores is not None:
+                scores = cached_scores
+            elif should_grade_section:
                 scores = []
 
                 def create_module(descriptor):
@@ -204,19 +317,12 @@ def _grade(student, request, course, keep_raw_scores):
                     if correct is None and total is None:
                         continue
 
-                    if settings.GENERATE_PROFILE_SCORES:  	# for debugging!
-                        if total > 1:
-                            correct = random.randrange(max(total - 2, 1), total + 1)
-                        else:
-                            correct = total
+                    scores.append(_make_score(module_descriptor, correct, total))
 
-                    graded = module_descriptor.graded
-                    if not total > 0:
-                        #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
-                        graded = False
-
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                with manual_transaction():
+                    section_cache.set(section_descriptor.location, scores)
 
+            if should_grade_section:
                 _, graded_total = graders.aggregate_scores(scores, section_name)
                 if keep_raw_scores:
                     raw_scores += scores
@@ -232,6 +338,14 @@ def _grade(student, request, course, keep_raw_scores):
 
         totaled_scores[section_format] = format_scores
 
+    return _summarize_grade(course, totaled_scores, raw_scores, keep_raw_scores)
+
+
+def _summarize_grade(course, totaled_scores, raw_scores, keep_raw_scores):
+    """
+    Run the course grader over `totaled_scores` (a dict of section format ->
+    list of section Scores) and build the grade summary returned by `grade`.
+    """
     grade_summary = course.grader.grade(totaled_scores, generate_random_scores=settings.GENERATE_PROFILE_SCORES)
 
     # We round the grade here, to make sure that the grade is an whole percentage and
@@ -247,6 +361,24 @@ def _grade(student, request, course, keep_raw_scores):
     return grade_summary
 
 
+def _make_score(module_descriptor, correct, total):
+    """
+    Build the Score of a problem that counts towards the course grade.
+    """
+    if settings.GENERATE_PROFILE_SCORES:  	# for debugging!
+        if total > 1:
+            correct = random.randrange(max(total - 2, 1), total + 1)
+        else:
+            correct = total
+
+    graded = module_descriptor.graded
+    if not total > 0:
+        #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
+        graded = False
+
+    return Score(correct, total, graded, module_descriptor.display_name_with_default)
+
+
 def grade_for_percentage(grade_cutoffs, percentage):
     """
     Returns a letter grade as defined in grading_policy (e.g. 'A' 'B' 'C' for 6.002x) or None.
@@ -314,6 +446,8 @@ def _progress_summary(student, request, course):
             # This student must not have access to the course.
             return None
 
+        section_cache = SectionGradeCache(student, course)
+
     chapters = []
     # Don't include chapters that aren't displayable (e.g. due to error)
     for chapter_module in course_module.get_display_items():
@@ -332,15 +466,28 @@ def _progress_summary(student, request, course):
                 graded = section_module.graded
                 scores = []
 
-                module_creator = section_module.xmodule_runtime.get_module
-
-                for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
-                    course_id = course.id
-                    (correct, total) = get_score(course_id, student, module_descriptor, module_creator)
-                    if correct is None and total is None:
-                        continue
-
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                cached_scores = section_cache.get(section_module.location)
+                if cached_scores is not None:
+                    for score in cached_scores:
+                        scores.append(Score(score.earned, score.possible, graded, score.section))
+                else:
+                    # The cache holds scores flagged the way _grade flags them
+                    grade_scores = []
+                    module_creator = section_module.xmodule_runtime.get_module
+
+                    for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
+                        course_id = course.id
+                        (correct, total) = get_score(course_id, student, module_descriptor, module_creator)
+                        if correct is None and total is None:
+                            continue
+
+                        scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                        grade_scores.append(Score(
+                            correct, total, module_descriptor.graded and total > 0,
+                            module_descriptor.display_name_with_default
+                        ))
+
+                    section_cache.set(section_module.location, grade_scores)
 
                 scores.reverse()
                 section_total, _ = graders.aggregate_scores(
@@ -427,11 +574,18 @@ def get_score(course_id, user, problem_descriptor, module_creator):
         if total is None:
             return (None, None)
 
-    # Now we re-weight the problem, if specified
+    return weighted_score(correct, total, problem_descriptor)
+
+
+def weighted_score(correct, total, problem_descriptor):
+    """
+    Re-weight the raw (correct, total) score of a problem according to its
+    `weight` setting, if specified. Returns the new (correct, total) tuple.
+    """
     weight = problem_descriptor.weight
     if weight is not None:
         if total == 0:
-            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(student_module))
+            log.exception("Cannot reweight a problem with zero total points. Problem: " + problem_descriptor.location.url())
             return (correct, total)
         correct = correct * weight / total
         total = weight
@@ -452,7 +606,179 @@ def manual_transaction():
         transaction.commit()
 
 
-def iterate_grades_for(course_id, students):
+class BulkGrader(object):
+    """
+    Grades many students in a course from their StudentModule rows, instead of
+    building an XModule for every problem of every student.
+
+    On creation, the graded sections of the course are flattened into a table
+    of their scored descriptors. Call `load_student_modules` with a chunk of
+    students to fetch the grade columns of all of their StudentModules at
+    once, then `grade` each of them.
+
+    XModules are still built for sections containing descriptors that set
+    `always_recalculate_grades` or have dynamic children, and once per problem
+    that a student hasn't been graded on, to fill the table of max scores with
+    its `max_score()` as `get_score` does.
+    """
+    def __init__(self, course, request):
+        self.course = course
+        self.request = request
+
+        # section location url -> scored descriptors in grading order, or None
+        # if the section can only be graded by instantiating its modules
+        self._section_descriptors = {}
+        problem_keys = set()
+        for sections in course.grading_context['graded_sections'].itervalues():
+            for section in sections:
+                section_descriptor = section['section_descriptor']
+                # Children of dynamic descriptors aren't walked; those sections use modules anyway
+                descriptors = list(yield_dynamic_descriptor_descendents(section_descriptor, lambda descriptor: None))
+                if any(d.always_recalculate_grades or d.has_dynamic_children() for d in descriptors):
+                    self._section_descriptors[section_descriptor.location.url()] = None
+                else:
+                    self._section_descriptors[section_descriptor.location.url()] = [
+                        descriptor for descriptor in descriptors if descriptor.has_score
+                    ]
+                problem_keys.update(descriptor.location.url() for descriptor in section['xmoduledescriptors'])
+        self._problem_keys = list(problem_keys)
+
+        # problem location url -> max_score() of the problem, filled in as
+        # problems are instantiated
+        self._max_scores = {}
+        self._student_modules = {}
+
+    def load_student_modules(self, students):
+        """
+        Fetch the grade columns of the StudentModules of all `students` in
+        the course with a single query, replacing any previously loaded ones.
+        """
+        self._student_modules = dict((student.id, {}) for student in students)
+        rows = StudentModule.objects.filter(
+            course_id=self.course.id,
+            student__in=self._student_modules.keys(),
+            module_state_key__in=self._problem_keys,
+        ).values_list('student_id', 'module_state_key', 'grade', 'max_grade')
+        for student_id, module_state_key, grade, max_grade in rows:
+            self._student_modules[student_id][module_state_key] = (grade, max_grade)
+
+    @transaction.commit_manually
+    def grade(self, student, keep_raw_scores=False):
+        """
+        Grade `student`, whose StudentModules must have been loaded with
+        `load_student_modules`. Returns the same summary as `grade`.
+        """
+        with manual_transaction():
+            return self._grade(student, keep_raw_scores)
+
+    def _grade(self, student, keep_raw_scores):
+        """
+        Unwrapped version of "grade"
+        """
+        course = self.course
+        student_modules = self._student_modules[student.id]
+        raw_scores = []
+
+        def create_module(descriptor):
+            '''creates an XModule instance given a descriptor'''
+            with manual_transaction():
+                field_data_cache = FieldDataCache([descriptor], course.id, student)
+            return get_module_for_descriptor(student, self.request, descriptor, field_data_cache, course.id)
+
+        totaled_scores = {}
+        for section_format, sections in course.grading_context['graded_sections'].iteritems():
+            format_scores = []
+            for section in sections:
+                section_descriptor = section['section_descriptor']
+                section_name = section_descriptor.display_name_with_default
+                descriptors = self._section_descriptors[section_descriptor.location.url()]
+                seen = any(
+                    descriptor.location.url() in student_modules for descriptor in section['xmoduledescriptors']
+                )
+
+                scores = None
+                if descriptors is None:
+                    # Fall back to instantiating modules, as `grade` does
+                    if seen or any(descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']):
+                        scores = []
+                        for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
+                            (correct, total) = get_score(course.id, student, module_descriptor, create_module)
+                            if correct is None and total is None:
+                                continue
+                            scores.append(_make_score(module_descriptor, correct, total))
+                elif seen:
+                    scores = []
+                    for module_descriptor in descriptors:
+                        (correct, total) = self._get_score(student, module_descriptor, student_modules, create_module)
+                        if correct is None and total is None:
+                            continue
+                        scores.append(_make_score(module_descriptor, correct, total))
+
+                if scores is not None:
+                    _, graded_total = graders.aggregate_scores(scores, section_name)
+                    if keep_raw_scores:
+                        raw_scores += scores
+                else:
+                    graded_total = Score(0.0, 1.0, True, section_name)
+
+                if graded_total.possible > 0:
+                    format_scores.append(graded_total)
+                else:
+                    log.exception("Unable to grade a section with a total possible score of zero. " +
+                                  str(section_descriptor.location))
+
+            totaled_scores[section_format] = format_scores
+
+        return _summarize_grade(course, totaled_scores, raw_scores, keep_raw_scores)
+
+    def _get_score(self, student, problem_descriptor, student_modules, create_module):
+        """
+        Equivalent of `get_score` that reads the student's state from the
+        loaded StudentModule grade columns, and only instantiates the problem
+        if its max score isn't in the table yet.
+        """
+        module_state_key = problem_descriptor.location.url()
+        grade, max_grade = student_modules.get(module_state_key, (None, None))
+
+        if max_grade is not None:
+            correct = grade if grade is not None else 0
+            total = max_grade
+        else:
+            # Students without access to the problem couldn't instantiate it,
+            # so it doesn't count towards their grade.
+            if not has_access(student, problem_descriptor, 'load', self.course.id):
+                return (None, None)
+
+            total = self._max_scores.get(module_state_key)
+            if total is None:
+                problem = create_module(problem_descriptor)
+                if problem is None:
+                    return (None, None)
+                total = problem.max_score()
+                # Problem may be an error module, in which case total might be None
+                if total is None:
+                    return (None, None)
+                self._max_scores[module_state_key] = total
+            correct = 0.0
+
+        return weighted_score(correct, total, problem_descriptor)
+
+
+def _chunks(items, chunk_size):
+    """
+    Yield successive lists of at most `chunk_size` elements from the iterable `items`.
+    """
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iterate_grades_for(course_id, students, bulk=False):
     """Given a course_id and an iterable of students (User), yield a tuple of:
 
     (student, gradeset, err_msg) for every student enrolled in the course.
@@ -469,6 +795,9 @@ def iterate_grades_for(course_id, students):
     - grade_breakdown : A breakdown of the major components that
         make up the final grade. (For display)
     - raw_scores: contains scores for every graded module
+
+    If `bulk` is True, students are graded with a BulkGrader, which loads the
+    StudentModules of BULK_GRADING_CHUNK_SIZE students at a time.
     """
     course = courses.get_course_by_id(course_id)
 
@@ -477,25 +806,34 @@ def iterate_grades_for(course_id, students):
     # grading that student.
     request = RequestFactory().get('/')
 
-    for student in students:
-        with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=['action:{}'.format(course_id)]):
-            try:
-                request.user = student
-                # Grading calls problem rendering, which calls masquerading,
-                # which checks session vars -- thus the empty session dict below.
-                # It's not pretty, but untangling that is currently beyond the
-                # scope of this feature.
-                request.session = {}
-                gradeset = grade(student, request, course)
-                yield student, gradeset, ""
-            except Exception as exc:  # pylint: disable=broad-except
-                # Keep marching on even if this student couldn't be graded for
-                # some reason, but log it for future reference.
-                log.exception(
-                    'Cannot grade student %s (%s) in course %s because of exception: %s',
-                    student.username,
-                    student.id,
-                    course_id,
-                    exc.message
-                )
-                yield student, {}, exc.message
+    bulk_grader = BulkGrader(course, request) if bulk else None
+
+    for student_chunk in _chunks(students, BULK_GRADING_CHUNK_SIZE):
+        if bulk_grader is not None:
+            bulk_grader.load_student_modules(student_chunk)
+
+        for student in student_chunk:
+            with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=['action:{}'.format(course_id)]):
+                try:
+                    request.user = student
+                    # Grading calls problem rendering, which calls masquerading,
+                    # which checks session vars -- thus the empty session dict below.
+                    # It's not pretty, but untangling that is currently beyond the
+                    # scope of this feature.
+                    request.session = {}
+                    if bulk_grader is not None:
+                        gradeset = bulk_grader.grade(student)
+                    else:
+                        gradeset = grade(student, request, course)
+                    yield student, gradeset, ""
+                except Exception as exc:  # pylint: disable=broad-except
+                    # Keep marching on even if this student couldn't be graded for
+                    # some reason, but log it for future reference.
+                    log.exception(
+                        'Cannot grade student %s (%s) in course %s because of exception: %s',
+                        student.username,
+                        student.id,
+                        course_id,
+                        exc.message
+                    )
+                    yield student, {}, exc.message
@@ -0,0 +1,77 @@
+"""
+A Django command that builds every variant of the problems in a course that
+have a seed pool ("Randomization Variants"), so that the results of running
+their code are in the cache before students load them.
+
+Run it after a course with such problems is published or changed.  Problems
+that haven't been released yet are only built when a --username with access
+to them, e.g. a member of the course staff, is given.
+"""
+
+import logging
+from optparse import make_option
+from textwrap import dedent
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand, CommandError
+
+from courseware.model_data import FieldDataCache
+from courseware.module_render import get_module_for_descriptor_internal
+from xmodule.course_module import CourseDescriptor
+from xmodule.modulestore import Location
+from xmodule.modulestore.django import modulestore
+
+log = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Build the variants of a course's problems that have a seed pool.
+    """
+    args = "<course_id>"
+    help = dedent(__doc__).strip()
+    option_list = BaseCommand.option_list + (
+        make_option('--username',
+                    action='store',
+                    default=None,
+                    help='Build the problems as this user, rather than anonymously'),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("course_id not specified")
+
+        course_id = args[0]
+        course_loc = CourseDescriptor.id_to_location(course_id)
+        problems = modulestore().get_items(
+            Location('i4x', course_loc.org, course_loc.course, 'problem', None),
+            course_id=course_id
+        )
+
+        if options['username']:
+            try:
+                user = User.objects.get(username=options['username'])
+            except User.DoesNotExist:
+                raise CommandError("Unknown user {0}".format(options['username']))
+        else:
+            user = AnonymousUser()
+
+        num_problems = num_variants = 0
+        for descriptor in problems:
+            if not getattr(descriptor, 'seed_pool_size', None):
+                continue
+            field_data_cache = FieldDataCache([descriptor], course_id, user)
+            module = get_module_for_descriptor_internal(
+                user, descriptor, field_data_cache, course_id,
+                lambda event_type, event: None, '',
+            )
+            if module is None:
+                continue
+            try:
+                num_variants += module.warm_seed_pool()
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Couldn't build the variants of %s", descriptor.location.url())
+                continue
+            num_problems += 1
+
+        self.stdout.write("Built {0} variants of {1} problems\n".format(num_variants, num_problems))
@@ -0,0 +1,27 @@
+"""
+Middleware for the courseware app
+"""
+from courseware.models import (
+    start_field_data_version_tracking,
+    bump_pending_field_data_versions,
+    field_data_snapshots_enabled,
+)
+
+
+class FieldDataVersionMiddleware(object):
+    """
+    Bumps the version counters of the field data changed by a request once
+    its transaction has been committed, so that a snapshot of the old rows
+    taken by a concurrent request is not reused.
+
+    This must be listed before TransactionMiddleware, so that its
+    process_response runs after the commit. It does nothing unless field
+    data snapshots are enabled.
+    """
+    def process_request(self, request):
+        if field_data_snapshots_enabled():
+            start_field_data_version_tracking()
+
+    def process_response(self, request, response):
+        bump_pending_field_data_versions()
+        return response
@@ -2,17 +2,24 @@
 Classes to provide the LMS runtime data storage to XBlocks
 """
 
+import copy
+import hashlib
 import json
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from contextlib import contextmanager
 from itertools import chain
 from .models import (
     StudentModule,
     XModuleUserStateSummaryField,
     XModuleStudentPrefsField,
-    XModuleStudentInfoField
+    XModuleStudentInfoField,
+    field_data_version_key,
+    new_field_data_version,
 )
 import logging
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import DatabaseError
 from django.contrib.auth.models import User
 
@@ -22,6 +29,12 @@ from xblock.fields import Scope, UserScope
 
 log = logging.getLogger(__name__)
 
+# How long a snapshot of a user's field data is kept in the cache, in seconds
+SNAPSHOT_TIMEOUT = 60 * 60
+
+# Snapshots name the scope of each row rather than pickling Scope objects
+SNAPSHOT_SCOPE_NAMES = ('user_state', 'user_state_summary', 'preferences', 'user_info')
+
 
 class InvalidWriteError(Exception):
     """
@@ -43,7 +56,7 @@ class FieldDataCache(object):
     A cache of django model objects needed to supply the data
     for a module and its decendants
     """
-    def __init__(self, descriptors, course_id, user, select_for_update=False):
+    def __init__(self, descriptors, course_id, user, select_for_update=False, use_snapshot=False):
         '''
         Find any courseware.models objects that are needed by any descriptor
         in descriptors. Attempts to minimize the number of queries to the database.
@@ -55,22 +68,111 @@ class FieldDataCache(object):
         course_id: The id of the current course
         user: The user for which to cache data
         select_for_update: True if rows should be locked until end of transaction
+        use_snapshot: True if the rows may be loaded from a cached snapshot taken
+            by an earlier request for the same descriptors, as long as none of
+            the rows it could contain have changed since. Ignored if
+            select_for_update is set.
         '''
         self.cache = {}
         self.descriptors = descriptors
         self.select_for_update = select_for_update
         self.course_id = course_id
         self.user = user
+        # Maps id(field_object) to a (raw state, parsed state) pair for StudentModules
+        self._parsed_states = {}
+        # Field objects waiting to be saved when the active deferred_writes() block exits,
+        # and the functions to call once they are
+        self._deferred_saves = None
+        self._deferred_callbacks = []
 
         if user.is_authenticated():
-            for scope, fields in self._fields_to_cache().items():
-                for field_object in self._retrieve_fields(scope, fields):
-                    self.cache[self._cache_key_from_field_object(scope, field_object)] = field_object
+            if (use_snapshot and not select_for_update and
+                    settings.FEATURES.get('ENABLE_FIELD_DATA_SNAPSHOTS')):
+                self._load_from_snapshot()
+            else:
+                self._load_from_db()
+
+    def _load_from_db(self):
+        """
+        Query the database for the field objects needed by self.descriptors
+        """
+        for scope, fields in self._fields_to_cache().items():
+            for field_object in self._retrieve_fields(scope, fields):
+                self.cache[self._cache_key_from_field_object(scope, field_object)] = field_object
+
+    def _load_from_snapshot(self):
+        """
+        Load the field objects from the cached snapshot for self.descriptors if
+        it is still current, and otherwise query the database and store a new
+        snapshot.
+
+        A snapshot records the versions of all of the rows it could contain at
+        the time it was taken. Any write to one of those rows bumps its version
+        (see courseware.models), which makes the snapshot stale.
+        """
+        version_keys = sorted(self._version_keys())
+        descriptors_hash = hashlib.sha1()
+        for url in sorted(descriptor.location.url() for descriptor in self.descriptors):
+            descriptors_hash.update(url)
+        snapshot_key = 'field_data_snapshot.{0}.{1}.{2}'.format(
+            self.user.id, self.course_id, descriptors_hash.hexdigest()
+        )
+
+        cached = cache.get_many(version_keys + [snapshot_key])
+        missing = dict(
+            (version_key, new_field_data_version())
+            for version_key in version_keys
+            if version_key not in cached
+        )
+        if missing:
+            cache.set_many(missing)
+            cached.update(missing)
+        versions = [cached[version_key] for version_key in version_keys]
+
+        snapshot = cached.get(snapshot_key)
+        if snapshot is not None and snapshot[0] == versions:
+            for scope_name, field_object in snapshot[1]:
+                scope = getattr(Scope, scope_name)
+                self.cache[self._cache_key_from_field_object(scope, field_object)] = field_object
+            return
+
+        # The versions were read before querying, so a write made while the
+        # snapshot is being built leaves it stale rather than wrong
+        self._load_from_db()
+        rows = []
+        for scope_name in SNAPSHOT_SCOPE_NAMES:
+            scope = getattr(Scope, scope_name)
+            rows.extend(
+                (scope_name, field_object)
+                for cache_key, field_object in self.cache.iteritems()
+                if cache_key[0] == scope
+            )
+        cache.set(snapshot_key, (versions, rows), SNAPSHOT_TIMEOUT)
+
+    def _version_keys(self):
+        """
+        Return the set of field data version keys of the rows that
+        _load_from_db could return
+        """
+        user_id = self.user.id
+        scopes = self._fields_to_cache()
+        keys = set()
+        for descriptor in self.descriptors:
+            url = descriptor.location.url()
+            if Scope.user_state in scopes:
+                keys.add(field_data_version_key('user_state', user_id, url))
+            if Scope.user_state_summary in scopes:
+                keys.add(field_data_version_key('user_state_summary', url))
+            if Scope.preferences in scopes:
+                keys.add(field_data_version_key('preferences', user_id, descriptor.module_class.__name__))
+        if Scope.user_info in scopes:
+            keys.add(field_data_version_key('user_info', user_id))
+        return keys
 
     @classmethod
     def cache_for_descriptor_descendents(cls, course_id, user, descriptor, depth=None,
                                          descriptor_filter=lambda descriptor: True,
-                                         select_for_update=False):
+                                         select_for_update=False, use_snapshot=False):
         """
         course_id: the course in the context of which we want StudentModules.
         user: the django user for whom to load modules.
@@ -80,6 +182,7 @@ class FieldDataCache(object):
         descriptor_filter is a function that accepts a descriptor and return wether the StudentModule
             should be cached
         select_for_update: Flag indicating whether the rows should be locked until end of transaction
+        use_snapshot: Flag indicating whether the rows may be loaded from a cached snapshot
         """
 
         def get_child_descriptors(descriptor, depth, descriptor_filter):
@@ -107,7 +210,25 @@ class FieldDataCache(object):
 
         descriptors = get_child_descriptors(descriptor, depth, descriptor_filter)
 
-        return FieldDataCache(descriptors, course_id, user, select_for_update)
+        return FieldDataCache(descriptors, course_id, user, select_for_update, use_snapshot)
+
+    @classmethod
+    def for_student_module(cls, descriptor, student_module):
+        """
+        Return a FieldDataCache for `descriptor` and the student of `student_module`,
+        their StudentModule for it, without querying for that row again. Fields in
+        other scopes are queried for as usual.
+        """
+        field_data_cache = cls([], student_module.course_id, student_module.student)
+        field_data_cache.descriptors = [descriptor]
+        for scope, fields in field_data_cache._fields_to_cache().items():
+            if scope == Scope.user_state:
+                field_objects = [student_module]
+            else:
+                field_objects = field_data_cache._retrieve_fields(scope, fields)
+            for field_object in field_objects:
+                field_data_cache.cache[field_data_cache._cache_key_from_field_object(scope, field_object)] = field_object
+        return field_data_cache
 
     def _query(self, model_class, **kwargs):
         """
@@ -263,6 +384,101 @@ class FieldDataCache(object):
         self.cache[cache_key] = field_object
         return field_object
 
+    def load_state(self, field_object):
+        """
+        Return the parsed `state` of the StudentModule `field_object`. The json
+        is only parsed again if `state` has been replaced since the last call.
+
+        The returned dict is shared, and must not be modified: build a new dict
+        and pass it to `store_state` instead.
+        """
+        raw_state, state = self._parsed_states.get(id(field_object), (None, None))
+        if raw_state is None or raw_state is not field_object.state:
+            raw_state = field_object.state
+            state = json.loads(raw_state)
+            self._parsed_states[id(field_object)] = (raw_state, state)
+        return state
+
+    def store_state(self, field_object, state):
+        """
+        Serialize `state` into the StudentModule `field_object`, remembering
+        the parsed form for later calls to `load_state`
+        """
+        field_object.state = json.dumps(state)
+        self._parsed_states[id(field_object)] = (field_object.state, state)
+
+    @contextmanager
+    def deferred_writes(self):
+        """
+        Defer the saves made through `save` until the end of the block, so that
+        a field object modified several times (for instance by a handler that
+        saves its state and then publishes a grade) is written only once.
+
+        Pending saves are written even if the block raises, to match the
+        behavior of saving immediately.
+        """
+        if self._deferred_saves is not None:
+            # Already deferring; the outermost block does the writes
+            yield
+            return
+
+        self._deferred_saves = OrderedDict()
+        try:
+            yield
+        finally:
+            field_objects, self._deferred_saves = self._deferred_saves, None
+            callbacks, self._deferred_callbacks = self._deferred_callbacks, []
+            self._save_field_objects(field_objects, callbacks)
+
+    def save(self, field_objects, on_saved=None):
+        """
+        Save field objects, either immediately or when the enclosing
+        `deferred_writes` block exits.
+
+        field_objects: A dict mapping field objects to the names of the fields
+            that were changed on them
+        on_saved: A function to call once the field objects have been written
+            (or failed to be), e.g. to invalidate what is computed from them
+
+        Raises KeyValueMultiSaveError if a save fails.
+        """
+        callbacks = [on_saved] if on_saved is not None else []
+        if self._deferred_saves is None:
+            self._save_field_objects(field_objects, callbacks)
+        else:
+            for field_object, field_names in field_objects.iteritems():
+                self._deferred_saves.setdefault(field_object, []).extend(field_names)
+            self._deferred_callbacks.extend(callbacks)
+
+    def delete(self, field_object):
+        """
+        Delete field_object from the database, dropping any pending save of it
+        """
+        if self._deferred_saves is not None:
+            self._deferred_saves.pop(field_object, None)
+        field_object.delete()
+
+    def _save_field_objects(self, field_objects, callbacks=()):
+        """
+        Save each of field_objects, raising a KeyValueMultiSaveError listing
+        the fields that were saved if one of the saves fails, then call each
+        of callbacks
+        """
+        saved_fields = []
+        try:
+            for field_object, field_names in field_objects.iteritems():
+                try:
+                    field_object.save()
+                    # If save is successful on this object, add its fields to
+                    # the list of successful saves
+                    saved_fields.extend(field_names)
+                except DatabaseError:
+                    log.exception('Error saving fields %r', field_names)
+                    raise KeyValueMultiSaveError(saved_fields)
+        finally:
+            for callback in callbacks:
+                callback()
+
 
 class DjangoKeyValueStore(KeyValueStore):
     """
@@ -302,7 +518,9 @@ class DjangoKeyValueStore(KeyValueStore):
             raise KeyError(key.field_name)
 
         if key.scope == Scope.user_state:
-            return json.loads(field_object.state)[key.field_name]
+            # Copy the value so that changes made to it by the caller don't leak
+            # into the parsed state shared with other reads
+            return copy.deepcopy(self._field_data_cache.load_state(field_object)[key.field_name])
         else:
             return json.loads(field_object.value)
 
@@ -320,41 +538,33 @@ class DjangoKeyValueStore(KeyValueStore):
           xblock.DbModel._key : value
 
         """
-        saved_fields = []
-        # field_objects maps a field_object to a list of associated fields
-        field_objects = dict()
+        # field_objects maps a field_object to the names of its dirty fields
+        field_objects = {}
+        # states maps a StudentModule to its updated state, so that each row's
+        # state is parsed and serialized only once
+        states = {}
         for field in kv_dict:
             # Check field for validity
             if field.scope not in self._allowed_scopes:
                 raise InvalidScopeError(field)
 
-            # If the field is valid and isn't already in the dictionary, add it.
             field_object = self._field_data_cache.find_or_create(field)
-            if field_object not in field_objects.keys():
-                field_objects[field_object] = []
-            # Update the list of associated fields
-            field_objects[field_object].append(field)
+            field_objects.setdefault(field_object, []).append(field.field_name)
 
             # Special case when scope is for the user state, because this scope saves fields in a single row
             if field.scope == Scope.user_state:
-                state = json.loads(field_object.state)
-                state[field.field_name] = kv_dict[field]
-                field_object.state = json.dumps(state)
+                if field_object not in states:
+                    states[field_object] = dict(self._field_data_cache.load_state(field_object))
+                states[field_object][field.field_name] = copy.deepcopy(kv_dict[field])
             else:
             # The remaining scopes save fields on different rows, so
             # we don't have to worry about conflicts
                 field_object.value = json.dumps(kv_dict[field])
 
-        for field_object in field_objects:
-            try:
-                # Save the field object that we made above
-                field_object.save()
-                # If save is successful on this scope, add the saved fields to
-                # the list of successful saves
-                saved_fields.extend([field.field_name for field in field_objects[field_object]])
-            except DatabaseError:
-                log.exception('Error saving fields %r', field_objects[field_object])
-                raise KeyValueMultiSaveError(saved_fields)
+        for field_object, state in states.iteritems():
+            self._field_data_cache.store_state(field_object, state)
+
+        self._field_data_cache.save(field_objects)
 
     def delete(self, key):
         if key.scope not in self._allowed_scopes:
@@ -365,12 +575,12 @@ class DjangoKeyValueStore(KeyValueStore):
             raise KeyError(key.field_name)
 
         if key.scope == Scope.user_state:
-            state = json.loads(field_object.state)
+            state = dict(self._field_data_cache.load_state(field_object))
             del state[key.field_name]
-            field_object.state = json.dumps(state)
-            field_object.save()
+            self._field_data_cache.store_state(field_object, state)
+            self._field_data_cache.save({field_object: [key.field_name]})
         else:
-            field_object.delete()
+            self._field_data_cache.delete(field_object)
 
     def has(self, key):
         if key.scope not in self._allowed_scopes:
@@ -381,6 +591,6 @@ class DjangoKeyValueStore(KeyValueStore):
             return False
 
         if key.scope == Scope.user_state:
-            return key.field_name in json.loads(field_object.state)
+            return key.field_name in self._field_data_cache.load_state(field_object)
         else:
             return True
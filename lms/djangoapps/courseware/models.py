@@ -12,11 +12,23 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+import logging
+import threading
+import time
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
+from xmodule.modulestore import Location
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.exceptions import InvalidLocationError, ItemNotFoundError
+
+log = logging.getLogger(__name__)
+
 
 class StudentModule(models.Model):
     """
@@ -101,6 +113,85 @@ class StudentModuleHistory(models.Model):
             history_entry.save()
 
 
+class StudentSectionGrade(models.Model):
+    """
+    Caches the scores a student earned within a single graded section
+    (subsection) of a course, as computed by courseware.grades.
+
+    Rows are deleted whenever a StudentModule grade inside the section
+    changes, so the next grade computation recomputes only that section.
+    """
+
+    class Meta:
+        unique_together = (('student', 'course_id', 'section_key'),)
+
+    student = models.ForeignKey(User, db_index=True)
+    course_id = models.CharField(max_length=255, db_index=True)
+
+    # The location url of the section descriptor
+    section_key = models.CharField(max_length=255, db_index=True)
+
+    # Hash of the graded content of the section when the scores were computed.
+    # Used to discard rows that predate edits to the course.
+    content_signature = models.CharField(max_length=40)
+
+    # The scores, stored as a JSON list of [earned, possible, graded, display_name]
+    scores = models.TextField(default='[]')
+
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __repr__(self):
+        return 'StudentSectionGrade<%r>' % ({
+            'course_id': self.course_id,
+            'student': self.student.username,
+            'section_key': self.section_key,
+        },)
+
+    def __unicode__(self):
+        return unicode(repr(self))
+
+    @classmethod
+    def invalidate(cls, student_id, course_id, location):
+        """
+        Delete any cached section scores for `student_id` that may include
+        the module at `location`.
+
+        All ancestors of `location` are looked up in the modulestore, since
+        any of them may be the section that was graded. If the location can't
+        be found, every cached section for the student in the course is dropped.
+        """
+        cached_sections = cls.objects.filter(student_id=student_id, course_id=course_id)
+        if not cached_sections.exists():
+            return
+
+        try:
+            section_keys = set([Location(location).url()])
+            store = modulestore()
+            queue = [location]
+            while queue:
+                for parent in store.get_parent_locations(queue.pop(), course_id):
+                    parent = Location(parent)
+                    if parent.category == 'course' or parent.url() in section_keys:
+                        continue
+                    section_keys.add(parent.url())
+                    queue.append(parent)
+        except (ItemNotFoundError, InvalidLocationError):
+            log.warning(
+                "Could not find %s in %s, dropping all cached section grades for student %s",
+                location, course_id, student_id
+            )
+            cached_sections.delete()
+            return
+
+        cached_sections.filter(section_key__in=section_keys).delete()
+
+    @receiver(post_delete, sender=StudentModule)
+    def invalidate_deleted_module(sender, instance, **kwargs):
+        """Deleting student state may change the student's grade."""
+        StudentSectionGrade.invalidate(instance.student_id, instance.course_id, instance.module_state_key)
+
+
 class XModuleUserStateSummaryField(models.Model):
     """
     Stores data set in the Scope.user_state_summary scope by an xmodule field
@@ -196,6 +287,110 @@ class XModuleStudentInfoField(models.Model):
         return unicode(repr(self))
 
 
+def field_data_version_key(scope_name, *ids):
+    """
+    Cache key of the counter bumped whenever the field data rows identified by
+    scope_name and ids change:
+
+        'user_state', student_id, module_state_key: a StudentModule
+        'user_state_summary', usage_id: XModuleUserStateSummaryFields of a module
+        'preferences', student_id, module_type: XModuleStudentPrefsFields
+        'user_info', student_id: XModuleStudentInfoFields
+    """
+    return u'field_data_version.{0}.{1}'.format(scope_name, u'.'.join(unicode(id_) for id_ in ids))
+
+
+def new_field_data_version():
+    """
+    Starting value for a field data version counter. Using the current time
+    means that a counter evicted from the cache comes back with a value that
+    no snapshot recorded before the eviction can match.
+    """
+    return int(time.time() * 1000000)
+
+
+def _incr_field_data_version(key):
+    """Increment the counter `key`, starting a new one if it isn't cached"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, new_field_data_version())
+
+
+# Keys bumped during the current request, to be bumped again once its
+# transaction has been committed. None outside of requests.
+_pending_field_data_versions = threading.local()
+
+
+def field_data_snapshots_enabled():
+    """Whether field data snapshots, and so their version counters, are in use"""
+    return settings.FEATURES.get('ENABLE_FIELD_DATA_SNAPSHOTS', False)
+
+
+def bump_field_data_version(key):
+    """
+    Increment the field data version counter `key`, so that any snapshot
+    taken before the change is no longer used. Does nothing if snapshots
+    aren't enabled.
+
+    Inside a request, rows are only visible to other requests once the
+    request's transaction commits, so the counter is bumped again then
+    (see courseware.middleware.FieldDataVersionMiddleware).
+    """
+    if not field_data_snapshots_enabled():
+        return
+    _incr_field_data_version(key)
+    pending = getattr(_pending_field_data_versions, 'keys', None)
+    if pending is not None:
+        pending.add(key)
+
+
+def start_field_data_version_tracking():
+    """
+    Start collecting the field data version counters bumped by this thread
+    """
+    _pending_field_data_versions.keys = set()
+
+
+def bump_pending_field_data_versions():
+    """
+    Bump the field data version counters collected since
+    `start_field_data_version_tracking`, and stop collecting them
+    """
+    pending = getattr(_pending_field_data_versions, 'keys', None)
+    _pending_field_data_versions.keys = None
+    for key in pending or ():
+        _incr_field_data_version(key)
+
+
+@receiver(post_save, sender=StudentModule)
+@receiver(post_delete, sender=StudentModule)
+def student_module_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate snapshots containing the StudentModule"""
+    bump_field_data_version(field_data_version_key('user_state', instance.student_id, instance.module_state_key))
+
+
+@receiver(post_save, sender=XModuleUserStateSummaryField)
+@receiver(post_delete, sender=XModuleUserStateSummaryField)
+def user_state_summary_field_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate snapshots containing the summary field"""
+    bump_field_data_version(field_data_version_key('user_state_summary', instance.usage_id))
+
+
+@receiver(post_save, sender=XModuleStudentPrefsField)
+@receiver(post_delete, sender=XModuleStudentPrefsField)
+def student_prefs_field_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate snapshots containing the preferences field"""
+    bump_field_data_version(field_data_version_key('preferences', instance.student_id, instance.module_type))
+
+
+@receiver(post_save, sender=XModuleStudentInfoField)
+@receiver(post_delete, sender=XModuleStudentInfoField)
+def student_info_field_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate snapshots containing the info field"""
+    bump_field_data_version(field_data_version_key('user_info', instance.student_id))
+
+
 class OfflineComputedGrade(models.Model):
     """
     Table of grades computed offline for a given user and course.
@@ -20,6 +20,7 @@ from capa.xqueue_interface import XQueueInterface
 from courseware.access import has_access
 from courseware.masquerade import setup_masquerade
 from courseware.model_data import FieldDataCache, DjangoKeyValueStore
+from courseware.models import StudentSectionGrade
 from lms.lib.xblock.field_data import LmsFieldData
 from lms.lib.xblock.runtime import LmsModuleSystem, handler_prefix, unquote_slashes
 from edxmako.shortcuts import render_to_string
@@ -52,6 +53,7 @@ xqueue_interface = XQueueInterface(
     settings.XQUEUE_INTERFACE['url'],
     settings.XQUEUE_INTERFACE['django_auth'],
     requests_auth,
+    **settings.XQUEUE_CLIENT
 )
 
 
@@ -308,8 +310,13 @@ def get_module_for_descriptor_internal(user, descriptor, field_data_cache, cours
         # Update the grades
         student_module.grade = event.get('value')
         student_module.max_grade = event.get('max_value')
-        # Save all changes to the underlying KeyValueStore
-        student_module.save()
+        # Save all changes to the underlying KeyValueStore. The cached scores for the
+        # section containing this module are dropped once the grade is written (at the
+        # end of the handler), so that a concurrent computation can't cache the old one.
+        field_data_cache.save(
+            {student_module: ['grade', 'max_grade']},
+            on_saved=partial(StudentSectionGrade.invalidate, user_id, course_id, descriptor.location)
+        )
 
         # Bin score into range and increment stats
         score_bucket = get_score_bucket(student_module.grade, student_module.max_grade)
@@ -489,10 +496,11 @@ def xqueue_callback(request, course_id, userid, mod_id, dispatch):
     # We go through the "AJAX" path
     # So far, the only dispatch from xqueue will be 'score_update'
     try:
-        # Can ignore the return value--not used for xqueue_callback
-        instance.handle_ajax(dispatch, data)
-        # Save any state that has changed to the underlying KeyValueStore
-        instance.save()
+        with field_data_cache.deferred_writes():
+            # Can ignore the return value--not used for xqueue_callback
+            instance.handle_ajax(dispatch, data)
+            # Save any state that has changed to the underlying KeyValueStore
+            instance.save()
     except:
         log.exception("error processing ajax call")
         raise
@@ -571,7 +579,9 @@ def _invoke_xblock_handler(request, course_id, usage_id, handler, suffix, user):
 
     req = django_to_webob_request(request)
     try:
-        resp = instance.handle(handler, req, suffix)
+        # Write each changed row once, when the handler is done with it
+        with field_data_cache.deferred_writes():
+            resp = instance.handle(handler, req, suffix)
 
     except NoSuchHandlerError:
         log.exception("XBlock %s attempted to access missing handler %r", instance, handler)
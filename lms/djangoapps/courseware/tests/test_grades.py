@@ -5,12 +5,16 @@ from django.http import Http404
 from django.test.utils import override_settings
 from mock import patch
 
+from courseware.tests.factories import StudentModuleFactory
 from courseware.tests.modulestore_config import TEST_DATA_MIXED_MODULESTORE
 from student.tests.factories import UserFactory
-from xmodule.modulestore.tests.factories import CourseFactory
+from xmodule.graders import Score
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
-from courseware.grades import grade, iterate_grades_for
+from courseware.grades import grade, iterate_grades_for, SectionGradeCache
+from courseware.models import StudentSectionGrade
 
 
 def _grade_with_errors(student, request, course, keep_raw_scores=False):
@@ -120,3 +124,110 @@ class TestGradeIteration(ModuleStoreTestCase):
                 students_to_errors[student] = err_msg
 
         return students_to_gradesets, students_to_errors
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+@patch.dict('django.conf.settings.FEATURES', {'ENABLE_PERSISTENT_GRADE_CACHE': True})
+class TestSectionGradeCache(ModuleStoreTestCase):
+    """
+    Test the persistent per-section grade cache.
+    """
+    def setUp(self):
+        self.course = CourseFactory.create(display_name="grade_cache_course", number="1001")
+        chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        self.section = ItemFactory.create(
+            parent_location=chapter.location,
+            category='sequential',
+            metadata={'graded': True, 'format': 'Homework'}
+        )
+        self.problem = ItemFactory.create(parent_location=self.section.location, category='problem')
+        self.course = modulestore().get_course(self.course.id)
+        self.student = UserFactory.create()
+        self.scores = [Score(1.0, 2.0, True, u'problem')]
+
+    def test_set_and_get(self):
+        SectionGradeCache(self.student, self.course).set(self.section.location, self.scores)
+        self.assertEqual(
+            SectionGradeCache(self.student, self.course).get(self.section.location),
+            self.scores
+        )
+
+    def test_stale_signature(self):
+        SectionGradeCache(self.student, self.course).set(self.section.location, self.scores)
+        StudentSectionGrade.objects.update(content_signature='outdated')
+        self.assertIsNone(SectionGradeCache(self.student, self.course).get(self.section.location))
+
+    def test_problem_edited(self):
+        SectionGradeCache(self.student, self.course).set(self.section.location, self.scores)
+        modulestore().update_item(self.problem.location, '<problem><p>Edited</p></problem>')
+        course = modulestore().get_course(self.course.id)
+        self.assertIsNone(SectionGradeCache(self.student, course).get(self.section.location))
+
+    def test_invalidate(self):
+        SectionGradeCache(self.student, self.course).set(self.section.location, self.scores)
+        StudentSectionGrade.invalidate(self.student.id, self.course.id, self.problem.location)
+        self.assertFalse(StudentSectionGrade.objects.filter(student=self.student).exists())
+
+    @patch.dict('django.conf.settings.FEATURES', {'ENABLE_PERSISTENT_GRADE_CACHE': False})
+    def test_disabled(self):
+        SectionGradeCache(self.student, self.course).set(self.section.location, self.scores)
+        self.assertFalse(StudentSectionGrade.objects.exists())
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestBulkGrader(ModuleStoreTestCase):
+    """
+    Test that bulk grading gives the same results as grading students one by one.
+    """
+    def setUp(self):
+        self.course = CourseFactory.create(display_name="bulk_grading_course", number="1002")
+        chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        section = ItemFactory.create(
+            parent_location=chapter.location,
+            category='sequential',
+            metadata={'graded': True, 'format': 'Homework'}
+        )
+        self.problems = [
+            ItemFactory.create(parent_location=section.location, category='problem', display_name=name)
+            for name in ('p1', 'p2')
+        ]
+        self.students = [UserFactory.create() for _ in range(3)]
+
+        # The first student answered one problem, the second both, the third none
+        StudentModuleFactory.create(
+            student=self.students[0], course_id=self.course.id,
+            module_state_key=self.problems[0].location.url(), grade=1, max_grade=2
+        )
+        for problem in self.problems:
+            StudentModuleFactory.create(
+                student=self.students[1], course_id=self.course.id,
+                module_state_key=problem.location.url(), grade=2, max_grade=2
+            )
+
+    def test_bulk_matches_serial(self):
+        serial = list(iterate_grades_for(self.course.id, self.students))
+        bulk = list(iterate_grades_for(self.course.id, self.students, bulk=True))
+        self.assertEqual(
+            [(student, gradeset['percent']) for student, gradeset, _ in serial],
+            [(student, gradeset['percent']) for student, gradeset, _ in bulk]
+        )
+        self.assertEqual(
+            [gradeset['section_breakdown'] for _, gradeset, _ in serial],
+            [gradeset['section_breakdown'] for _, gradeset, _ in bulk]
+        )
+
+    def test_max_score_not_taken_from_other_students(self):
+        # A max grade left over from an older version of the problem
+        StudentModuleFactory.create(
+            student=UserFactory.create(), course_id=self.course.id,
+            module_state_key=self.problems[1].location.url(), grade=7, max_grade=7
+        )
+        serial = list(iterate_grades_for(self.course.id, self.students[:1]))
+        bulk = list(iterate_grades_for(self.course.id, self.students[:1], bulk=True))
+        self.assertEqual(serial[0][1]['percent'], bulk[0][1]['percent'])
+
+    @patch('courseware.grades.BULK_GRADING_CHUNK_SIZE', 2)
+    def test_chunking(self):
+        results = list(iterate_grades_for(self.course.id, self.students, bulk=True))
+        self.assertEqual([student for student, _, _ in results], self.students)
+        self.assertEqual([err_msg for _, _, err_msg in results], ["", "", ""])
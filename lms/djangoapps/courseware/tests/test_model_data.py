@@ -17,7 +17,10 @@ from courseware.tests.factories import StudentPrefsFactory, StudentInfoFactory
 
 from xblock.fields import Scope, BlockScope
 from xmodule.modulestore import Location
+from django.conf import settings
+from django.core.cache import cache
 from django.test import TestCase
+from django.test.utils import override_settings
 from django.db import DatabaseError
 from xblock.core import KeyValueMultiSaveError
 
@@ -153,6 +156,125 @@ class TestStudentModuleStorage(TestCase):
         self.assertEquals(len(exception_context.exception.saved_field_names), 0)
 
 
+class TestDeferredWrites(TestCase):
+
+    def setUp(self):
+        student_module = StudentModuleFactory(state=json.dumps({'a_field': 'a_value', 'b_field': 'b_value'}))
+        self.user = student_module.student
+        self.assertEqual(self.user.id, 1)   # check our assumption hard-coded in the key functions above.
+        self.field_data_cache = FieldDataCache([mock_descriptor([mock_field(Scope.user_state, 'a_field')])], course_id, self.user)
+        self.kvs = DjangoKeyValueStore(self.field_data_cache)
+
+    def test_writes_saved_once_at_exit(self):
+        "Test that repeated writes to a StudentModule are saved once, when the block exits"
+        with patch.object(StudentModule, 'save', autospec=True, side_effect=StudentModule.save) as mock_save:
+            with self.field_data_cache.deferred_writes():
+                self.kvs.set(user_state_key('a_field'), 'new_value')
+                self.kvs.set_many({user_state_key('b_field'): 'newer_value', user_state_key('c_field'): 'c_value'})
+                self.kvs.delete(user_state_key('c_field'))
+                self.assertEquals('newer_value', self.kvs.get(user_state_key('b_field')))
+                self.assertEquals(
+                    {'a_field': 'a_value', 'b_field': 'b_value'},
+                    json.loads(StudentModule.objects.all()[0].state)
+                )
+
+        self.assertEquals(1, mock_save.call_count)
+        self.assertEquals(
+            {'a_field': 'new_value', 'b_field': 'newer_value'},
+            json.loads(StudentModule.objects.all()[0].state)
+        )
+
+    def test_writes_saved_on_exception(self):
+        "Test that pending writes are saved even if the block raises"
+        with self.assertRaises(ValueError):
+            with self.field_data_cache.deferred_writes():
+                self.kvs.set(user_state_key('a_field'), 'new_value')
+                raise ValueError()
+
+        self.assertEquals('new_value', json.loads(StudentModule.objects.all()[0].state)['a_field'])
+
+    def test_on_saved_called_after_deferred_write(self):
+        "Test that the function to call once a save is written is called when the block exits"
+        student_module = StudentModule.objects.all()[0]
+        states = []
+        on_saved = lambda: states.append(StudentModule.objects.get(id=student_module.id).grade)
+        with self.field_data_cache.deferred_writes():
+            student_module.grade = 1
+            self.field_data_cache.save({student_module: ['grade']}, on_saved=on_saved)
+            self.assertEquals(states, [])
+        self.assertEquals(states, [1])
+
+    def test_deferred_write_failure(self):
+        "Test that a failed deferred save raises KeyValueMultiSaveError"
+        with patch('django.db.models.Model.save', side_effect=DatabaseError):
+            with self.assertRaises(KeyValueMultiSaveError) as exception_context:
+                with self.field_data_cache.deferred_writes():
+                    self.kvs.set(user_state_key('a_field'), 'new_value')
+        self.assertEquals(len(exception_context.exception.saved_field_names), 0)
+
+    def test_get_returns_copy(self):
+        "Test that changing a value returned by `get` doesn't change the stored state"
+        self.kvs.set(user_state_key('a_field'), ['a_value'])
+        self.kvs.get(user_state_key('a_field')).append('another_value')
+        self.assertEquals(['a_value'], self.kvs.get(user_state_key('a_field')))
+
+
+FEATURES_WITH_SNAPSHOTS = settings.FEATURES.copy()
+FEATURES_WITH_SNAPSHOTS['ENABLE_FIELD_DATA_SNAPSHOTS'] = True
+
+
+@override_settings(FEATURES=FEATURES_WITH_SNAPSHOTS)
+class TestFieldDataSnapshots(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        student_module = StudentModuleFactory(state=json.dumps({'a_field': 'a_value'}))
+        self.user = student_module.student
+        self.assertEqual(self.user.id, 1)   # check our assumption hard-coded in the key functions above.
+        self.descriptors = [mock_descriptor([mock_field(Scope.user_state, 'a_field')])]
+
+    def field_data_cache(self):
+        """Construct a FieldDataCache that may use a snapshot"""
+        return FieldDataCache(self.descriptors, course_id, self.user, use_snapshot=True)
+
+    def test_snapshot_reused(self):
+        "Test that a second FieldDataCache for the same descriptors doesn't query the database"
+        self.field_data_cache()
+        with self.assertNumQueries(0):
+            kvs = DjangoKeyValueStore(self.field_data_cache())
+            self.assertEquals('a_value', kvs.get(user_state_key('a_field')))
+
+    def test_snapshot_invalidated_by_write(self):
+        "Test that a snapshot isn't used once one of its rows has been written"
+        DjangoKeyValueStore(self.field_data_cache()).set(user_state_key('a_field'), 'new_value')
+        kvs = DjangoKeyValueStore(self.field_data_cache())
+        self.assertEquals('new_value', kvs.get(user_state_key('a_field')))
+
+    def test_snapshot_invalidated_by_new_row(self):
+        "Test that a snapshot isn't used once a row it didn't contain has been created"
+        StudentModule.objects.all().delete()
+        self.field_data_cache()
+        StudentModuleFactory(student=self.user, state=json.dumps({'a_field': 'created_value'}))
+        kvs = DjangoKeyValueStore(self.field_data_cache())
+        self.assertEquals('created_value', kvs.get(user_state_key('a_field')))
+
+    def test_snapshot_not_used_for_update(self):
+        "Test that rows to be locked are always read from the database"
+        self.field_data_cache()
+        with self.assertNumQueries(1):
+            FieldDataCache(self.descriptors, course_id, self.user, select_for_update=True, use_snapshot=True)
+
+
+class TestFieldDataSnapshotsDisabled(TestCase):
+
+    def test_versions_not_bumped(self):
+        "Test that writes don't touch the snapshot version counters if snapshots are disabled"
+        with patch('courseware.models.cache') as mock_cache:
+            StudentModuleFactory(state=json.dumps({'a_field': 'a_value'}))
+        self.assertFalse(mock_cache.incr.called)
+        self.assertFalse(mock_cache.set.called)
+
+
 class TestMissingStudentModule(TestCase):
     def setUp(self):
         self.user = UserFactory.create(username='user')
@@ -243,7 +243,7 @@ def index(request, course_id, chapter=None, section=None,
 
     try:
         field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-            course.id, user, course, depth=2)
+            course.id, user, course, depth=2, use_snapshot=True)
 
         course_module = get_module_for_descriptor(user, request, course, field_data_cache, course.id)
         if course_module is None:
@@ -308,7 +308,7 @@ def index(request, course_id, chapter=None, section=None,
             # Load all descendants of the section, because we're going to display its
             # html, which in general will need all of its children
             section_field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-                course_id, user, section_descriptor, depth=None)
+                course_id, user, section_descriptor, depth=None, use_snapshot=True)
 
             section_module = get_module_for_descriptor(request.user,
                 request,
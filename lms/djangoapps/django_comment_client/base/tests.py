@@ -18,7 +18,7 @@ log = logging.getLogger(__name__)
 
 
 @override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
-@patch('lms.lib.comment_client.utils.requests.request')
+@patch('lms.lib.comment_client.utils.SESSION.request')
 class ViewsTestCase(UrlResetMixin, ModuleStoreTestCase):
 
     @patch.dict("django.conf.settings.FEATURES", {"ENABLE_DISCUSSION_SERVICE": True})
@@ -0,0 +1,84 @@
+from django.core.cache import cache
+from django.test import TestCase
+from mock import Mock, patch
+import requests
+
+from lms.lib.comment_client import settings as cc_settings
+from lms.lib.comment_client.utils import perform_request
+
+URL = 'http://localhost:4567/api/v1/users/1'
+THREADS_URL = 'http://localhost:4567/api/v1/threads'
+
+
+@patch('lms.lib.comment_client.utils.SESSION.request')
+class PerformRequestTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def respond(self, mock_request):
+        mock_request.return_value = Mock(status_code=200, text='{"id": "1"}')
+
+    @patch.object(cc_settings, 'CACHE_TIMEOUT', 60)
+    def test_cached_get(self, mock_request):
+        self.respond(mock_request)
+        self.assertEqual(perform_request('get', URL, {'complete': True}, cache=True), {'id': '1'})
+        self.assertEqual(perform_request('get', URL, {'complete': True}, cache=True), {'id': '1'})
+        self.assertEqual(mock_request.call_count, 1)
+
+        perform_request('get', URL, {'complete': False}, cache=True)
+        self.assertEqual(mock_request.call_count, 2)
+
+    @patch.object(cc_settings, 'CACHE_TIMEOUT', 60)
+    def test_write_invalidates_cache(self, mock_request):
+        self.respond(mock_request)
+        perform_request('get', URL, cache=True)
+        perform_request('put', URL, {'username': 'robot'})
+        perform_request('get', URL, cache=True)
+        self.assertEqual(mock_request.call_count, 3)
+
+    @patch.object(cc_settings, 'CACHE_TIMEOUT', 60)
+    def test_write_invalidates_only_its_course(self, mock_request):
+        self.respond(mock_request)
+        perform_request('get', THREADS_URL, {'course_id': 'edX/a/run'}, cache=True)
+        perform_request('get', THREADS_URL, {'course_id': 'edX/b/run'}, cache=True)
+        perform_request('post', THREADS_URL, {'course_id': 'edX/a/run', 'user_id': '1'})
+        perform_request('get', THREADS_URL, {'course_id': 'edX/a/run'}, cache=True)
+        perform_request('get', THREADS_URL, {'course_id': 'edX/b/run'}, cache=True)
+        self.assertEqual(mock_request.call_count, 4)
+
+    @patch.object(cc_settings, 'CACHE_TIMEOUT', 60)
+    def test_write_invalidates_course_of_response(self, mock_request):
+        mock_request.return_value = Mock(status_code=200, text='{"id": "1", "course_id": "edX/a/run"}')
+        perform_request('get', THREADS_URL, {'course_id': 'edX/a/run'}, cache=True)
+        perform_request('put', THREADS_URL + '/1/votes', {'user_id': '2', 'value': 'up'})
+        perform_request('get', THREADS_URL, {'course_id': 'edX/a/run'}, cache=True)
+        self.assertEqual(mock_request.call_count, 3)
+
+    @patch.object(cc_settings, 'CACHE_TIMEOUT', 60)
+    def test_mark_as_read_invalidates_only_its_reader(self, mock_request):
+        self.respond(mock_request)
+        perform_request('get', THREADS_URL, {'course_id': 'edX/a/run', 'user_id': '1'}, cache=True)
+        perform_request('get', THREADS_URL, {'course_id': 'edX/a/run', 'user_id': '2'}, cache=True)
+        perform_request('get', THREADS_URL + '/1', {'user_id': '1', 'mark_as_read': True})
+        perform_request('get', THREADS_URL, {'course_id': 'edX/a/run', 'user_id': '1'}, cache=True)
+        perform_request('get', THREADS_URL, {'course_id': 'edX/a/run', 'user_id': '2'}, cache=True)
+        self.assertEqual(mock_request.call_count, 4)
+
+    def test_not_cached(self, mock_request):
+        self.respond(mock_request)
+        perform_request('get', URL, cache=True)
+        perform_request('get', URL, cache=True)
+        self.assertEqual(mock_request.call_count, 2)
+
+    @patch.object(cc_settings, 'MAX_RETRIES', 1)
+    def test_get_retried(self, mock_request):
+        mock_request.side_effect = [requests.ConnectionError(), Mock(status_code=200, text='{}')]
+        self.assertEqual(perform_request('get', URL), {})
+        self.assertEqual(mock_request.call_count, 2)
+
+    @patch.object(cc_settings, 'MAX_RETRIES', 1)
+    def test_post_not_retried(self, mock_request):
+        mock_request.side_effect = requests.ConnectionError()
+        with self.assertRaises(requests.ConnectionError):
+            perform_request('post', URL, {'username': 'robot'})
+        self.assertEqual(mock_request.call_count, 1)
@@ -1,11 +1,14 @@
 from datetime import datetime
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.test import TestCase
 from django.test.utils import override_settings
+from mock import patch
 from student.tests.factories import UserFactory, CourseEnrollmentFactory
 from django_comment_common.models import Role, Permission
 from django_comment_client.tests.factories import RoleFactory
 import django_comment_client.utils as utils
+from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from courseware.tests.tests import TEST_DATA_MONGO_MODULESTORE
@@ -489,3 +492,43 @@ class CategoryMapTestCase(ModuleStoreTestCase):
                 "children": ["Chapter A", "Chapter B", "Chapter C"]
             }
         )
+
+
+@override_settings(DISCUSSION_CATEGORY_MAP_CACHE_TIMEOUT=60)
+class CachedCategoryMapTestCase(CategoryMapTestCase):
+    """
+    Runs the category map tests with the maps cached, and checks when they
+    are computed again
+    """
+    def setUp(self):
+        cache.clear()
+        super(CachedCategoryMapTestCase, self).setUp()
+
+    @patch('django_comment_client.utils._get_discussion_modules', wraps=utils._get_discussion_modules)
+    def test_cached(self, mock_get_modules):
+        self.create_discussion("Chapter", "Discussion")
+        category_map = utils.get_discussion_category_map(self.course)
+        self.assertEqual(utils.get_discussion_category_map(self.course), category_map)
+        self.assertEqual(utils._get_discussion_id_map(self.course).keys(), ["discussion1"])  # pylint: disable=W0212
+        self.assertEqual(mock_get_modules.call_count, 1)
+
+    @patch('django_comment_client.utils._get_discussion_modules', wraps=utils._get_discussion_modules)
+    def test_course_changed(self, mock_get_modules):
+        self.create_discussion("Chapter", "Discussion 1")
+        utils.get_discussion_category_map(self.course)
+        self.create_discussion("Chapter", "Discussion 2")
+        self.assertEqual(
+            utils.get_discussion_category_map(self.course)["subcategories"]["Chapter"]["children"],
+            ["Discussion 1", "Discussion 2"]
+        )
+        self.assertEqual(mock_get_modules.call_count, 2)
+
+    @patch('django_comment_client.utils._get_discussion_modules', wraps=utils._get_discussion_modules)
+    def test_update_signal(self, mock_get_modules):
+        utils.get_discussion_category_map(self.course)
+        store = modulestore()
+        store.modulestore_update_signal.send(
+            store, modulestore=store, course_id="TestX/101", location=self.course.location
+        )
+        utils.get_discussion_category_map(self.course)
+        self.assertEqual(mock_get_modules.call_count, 2)
@@ -4,9 +4,12 @@ import logging
 import urllib
 from datetime import datetime
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.db import connection
+from django.dispatch import receiver
 from django.http import HttpResponse
 from django.utils import simplejson
 from django_comment_common.models import Role, FORUM_ROLE_STUDENT
@@ -15,7 +18,7 @@ from django_comment_client.permissions import check_permissions_by_view
 import edxmako
 import pystache_custom as pystache
 
-from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.django import modulestore, modulestore_update_signal
 from xmodule.modulestore import Location
 from django.utils.timezone import UTC
 
@@ -71,14 +74,84 @@ def _get_discussion_modules(course):
     return filter(has_required_keys, all_modules)
 
 
-def _get_discussion_id_map(course):
+def _discussion_maps_cache_key(pseudo_course_id):
+    """
+    The cache key of the discussion maps of the courses whose location has the
+    org and course of pseudo_course_id ("org/course")
+    """
+    return u"django_comment_client.discussion_maps.{0}".format(pseudo_course_id)
+
+
+@receiver(modulestore_update_signal)
+def _invalidate_discussion_maps(sender, course_id=None, **kwargs):  # pylint: disable=W0613
+    """
+    Receiver of the modulestore update signal, which drops the cached
+    discussion maps of the updated course
+    """
+    if course_id is not None:
+        cache.delete(_discussion_maps_cache_key(course_id))
+
+
+def _get_discussion_maps(course):
+    """
+    Return the category map, with all its categories and entries, and the
+    discussion id map of course.
+
+    The maps are computed from the course's discussion modules once per
+    version of the course, and cached for DISCUSSION_CATEGORY_MAP_CACHE_TIMEOUT
+    seconds (0 disables caching). They are dropped when the modulestore
+    signals that the course was updated, and ignored once it has a new edit
+    version, which is how the changes made by other processes (e.g. Studio)
+    are seen.
+    """
+    timeout = settings.DISCUSSION_CATEGORY_MAP_CACHE_TIMEOUT
+    if not timeout:
+        modules = _get_discussion_modules(course)
+        return _build_discussion_category_map(course, modules), _build_discussion_id_map(modules)
+
+    store = modulestore()
+    # Stores without edit versions (XML) only change when they are loaded
+    version = store.get_edit_version(course.location) if hasattr(store, 'get_edit_version') else None
+
+    # The maps of all the runs of the course are kept under one key, as
+    # the update signal is sent with the org and course only
+    key = _discussion_maps_cache_key(u"{0.org}/{0.course}".format(course.location))
+    cached = cache.get(key) or {}
+    entry = cached.get(course.id)
+    if (
+        entry is not None and
+        entry['version'] == version and
+        entry['discussion_topics'] == course.discussion_topics and
+        entry['discussion_sort_alpha'] == course.discussion_sort_alpha
+    ):
+        return entry['category_map'], entry['id_map']
+
+    modules = _get_discussion_modules(course)
+    category_map = _build_discussion_category_map(course, modules)
+    id_map = _build_discussion_id_map(modules)
+    cached[course.id] = {
+        'version': version,
+        'discussion_topics': course.discussion_topics,
+        'discussion_sort_alpha': course.discussion_sort_alpha,
+        'category_map': category_map,
+        'id_map': id_map,
+    }
+    cache.set(key, cached, timeout)
+    return category_map, id_map
+
+
+def _build_discussion_id_map(modules):
     def get_entry(module):
         discussion_id = module.discussion_id
         title = module.discussion_target
         last_category = module.discussion_category.split("/")[-1].strip()
         return (discussion_id, {"location": module.location, "title": last_category + " / " + title})
 
-    return dict(map(get_entry, _get_discussion_modules(course)))
+    return dict(map(get_entry, modules))
+
+
+def _get_discussion_id_map(course):
+    return _get_discussion_maps(course)[1]
 
 
 def _filter_unstarted_categories(category_map):
@@ -131,13 +204,9 @@ def _sort_map_entries(category_map, sort_alpha):
     category_map["children"] = [x[0] for x in sorted(things, key=lambda x: x[1]["sort_key"])]
 
 
-def get_discussion_category_map(course):
-    course_id = course.id
-
+def _build_discussion_category_map(course, modules):
     unexpanded_category_map = defaultdict(list)
 
-    modules = _get_discussion_modules(course)
-
     for module in modules:
         id = module.discussion_id
         title = module.discussion_target
@@ -194,7 +263,12 @@ def get_discussion_category_map(course):
 
     _sort_map_entries(category_map, course.discussion_sort_alpha)
 
-    return _filter_unstarted_categories(category_map)
+    return category_map
+
+
+def get_discussion_category_map(course):
+    # Which categories have started changes with the time, so they're filtered on every call
+    return _filter_unstarted_categories(_get_discussion_maps(course)[0])
 
 
 class JsonResponse(HttpResponse):
@@ -12,14 +12,15 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
-from cStringIO import StringIO
 from gzip import GzipFile
+from tempfile import TemporaryFile
 from uuid import uuid4
 import csv
 import json
 import hashlib
 import os
 import os.path
+import shutil
 import urllib
 
 from boto.s3.connection import S3Connection
@@ -192,9 +193,8 @@ class InstructorTask(models.Model):
 class GradesStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for grades
-    download. Should probably refactor later to create a GradesFile object that
-    can simply be appended to for the sake of memory efficiency, rather than
-    passing in the whole dataset. Doing that for now just because it's simpler.
+    download. Rows are spooled through a temporary file rather than built up in
+    memory, so `store_rows` and `rows_for` can handle arbitrarily large reports.
     """
     @classmethod
     def from_config(cls):
@@ -267,8 +267,8 @@ class S3GradesStore(GradesStore):
     def store(self, course_id, filename, buff):
         """
         Store the contents of `buff` in a directory determined by hashing
-        `course_id`, and name the file `filename`. `buff` is typically a
-        `StringIO`, but can be anything that implements `.getvalue()`.
+        `course_id`, and name the file `filename`. `buff` can be any seekable
+        file-like object, such as a `StringIO` or a temporary file.
 
         This method assumes that the contents of `buff` are gzip-encoded (it
         will add the appropriate headers to S3 to make the decompression
@@ -277,38 +277,55 @@ class S3GradesStore(GradesStore):
         """
         key = self.key_for(course_id, filename)
 
-        data = buff.getvalue()
-        key.size = len(data)
+        buff.seek(0, os.SEEK_END)
+        size = buff.tell()
+        buff.seek(0)
+        key.size = size
         key.content_encoding = "gzip"
         key.content_type = "text/csv"
 
         # Just setting the content encoding and type above should work
         # according to the docs, but when experimenting, this was necessary for
         # it to actually take.
-        key.set_contents_from_string(
-            data,
+        key.set_contents_from_file(
+            buff,
             headers={
                 "Content-Encoding": "gzip",
-                "Content-Length": len(data),
+                "Content-Length": size,
                 "Content-Type": "text/csv",
             }
         )
 
     def store_rows(self, course_id, filename, rows):
         """
-        Given a `course_id`, `filename`, and `rows` (each row is an iterable of
-        strings), create a buffer that is a gzip'd csv file, and then `store()`
-        that buffer.
+        Given a `course_id`, `filename`, and `rows` (an iterable of rows, each
+        an iterable of strings), write a gzip'd csv file to a temporary file,
+        and then `store()` that file.
 
         Even though we store it in gzip format, browsers will transparently
         download and decompress it. Filenames should end in `.csv`, not `.gz`.
         """
-        output_buffer = StringIO()
-        gzip_file = GzipFile(fileobj=output_buffer, mode="wb")
-        csv.writer(gzip_file).writerows(rows)
-        gzip_file.close()
+        with TemporaryFile() as output_file:
+            gzip_file = GzipFile(fileobj=output_file, mode="wb")
+            csv.writer(gzip_file).writerows(rows)
+            gzip_file.close()
 
-        self.store(course_id, filename, output_buffer)
+            self.store(course_id, filename, output_file)
+
+    def rows_for(self, course_id, filename):
+        """
+        Yield the rows of the csv file `filename` previously stored for
+        `course_id` with `store_rows()`.
+        """
+        with TemporaryFile() as input_file:
+            self.key_for(course_id, filename).get_contents_to_file(input_file)
+            input_file.seek(0)
+            for row in csv.reader(GzipFile(fileobj=input_file, mode="rb")):
+                yield row
+
+    def delete(self, course_id, filename):
+        """Delete the file `filename` stored for `course_id`."""
+        self.key_for(course_id, filename).delete()
 
     def links_for(self, course_id):
         """
@@ -365,26 +382,39 @@ class LocalFSGradesStore(GradesStore):
     def store(self, course_id, filename, buff):
         """
         Given the `course_id` and `filename`, store the contents of `buff` in
-        that file. Overwrite anything that was there previously. `buff` is
-        assumed to be a StringIO objecd (or anything that can flush its contents
-        to string using `.getvalue()`).
+        that file. Overwrite anything that was there previously. `buff` can be
+        any seekable file-like object, such as a StringIO or a temporary file.
         """
         full_path = self.path_to(course_id, filename)
         directory = os.path.dirname(full_path)
         if not os.path.exists(directory):
             os.mkdir(directory)
 
+        buff.seek(0)
         with open(full_path, "wb") as f:
-            f.write(buff.getvalue())
+            shutil.copyfileobj(buff, f)
 
     def store_rows(self, course_id, filename, rows):
         """
-        Given a course_id, filename, and rows (each row is an iterable of strings),
-        write this data out.
+        Given a course_id, filename, and rows (an iterable of rows, each an
+        iterable of strings), write this data out.
         """
-        output_buffer = StringIO()
-        csv.writer(output_buffer).writerows(rows)
-        self.store(course_id, filename, output_buffer)
+        with TemporaryFile() as output_file:
+            csv.writer(output_file).writerows(rows)
+            self.store(course_id, filename, output_file)
+
+    def rows_for(self, course_id, filename):
+        """
+        Yield the rows of the csv file `filename` previously stored for
+        `course_id` with `store_rows()`.
+        """
+        with open(self.path_to(course_id, filename), "rb") as f:
+            for row in csv.reader(f):
+                yield row
+
+    def delete(self, course_id, filename):
+        """Delete the file `filename` stored for `course_id`."""
+        os.remove(self.path_to(course_id, filename))
 
     def links_for(self, course_id):
         """
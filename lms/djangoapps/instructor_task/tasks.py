@@ -27,10 +27,13 @@ from instructor_task.tasks_helper import (
     run_main_task,
     BaseInstructorTask,
     perform_module_state_update,
+    perform_delegate_module_state_update,
+    perform_module_state_update_part,
     rescore_problem_module_state,
     reset_attempts_module_state,
     delete_problem_module_state,
-    push_grades_to_s3,
+    perform_delegate_grade_report,
+    generate_grade_report_part,
 )
 from bulk_email.tasks import perform_delegate_email_batches
 
@@ -53,6 +56,9 @@ def rescore_problem(entry_id, xmodule_instance_args):
 
     `xmodule_instance_args` provides information needed by _get_module_instance_for_task()
     to instantiate an xmodule instance.
+
+    Rescoring more than settings.INSTRUCTOR_TASK_MODULES_PER_TASK submissions is split
+    among `rescore_problem_part` subtasks.
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('rescored')
@@ -62,10 +68,25 @@ def rescore_problem(entry_id, xmodule_instance_args):
         """Filter that matches problems which are marked as being done"""
         return modules_to_update.filter(state__contains='"done": true')
 
-    visit_fcn = partial(perform_module_state_update, update_fcn, filter_fcn)
+    create_subtask_fcn = partial(_create_module_state_subtask, rescore_problem_part, xmodule_instance_args)
+    visit_fcn = partial(perform_delegate_module_state_update, create_subtask_fcn, update_fcn, filter_fcn)
     return run_main_task(entry_id, visit_fcn, action_name)
 
 
+@task()  # pylint: disable=E1102
+def rescore_problem_part(entry_id, course_id, task_input, student_module_ids, subtask_status_dict,
+                         xmodule_instance_args):
+    """
+    Rescore the problem for the StudentModules with ids `student_module_ids`,
+    as part of the rescoring being done by InstructorTask `entry_id`.
+    """
+    action_name = ugettext_noop('rescored')
+    update_fcn = partial(rescore_problem_module_state, xmodule_instance_args)
+    return perform_module_state_update_part(
+        update_fcn, action_name, entry_id, course_id, task_input, student_module_ids, subtask_status_dict
+    )
+
+
 @task(base=BaseInstructorTask)  # pylint: disable=E1102
 def reset_problem_attempts(entry_id, xmodule_instance_args):
     """Resets problem attempts to zero for a particular problem for all students in a course.
@@ -80,14 +101,48 @@ def reset_problem_attempts(entry_id, xmodule_instance_args):
 
     `xmodule_instance_args` provides information needed by _get_module_instance_for_task()
     to instantiate an xmodule instance.
+
+    Resetting more than settings.INSTRUCTOR_TASK_MODULES_PER_TASK students' attempts is
+    split among `reset_problem_attempts_part` subtasks.
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('reset')
     update_fcn = partial(reset_attempts_module_state, xmodule_instance_args)
-    visit_fcn = partial(perform_module_state_update, update_fcn, None)
+    create_subtask_fcn = partial(_create_module_state_subtask, reset_problem_attempts_part, xmodule_instance_args)
+    visit_fcn = partial(perform_delegate_module_state_update, create_subtask_fcn, update_fcn, None)
     return run_main_task(entry_id, visit_fcn, action_name)
 
 
+@task()  # pylint: disable=E1102
+def reset_problem_attempts_part(entry_id, course_id, task_input, student_module_ids, subtask_status_dict,
+                                xmodule_instance_args):
+    """
+    Reset problem attempts to zero for the StudentModules with ids `student_module_ids`,
+    as part of the reset being done by InstructorTask `entry_id`.
+    """
+    action_name = ugettext_noop('reset')
+    update_fcn = partial(reset_attempts_module_state, xmodule_instance_args)
+    return perform_module_state_update_part(
+        update_fcn, action_name, entry_id, course_id, task_input, student_module_ids, subtask_status_dict
+    )
+
+
+def _create_module_state_subtask(subtask, xmodule_instance_args, entry_id, course_id, task_input,
+                                 student_module_list, initial_subtask_status):
+    """Creates a `subtask` to update a given list of StudentModules."""
+    return subtask.subtask(
+        (
+            entry_id,
+            course_id,
+            task_input,
+            [student_module['pk'] for student_module in student_module_list],
+            initial_subtask_status.to_dict(),
+            xmodule_instance_args,
+        ),
+        task_id=initial_subtask_status.task_id,
+    )
+
+
 @task(base=BaseInstructorTask)  # pylint: disable=E1102
 def delete_problem_state(entry_id, xmodule_instance_args):
     """Deletes problem state entirely for all students on a particular problem in a course.
@@ -132,10 +187,36 @@ def send_bulk_course_email(entry_id, _xmodule_instance_args):
 
 
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=E1102
-def calculate_grades_csv(entry_id, xmodule_instance_args):
+def calculate_grades_csv(entry_id, _xmodule_instance_args):
     """
     Grade a course and push the results to an S3 bucket for download.
+
+    Students are graded in parallel by `calculate_grades_csv_part` subtasks,
+    the last of which merges their results into the final report.
     """
     action_name = ugettext_noop('graded')
-    task_fn = partial(push_grades_to_s3, xmodule_instance_args)
+    task_fn = partial(perform_delegate_grade_report, _create_grade_report_subtask)
     return run_main_task(entry_id, task_fn, action_name)
+
+
+def _create_grade_report_subtask(entry_id, course_id, student_list, initial_subtask_status):
+    """Creates a subtask to grade a given list of students."""
+    return calculate_grades_csv_part.subtask(
+        (
+            entry_id,
+            course_id,
+            [student['pk'] for student in student_list],
+            initial_subtask_status.to_dict(),
+        ),
+        task_id=initial_subtask_status.task_id,
+        routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+    )
+
+
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=E1102
+def calculate_grades_csv_part(entry_id, course_id, student_ids, subtask_status_dict):
+    """
+    Grade the students with ids `student_ids`, and store their rows as part of
+    the grade report being generated by InstructorTask `entry_id`.
+    """
+    return generate_grade_report_part(entry_id, course_id, student_ids, subtask_status_dict)
@@ -3,15 +3,20 @@ This file contains tasks that are designed to perform background operations on t
 running state of a course.
 
 """
+import csv
 import json
 import urllib
 from datetime import datetime
+from functools import partial
+from tempfile import TemporaryFile
 from time import time
 
 from celery import Task, current_task
 from celery.utils.log import get_task_logger
 from celery.states import SUCCESS, FAILURE
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.db import transaction, reset_queries
 from dogapi import dog_stats_api
 from pytz import UTC
@@ -24,6 +29,13 @@ from courseware.models import StudentModule
 from courseware.model_data import FieldDataCache
 from courseware.module_render import get_module_for_descriptor_internal
 from instructor_task.models import GradesStore, InstructorTask, PROGRESS
+from instructor_task.subtasks import (
+    SUBTASK_LOCK_EXPIRE,
+    SubtaskStatus,
+    check_subtask_is_valid,
+    queue_subtasks_for_query,
+    update_subtask_status,
+)
 from student.models import CourseEnrollment
 
 # define different loggers for use within tasks and on client side
@@ -244,32 +256,11 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     # get start time for task:
     start_time = time()
 
-    module_state_key = task_input.get('problem_url')
-    student_identifier = task_input.get('student')
-
     # find the problem descriptor:
-    module_descriptor = modulestore().get_instance(course_id, module_state_key)
-
-    # find the module in question
-    modules_to_update = StudentModule.objects.filter(course_id=course_id,
-                                                     module_state_key=module_state_key)
+    module_descriptor = modulestore().get_instance(course_id, task_input.get('problem_url'))
 
-    # give the option of updating an individual student. If not specified,
-    # then updates all students who have responded to a problem so far
-    student = None
-    if student_identifier is not None:
-        # if an identifier is supplied, then look for the student,
-        # and let it throw an exception if none is found.
-        if "@" in student_identifier:
-            student = User.objects.get(email=student_identifier)
-        elif student_identifier is not None:
-            student = User.objects.get(username=student_identifier)
-
-    if student is not None:
-        modules_to_update = modules_to_update.filter(student_id=student.id)
-
-    if filter_fcn is not None:
-        modules_to_update = filter_fcn(modules_to_update)
+    # find the modules in question
+    modules_to_update = _get_modules_to_update(course_id, task_input, filter_fcn).select_related('student')
 
     # perform the main loop
     num_attempted = 0
@@ -317,6 +308,125 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     return task_progress
 
 
+def _get_modules_to_update(course_id, task_input, filter_fcn):
+    """
+    Return the query for the StudentModule instances to update for the problem
+    and, optionally, the student given in `task_input`, filtered by `filter_fcn`.
+    """
+    module_state_key = task_input.get('problem_url')
+    student_identifier = task_input.get('student')
+
+    modules_to_update = StudentModule.objects.filter(course_id=course_id,
+                                                     module_state_key=module_state_key)
+
+    # give the option of updating an individual student. If not specified,
+    # then updates all students who have responded to a problem so far
+    student = None
+    if student_identifier is not None:
+        # if an identifier is supplied, then look for the student,
+        # and let it throw an exception if none is found.
+        if "@" in student_identifier:
+            student = User.objects.get(email=student_identifier)
+        elif student_identifier is not None:
+            student = User.objects.get(username=student_identifier)
+
+    if student is not None:
+        modules_to_update = modules_to_update.filter(student_id=student.id)
+
+    if filter_fcn is not None:
+        modules_to_update = filter_fcn(modules_to_update)
+
+    return modules_to_update
+
+
+def perform_delegate_module_state_update(create_subtask_fcn, update_fcn, filter_fcn, entry_id, course_id,
+                                         task_input, action_name):
+    """
+    Perform the update of perform_module_state_update by splitting the StudentModule
+    instances into chunks of no more than settings.INSTRUCTOR_TASK_MODULES_PER_TASK,
+    and queueing a subtask for each chunk.
+
+    `create_subtask_fcn` takes the InstructorTask id, the course id, the task input,
+    the list of StudentModules (as dicts with a 'pk' key) and the initial SubtaskStatus,
+    and returns a subtask running `perform_module_state_update_part`.
+
+    Updates that fit in a single chunk, such as those for a single student, are
+    performed by this task itself.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+
+    # As with bulk email, the task may have been requeued after its subtasks
+    # have already been created. In that case there's nothing left to do.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning("Task %s has already been processed for %s!  InstructorTask = %s",
+                         entry.task_id, action_name, entry)
+        return json.loads(entry.task_output)
+
+    modules_to_update = _get_modules_to_update(course_id, task_input, filter_fcn)
+    if modules_to_update.count() <= settings.INSTRUCTOR_TASK_MODULES_PER_TASK:
+        # Not worth splitting up
+        return perform_module_state_update(update_fcn, filter_fcn, entry_id, course_id, task_input, action_name)
+
+    # The subtasks' chunks are queried by pk ranges, so the modules must be in pk order
+    return queue_subtasks_for_query(
+        entry,
+        action_name,
+        partial(create_subtask_fcn, entry_id, course_id, task_input),
+        modules_to_update.order_by('pk'),
+        [],
+        settings.INSTRUCTOR_TASK_MODULES_PER_QUERY,
+        settings.INSTRUCTOR_TASK_MODULES_PER_TASK
+    )
+
+
+def perform_module_state_update_part(update_fcn, action_name, entry_id, course_id, task_input, student_module_ids,
+                                     subtask_status_dict):
+    """
+    Call `update_fcn` on the StudentModules with ids `student_module_ids`, as
+    perform_module_state_update does, for the subtask of InstructorTask `entry_id`
+    with status `subtask_status_dict`.
+
+    The StudentModules and their students are loaded in one query, and the problem
+    descriptor is loaded once and shared by all of them. Each update is still saved
+    as it is made, since the score caches and field data snapshots are invalidated
+    as rows are saved. Progress is recorded in the InstructorTask when the subtask
+    is done. Returns the subtask's status as a dict.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    try:
+        module_descriptor = modulestore().get_instance(course_id, task_input.get('problem_url'))
+        modules_to_update = StudentModule.objects.filter(
+            id__in=student_module_ids
+        ).select_related('student').order_by('id')
+
+        for module_to_update in modules_to_update:
+            # As in perform_module_state_update, an error fails the whole subtask.
+            with dog_stats_api.timer('instructor_tasks.module.time.step', tags=['action:{name}'.format(name=action_name)]):
+                update_status = update_fcn(module_descriptor, module_to_update)
+            if update_status == UPDATE_STATUS_SUCCEEDED:
+                subtask_status.increment(succeeded=1)
+            elif update_status == UPDATE_STATUS_FAILED:
+                subtask_status.increment(failed=1)
+            elif update_status == UPDATE_STATUS_SKIPPED:
+                # perform_module_state_update counts skipped modules as attempted too
+                subtask_status.increment(skipped=1)
+                subtask_status.attempted += 1
+            else:
+                raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
+    except Exception:
+        TASK_LOG.exception("Subtask %s for instructor task %d failed", current_task_id, entry_id)
+        subtask_status.increment(failed=len(student_module_ids) - subtask_status.attempted, state=FAILURE)
+        update_subtask_status(entry_id, current_task_id, subtask_status)
+        raise
+
+    subtask_status.increment(state=SUCCESS)
+    update_subtask_status(entry_id, current_task_id, subtask_status)
+    return subtask_status.to_dict()
+
+
 def _get_task_id_from_xmodule_args(xmodule_instance_args):
     """Gets task_id from `xmodule_instance_args` dict, or returns default value if missing."""
     return xmodule_instance_args.get('task_id', UNKNOWN_TASK_ID) if xmodule_instance_args is not None else UNKNOWN_TASK_ID
@@ -344,16 +454,22 @@ def _get_track_function_for_task(student, xmodule_instance_args=None, source_pag
 
 
 def _get_module_instance_for_task(course_id, student, module_descriptor, xmodule_instance_args=None,
-                                  grade_bucket_type=None):
+                                  grade_bucket_type=None, student_module=None):
     """
     Fetches a StudentModule instance for a given `course_id`, `student` object, and `module_descriptor`.
 
     `xmodule_instance_args` is used to provide information for creating a track function and an XQueue callback.
     These are passed, along with `grade_bucket_type`, to get_module_for_descriptor_internal, which sidesteps
     the need for a Request object when instantiating an xmodule instance.
+
+    If the student's StudentModule for the descriptor has already been loaded, it
+    can be passed as `student_module` to save querying for it again.
     """
     # reconstitute the problem's corresponding XModule:
-    field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course_id, student, module_descriptor)
+    if student_module is not None:
+        field_data_cache = FieldDataCache.for_student_module(module_descriptor, student_module)
+    else:
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course_id, student, module_descriptor)
 
     # get request-related tracking information from args passthrough, and supplement with task-specific
     # information:
@@ -395,7 +511,8 @@ def rescore_problem_module_state(xmodule_instance_args, module_descriptor, stude
     course_id = student_module.course_id
     student = student_module.student
     module_state_key = student_module.module_state_key
-    instance = _get_module_instance_for_task(course_id, student, module_descriptor, xmodule_instance_args, grade_bucket_type='rescore')
+    instance = _get_module_instance_for_task(course_id, student, module_descriptor, xmodule_instance_args,
+                                             grade_bucket_type='rescore', student_module=student_module)
 
     if instance is None:
         # Either permissions just changed, or someone is trying to be clever
@@ -470,6 +587,55 @@ def delete_problem_module_state(xmodule_instance_args, _module_descriptor, stude
     return UPDATE_STATUS_SUCCEEDED
 
 
+def _write_grade_report_rows(course_id, students, rows_writer, err_rows_writer):
+    """
+    Grade `students` in `course_id`, writing a grade report row for each of
+    them with `rows_writer`, preceded by a header row, and a row for each student
+    that couldn't be graded with `err_rows_writer`. Both are `csv.writer`s.
+
+    This is a generator which yields whether each student was graded successfully.
+    """
+    header = None
+    for student, gradeset, err_msg in iterate_grades_for(course_id, students, bulk=True):
+        if gradeset:
+            # We were able to successfully grade this student for this course.
+            if not header:
+                # Encode the header row in utf-8 encoding in case there are unicode characters
+                header = [section['label'].encode('utf-8') for section in gradeset[u'section_breakdown']]
+                rows_writer.writerow(["id", "email", "username", "grade"] + header)
+
+            percents = {
+                section['label']: section.get('percent', 0.0)
+                for section in gradeset[u'section_breakdown']
+                if 'label' in section
+            }
+
+            # Not everybody has the same gradable items. If the item is not
+            # found in the user's gradeset, just assume it's a 0. The aggregated
+            # grades for their sections and overall course will be calculated
+            # without regard for the item they didn't have access to, so it's
+            # possible for a student to have a 0.0 show up in their row but
+            # still have 100% for the course.
+            row_percents = [percents.get(label, 0.0) for label in header]
+            rows_writer.writerow([student.id, student.email, student.username, gradeset['percent']] + row_percents)
+            yield True
+        else:
+            # An empty gradeset means we failed to grade a student.
+            err_rows_writer.writerow([student.id, student.username, err_msg])
+            yield False
+
+
+def _grade_report_filename(course_id, timestamp, suffix=''):
+    """
+    Return the name of the grade report file for `course_id` generated at `timestamp`.
+    """
+    return "{}_grade_report_{}{}.csv".format(
+        urllib.quote(course_id.replace("/", "_")),
+        timestamp.strftime("%Y-%m-%d-%H%M"),
+        suffix
+    )
+
+
 def push_grades_to_s3(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
     """
     For a given `course_id`, generate a grades CSV file for all students that
@@ -479,9 +645,9 @@ def push_grades_to_s3(_xmodule_instance_args, _entry_id, course_id, _task_input,
     buffered, so we'll never write part of a CSV file to S3 -- i.e. any files
     that are visible in GradesStore will be complete ones.
 
-    As we start to add more CSV downloads, it will probably be worthwhile to
-    make a more general CSVDoc class instead of building out the rows like we
-    do here.
+    Rows are written to temporary files as students are graded, so memory use
+    doesn't grow with the number of students. For large courses, use
+    `perform_delegate_grade_report` to grade students in parallel subtasks.
     """
     start_time = datetime.now(UTC)
     status_interval = 100
@@ -509,66 +675,232 @@ def push_grades_to_s3(_xmodule_instance_args, _entry_id, course_id, _task_input,
 
         return progress
 
-    # Loop over all our students and build our CSV lists in memory
-    header = None
-    rows = []
-    err_rows = [["id", "username", "error_msg"]]
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
-        # Periodically update task status (this is a cache write)
-        if num_attempted % status_interval == 0:
-            update_task_progress()
-        num_attempted += 1
+    with TemporaryFile() as rows_file, TemporaryFile() as err_rows_file:
+        # Loop over all our students and write our CSV rows to temporary files
+        err_rows_writer = csv.writer(err_rows_file)
+        err_rows_writer.writerow(["id", "username", "error_msg"])
+        for succeeded in _write_grade_report_rows(course_id, enrolled_students, csv.writer(rows_file), err_rows_writer):
+            # Periodically update task status (this is a cache write)
+            if num_attempted % status_interval == 0:
+                update_task_progress()
+            num_attempted += 1
+            if succeeded:
+                num_succeeded += 1
+            else:
+                num_failed += 1
 
-        if gradeset:
-            # We were able to successfully grade this student for this course.
-            num_succeeded += 1
-            if not header:
-                # Encode the header row in utf-8 encoding in case there are unicode characters
-                header = [section['label'].encode('utf-8') for section in gradeset[u'section_breakdown']]
-                rows.append(["id", "email", "username", "grade"] + header)
+        # By this point, we've got the rows we're going to stuff into our CSV files.
+        curr_step = "Uploading CSVs"
+        update_task_progress()
 
-            percents = {
-                section['label']: section.get('percent', 0.0)
-                for section in gradeset[u'section_breakdown']
-                if 'label' in section
-            }
+        # Perform the actual upload
+        grades_store = GradesStore.from_config()
+        rows_file.seek(0)
+        grades_store.store_rows(course_id, _grade_report_filename(course_id, start_time), csv.reader(rows_file))
 
-            # Not everybody has the same gradable items. If the item is not
-            # found in the user's gradeset, just assume it's a 0. The aggregated
-            # grades for their sections and overall course will be calculated
-            # without regard for the item they didn't have access to, so it's
-            # possible for a student to have a 0.0 show up in their row but
-            # still have 100% for the course.
-            row_percents = [percents.get(label, 0.0) for label in header]
-            rows.append([student.id, student.email, student.username, gradeset['percent']] + row_percents)
-        else:
-            # An empty gradeset means we failed to grade a student.
-            num_failed += 1
-            err_rows.append([student.id, student.username, err_msg])
+        # If there are any error rows (don't count the header), write them out as well
+        if num_failed > 0:
+            err_rows_file.seek(0)
+            grades_store.store_rows(
+                course_id,
+                _grade_report_filename(course_id, start_time, "_err"),
+                csv.reader(err_rows_file)
+            )
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
-    curr_step = "Uploading CSVs"
-    update_task_progress()
+    # One last update before we close out...
+    return update_task_progress()
 
-    # Generate parts of the file name
-    timestamp_str = start_time.strftime("%Y-%m-%d-%H%M")
-    course_id_prefix = urllib.quote(course_id.replace("/", "_"))
 
-    # Perform the actual upload
-    grades_store = GradesStore.from_config()
-    grades_store.store_rows(
-        course_id,
-        "{}_grade_report_{}.csv".format(course_id_prefix, timestamp_str),
-        rows
+def _grade_report_parts_dir(course_id, entry_id):
+    """
+    Return the key under which the partial grade reports of the subtasks of
+    InstructorTask `entry_id` are stored in the GradesStore. This is kept apart
+    from `course_id` so that partial files aren't listed as downloads.
+    """
+    return "{}/grade_report_parts/{}".format(course_id, entry_id)
+
+
+def perform_delegate_grade_report(create_subtask_fcn, entry_id, course_id, task_input, action_name):
+    """
+    Generate the grade report for `course_id` by splitting the enrolled students
+    into chunks of no more than settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK, and
+    queueing a subtask for each chunk.
+
+    `create_subtask_fcn` takes the InstructorTask id, the course id, the list of
+    students (as dicts with a 'pk' key) and the initial SubtaskStatus, and
+    returns a subtask running `generate_grade_report_part`. The last subtask
+    to finish merges the partial reports with `merge_grade_report_parts`.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+
+    # As with bulk email, the task may have been requeued after its subtasks
+    # have already been created. In that case there's nothing left to do.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning("Task %s has already been processed for grade report!  InstructorTask = %s",
+                         entry.task_id, entry)
+        return json.loads(entry.task_output)
+
+    # The subtasks' chunks are queried by pk ranges, so the students must be in pk order
+    enrolled_students = CourseEnrollment.users_enrolled_in(course_id).order_by('pk')
+    if not enrolled_students.exists():
+        # Nothing to split up, but we still want the (empty) report
+        return push_grades_to_s3(None, entry_id, course_id, task_input, action_name)
+
+    return queue_subtasks_for_query(
+        entry,
+        action_name,
+        partial(create_subtask_fcn, entry_id, course_id),
+        enrolled_students,
+        [],
+        settings.GRADES_DOWNLOAD_STUDENTS_PER_QUERY,
+        settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK
     )
 
-    # If there are any error rows (don't count the header), write them out as well
-    if len(err_rows) > 1:
+
+def generate_grade_report_part(entry_id, course_id, student_ids, subtask_status_dict):
+    """
+    Grade the students with ids `student_ids` in `course_id`, and store their
+    grade report rows as a partial report for InstructorTask `entry_id`.
+
+    Progress is recorded in the InstructorTask as for other subtasks. If the
+    subtask fails, all its students are reported in the error report. If this
+    was the last subtask of the task to finish, whether or not it failed, the
+    partial reports are merged. Returns the subtask's status as a dict.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    # Parts are named after the first student id in them, so merging them in
+    # name order keeps the report sorted as the enrollment query was.
+    part_name = "{:012d}".format(min(student_ids))
+    parts_dir = _grade_report_parts_dir(course_id, entry_id)
+    num_succeeded = 0
+    num_failed = 0
+    try:
+        students = User.objects.filter(id__in=student_ids).order_by('id')
+        grades_store = GradesStore.from_config()
+        with TemporaryFile() as rows_file, TemporaryFile() as err_rows_file:
+            for succeeded in _write_grade_report_rows(course_id, students, csv.writer(rows_file), csv.writer(err_rows_file)):
+                if succeeded:
+                    num_succeeded += 1
+                else:
+                    num_failed += 1
+
+            rows_file.seek(0)
+            grades_store.store_rows(parts_dir, part_name + ".csv", csv.reader(rows_file))
+            if num_failed > 0:
+                err_rows_file.seek(0)
+                grades_store.store_rows(parts_dir, part_name + "_err.csv", csv.reader(err_rows_file))
+    except Exception as exc:
+        TASK_LOG.exception("Grade report subtask %s for instructor task %d failed", current_task_id, entry_id)
+        _store_failed_grade_report_part(parts_dir, part_name, student_ids, unicode(exc).encode('utf-8'))
+        subtask_status.increment(failed=len(student_ids), state=FAILURE)
+        update_subtask_status(entry_id, current_task_id, subtask_status)
+        try:
+            _merge_grade_report_parts_if_finished(entry_id)
+        except Exception:  # pylint: disable=broad-except
+            TASK_LOG.exception("Could not merge the grade report parts of instructor task %d", entry_id)
+        raise
+
+    subtask_status.increment(succeeded=num_succeeded, failed=num_failed, state=SUCCESS)
+    update_subtask_status(entry_id, current_task_id, subtask_status)
+    _merge_grade_report_parts_if_finished(entry_id)
+
+    return subtask_status.to_dict()
+
+
+def _store_failed_grade_report_part(parts_dir, part_name, student_ids, err_msg):
+    """
+    Replace whatever the failed grade report subtask with part `part_name`
+    stored with an error part listing all its students, `student_ids`, with
+    `err_msg`. Errors are only logged, so that the subtask's failure is still
+    recorded.
+    """
+    try:
+        grades_store = GradesStore.from_config()
+        if part_name + ".csv" in [name for name, _ in grades_store.links_for(parts_dir)]:
+            grades_store.delete(parts_dir, part_name + ".csv")
+        students = User.objects.filter(id__in=student_ids).order_by('id').values_list('id', 'username')
         grades_store.store_rows(
-            course_id,
-            "{}_grade_report_{}_err.csv".format(course_id_prefix, timestamp_str),
-            err_rows
+            parts_dir,
+            part_name + "_err.csv",
+            [[student_id, username, err_msg] for student_id, username in students]
         )
+    except Exception:  # pylint: disable=broad-except
+        TASK_LOG.exception("Could not store the error report of failed grade report part %s/%s", parts_dir, part_name)
 
-    # One last update before we close out...
-    return update_task_progress()
+
+def _merge_grade_report_parts_if_finished(entry_id):
+    """
+    Merge the partial grade reports of InstructorTask `entry_id` if all its
+    subtasks have finished. Only one of the subtasks that see the task finished
+    gets to merge. If the merge fails, the lock is released so that it can be
+    run again: the partial reports are only deleted once they are merged.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    lock_key = "grade-report-merge-{}".format(entry_id)
+    if entry.task_state == SUCCESS and cache.add(lock_key, "true", SUBTASK_LOCK_EXPIRE):
+        try:
+            merge_grade_report_parts(entry)
+        except Exception:
+            cache.delete(lock_key)
+            raise
+
+
+def merge_grade_report_parts(entry):
+    """
+    Concatenate the partial grade reports written by the subtasks of the
+    InstructorTask `entry` into the final grade report (and error report, if
+    any students failed), upload them through the GradesStore, and delete the
+    partial reports. Rows are streamed through temporary files.
+    """
+    course_id = entry.course_id
+    parts_dir = _grade_report_parts_dir(course_id, entry.id)
+    grades_store = GradesStore.from_config()
+    part_names = sorted(name for name, _ in grades_store.links_for(parts_dir))
+
+    header = None
+    has_errors = False
+    with TemporaryFile() as rows_file, TemporaryFile() as err_rows_file:
+        rows_writer = csv.writer(rows_file)
+        err_rows_writer = csv.writer(err_rows_file)
+        err_rows_writer.writerow(["id", "username", "error_msg"])
+
+        for part_name in part_names:
+            part_rows = grades_store.rows_for(parts_dir, part_name)
+            if part_name.endswith("_err.csv"):
+                has_errors = True
+                err_rows_writer.writerows(part_rows)
+                continue
+
+            part_header = next(part_rows, None)
+            if part_header is None:
+                # None of the students of this part could be graded
+                continue
+            if header is None:
+                header = part_header
+                rows_writer.writerow(header)
+
+            if part_header == header:
+                rows_writer.writerows(part_rows)
+            else:
+                # Line the columns up with the first part's header, as
+                # _write_grade_report_rows does for missing sections.
+                for row in part_rows:
+                    values = dict(zip(part_header, row))
+                    rows_writer.writerow([values.get(label, 0.0) for label in header])
+
+        timestamp = entry.created or datetime.now(UTC)
+        rows_file.seek(0)
+        grades_store.store_rows(course_id, _grade_report_filename(course_id, timestamp), csv.reader(rows_file))
+        if has_errors:
+            err_rows_file.seek(0)
+            grades_store.store_rows(
+                course_id,
+                _grade_report_filename(course_id, timestamp, "_err"),
+                csv.reader(err_rows_file)
+            )
+
+    for part_name in part_names:
+        grades_store.delete(parts_dir, part_name)
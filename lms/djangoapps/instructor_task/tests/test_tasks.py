@@ -6,11 +6,15 @@ paths actually work.
 
 """
 import json
+import shutil
+from tempfile import mkdtemp
 from uuid import uuid4
 
 from mock import Mock, MagicMock, patch
 
 from celery.states import SUCCESS, FAILURE
+from django.test import TestCase
+from django.test.utils import override_settings
 
 from xmodule.modulestore.exceptions import ItemNotFoundError
 
@@ -18,11 +22,15 @@ from courseware.models import StudentModule
 from courseware.tests.factories import StudentModuleFactory
 from student.tests.factories import UserFactory, CourseEnrollmentFactory
 
-from instructor_task.models import InstructorTask
+from instructor_task.models import InstructorTask, LocalFSGradesStore
 from instructor_task.tests.test_base import InstructorTaskModuleTestCase
 from instructor_task.tests.factories import InstructorTaskFactory
 from instructor_task.tasks import rescore_problem, reset_problem_attempts, delete_problem_state
-from instructor_task.tasks_helper import UpdateProblemModuleStateError
+from instructor_task.tasks_helper import (
+    UpdateProblemModuleStateError,
+    merge_grade_report_parts,
+    _store_failed_grade_report_part,
+)
 
 PROBLEM_URL_NAME = "test_urlname"
 
@@ -257,6 +265,28 @@ class TestRescoreInstructorTask(TestInstructorTasks):
         self.assertEquals(output.get('action_name'), 'rescored')
         self.assertGreater(output.get('duration_ms'), 0)
 
+    @override_settings(INSTRUCTOR_TASK_MODULES_PER_TASK=3)
+    def test_rescoring_in_subtasks(self):
+        input_state = json.dumps({'done': True})
+        num_students = 10
+        self._create_students_with_state(num_students, input_state)
+        task_entry = self._create_input_entry()
+        mock_instance = Mock()
+        mock_instance.rescore_problem = Mock(return_value={'success': 'correct'})
+        with patch('instructor_task.tasks_helper.get_module_for_descriptor_internal') as mock_get_module:
+            mock_get_module.return_value = mock_instance
+            self._run_task_with_mock_celery(rescore_problem, task_entry.id, task_entry.task_id)
+        # the students were split among subtasks, whose results are added up
+        entry = InstructorTask.objects.get(id=task_entry.id)
+        self.assertEquals(json.loads(entry.subtasks)['total'], 4)
+        self.assertEquals(entry.task_state, SUCCESS)
+        output = json.loads(entry.task_output)
+        self.assertEquals(output.get('attempted'), num_students)
+        self.assertEquals(output.get('succeeded'), num_students)
+        self.assertEquals(output.get('total'), num_students)
+        self.assertEquals(output.get('action_name'), 'rescored')
+        self.assertEquals(mock_instance.rescore_problem.call_count, num_students)
+
     def test_rescoring_bad_result(self):
         # Confirm that rescoring does not succeed if "success" key is not an expected value.
         input_state = json.dumps({'done': True})
@@ -346,6 +376,24 @@ class TestResetAttemptsInstructorTask(TestInstructorTasks):
         # check that entries were reset
         self._assert_num_attempts(students, 0)
 
+    @override_settings(INSTRUCTOR_TASK_MODULES_PER_TASK=3)
+    def test_reset_in_subtasks(self):
+        initial_attempts = 3
+        input_state = json.dumps({'attempts': initial_attempts})
+        num_students = 10
+        students = self._create_students_with_state(num_students, input_state)
+        task_entry = self._create_input_entry()
+        self._run_task_with_mock_celery(reset_problem_attempts, task_entry.id, task_entry.task_id)
+        # check the results added up from the subtasks
+        entry = InstructorTask.objects.get(id=task_entry.id)
+        self.assertEquals(entry.task_state, SUCCESS)
+        output = json.loads(entry.task_output)
+        self.assertEquals(output.get('attempted'), num_students)
+        self.assertEquals(output.get('succeeded'), num_students)
+        self.assertEquals(output.get('total'), num_students)
+        # check that entries were reset
+        self._assert_num_attempts(students, 0)
+
     def _test_reset_with_student(self, use_email):
         """Run a reset task for one student, with several StudentModules for the problem defined."""
         num_students = 10
@@ -437,3 +485,76 @@ class TestDeleteStateInstructorTask(TestInstructorTasks):
                 StudentModule.objects.get(course_id=self.course.id,
                                           student=student,
                                           module_state_key=self.problem_url)
+
+
+class TestGradeReportMerge(TestCase):
+    """
+    Tests for merging the partial grade reports written by grade report subtasks.
+    """
+    def setUp(self):
+        self.root_path = mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root_path)
+        self.grades_store = LocalFSGradesStore(self.root_path)
+        self.entry = InstructorTaskFactory.create(task_type='grade_course', task_id=str(uuid4()))
+        self.parts_dir = "{}/grade_report_parts/{}".format(self.entry.course_id, self.entry.id)
+
+    def _merge(self):
+        """Merge the parts, and return the names of the files in the course's directory."""
+        with patch('instructor_task.tasks_helper.GradesStore.from_config', return_value=self.grades_store):
+            merge_grade_report_parts(self.entry)
+        return [name for name, _ in self.grades_store.links_for(self.entry.course_id)]
+
+    def test_merge_parts(self):
+        header = ["id", "email", "username", "grade", "HW 01"]
+        self.grades_store.store_rows(self.parts_dir, "000000000003.csv", [header, ["3", "c@x.org", "c", "0.5", "0.5"]])
+        self.grades_store.store_rows(self.parts_dir, "000000000001.csv", [header, ["1", "a@x.org", "a", "1.0", "1.0"]])
+        self.grades_store.store_rows(self.parts_dir, "000000000001_err.csv", [["2", "b", "oops"]])
+
+        filenames = self._merge()
+        self.assertEqual(len(filenames), 2)
+        err_filename, report_filename = filenames
+        self.assertEqual(
+            list(self.grades_store.rows_for(self.entry.course_id, report_filename)),
+            [header, ["1", "a@x.org", "a", "1.0", "1.0"], ["3", "c@x.org", "c", "0.5", "0.5"]]
+        )
+        self.assertEqual(
+            list(self.grades_store.rows_for(self.entry.course_id, err_filename)),
+            [["id", "username", "error_msg"], ["2", "b", "oops"]]
+        )
+        # The parts are cleaned up
+        self.assertEqual(self.grades_store.links_for(self.parts_dir), [])
+
+    def test_merge_mismatched_headers(self):
+        self.grades_store.store_rows(self.parts_dir, "000000000001.csv", [
+            ["id", "email", "username", "grade", "HW 01", "HW 02"],
+            ["1", "a@x.org", "a", "1.0", "1.0", "1.0"],
+        ])
+        self.grades_store.store_rows(self.parts_dir, "000000000002.csv", [
+            ["id", "email", "username", "grade", "HW 02"],
+            ["2", "b@x.org", "b", "0.5", "0.5"],
+        ])
+        self.grades_store.store_rows(self.parts_dir, "000000000003.csv", [])
+
+        (report_filename,) = self._merge()
+        rows = list(self.grades_store.rows_for(self.entry.course_id, report_filename))
+        self.assertEqual(rows[2], ["2", "b@x.org", "b", "0.5", "0.0", "0.5"])
+
+    def test_merge_failed_part(self):
+        header = ["id", "email", "username", "grade", "HW 01"]
+        students = [UserFactory.create(), UserFactory.create()]
+        self.grades_store.store_rows(self.parts_dir, "000000000000.csv", [header, ["0", "a@x.org", "a", "1.0", "1.0"]])
+        # The failed subtask had stored some rows before failing
+        part_name = "{:012d}".format(students[0].id)
+        self.grades_store.store_rows(self.parts_dir, part_name + ".csv", [header, [str(students[0].id), "", "", "1", "1"]])
+        with patch('instructor_task.tasks_helper.GradesStore.from_config', return_value=self.grades_store):
+            _store_failed_grade_report_part(self.parts_dir, part_name, [student.id for student in students], "oops")
+
+        err_filename, report_filename = self._merge()
+        self.assertEqual(
+            list(self.grades_store.rows_for(self.entry.course_id, report_filename)),
+            [header, ["0", "a@x.org", "a", "1.0", "1.0"]]
+        )
+        self.assertEqual(
+            list(self.grades_store.rows_for(self.entry.course_id, err_filename)),
+            [["id", "username", "error_msg"]] + [[str(student.id), student.username, "oops"] for student in students]
+        )
@@ -128,6 +128,8 @@ if STATIC_URL_BASE:
     if not STATIC_URL.endswith("/"):
         STATIC_URL += "/"
 
+STATIC_REPLACE_CACHE_SIZE = ENV_TOKENS.get('STATIC_REPLACE_CACHE_SIZE', STATIC_REPLACE_CACHE_SIZE)
+
 PLATFORM_NAME = ENV_TOKENS.get('PLATFORM_NAME', PLATFORM_NAME)
 # For displaying on the receipt. At Stanford PLATFORM_NAME != MERCHANT_NAME, but PLATFORM_NAME is a fine default
 CC_MERCHANT_NAME = ENV_TOKENS.get('CC_MERCHANT_NAME', PLATFORM_NAME)
@@ -232,6 +234,11 @@ VIRTUAL_UNIVERSITIES = ENV_TOKENS.get('VIRTUAL_UNIVERSITIES', [])
 META_UNIVERSITIES = ENV_TOKENS.get('META_UNIVERSITIES', {})
 COMMENTS_SERVICE_URL = ENV_TOKENS.get("COMMENTS_SERVICE_URL", '')
 COMMENTS_SERVICE_KEY = ENV_TOKENS.get("COMMENTS_SERVICE_KEY", '')
+COMMENTS_SERVICE_TIMEOUT = ENV_TOKENS.get("COMMENTS_SERVICE_TIMEOUT", COMMENTS_SERVICE_TIMEOUT)
+COMMENTS_SERVICE_MAX_RETRIES = ENV_TOKENS.get("COMMENTS_SERVICE_MAX_RETRIES", COMMENTS_SERVICE_MAX_RETRIES)
+COMMENTS_SERVICE_POOL_SIZE = ENV_TOKENS.get("COMMENTS_SERVICE_POOL_SIZE", COMMENTS_SERVICE_POOL_SIZE)
+COMMENTS_SERVICE_CACHE_TIMEOUT = ENV_TOKENS.get("COMMENTS_SERVICE_CACHE_TIMEOUT", COMMENTS_SERVICE_CACHE_TIMEOUT)
+DISCUSSION_CATEGORY_MAP_CACHE_TIMEOUT = ENV_TOKENS.get("DISCUSSION_CATEGORY_MAP_CACHE_TIMEOUT", DISCUSSION_CATEGORY_MAP_CACHE_TIMEOUT)
 CERT_QUEUE = ENV_TOKENS.get("CERT_QUEUE", 'test-pull')
 ZENDESK_URL = ENV_TOKENS.get("ZENDESK_URL")
 FEEDBACK_SUBMISSION_EMAIL = ENV_TOKENS.get("FEEDBACK_SUBMISSION_EMAIL")
@@ -245,6 +252,8 @@ for name, value in ENV_TOKENS.get("CODE_JAIL", {}).items():
     else:
         CODE_JAIL[name] = value
 
+CODE_JAIL_POOL.update(ENV_TOKENS.get("CODE_JAIL_POOL", {}))
+
 COURSES_WITH_UNSAFE_CODE = ENV_TOKENS.get("COURSES_WITH_UNSAFE_CODE", [])
 
 # Event Tracking
@@ -280,6 +289,7 @@ AWS_STORAGE_BUCKET_NAME = AUTH_TOKENS.get('AWS_STORAGE_BUCKET_NAME', 'edxuploads
 DATABASES = AUTH_TOKENS['DATABASES']
 
 XQUEUE_INTERFACE = AUTH_TOKENS['XQUEUE_INTERFACE']
+XQUEUE_CLIENT.update(ENV_TOKENS.get('XQUEUE_CLIENT', {}))
 
 # Get the MODULESTORE from auth.json, but if it doesn't exist,
 # use the one from common.py
@@ -335,3 +345,9 @@ VERIFY_STUDENT = AUTH_TOKENS.get("VERIFY_STUDENT", VERIFY_STUDENT)
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
 GRADES_DOWNLOAD = ENV_TOKENS.get("GRADES_DOWNLOAD", GRADES_DOWNLOAD)
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = ENV_TOKENS.get("GRADES_DOWNLOAD_STUDENTS_PER_TASK", GRADES_DOWNLOAD_STUDENTS_PER_TASK)
+GRADES_DOWNLOAD_STUDENTS_PER_QUERY = ENV_TOKENS.get("GRADES_DOWNLOAD_STUDENTS_PER_QUERY", GRADES_DOWNLOAD_STUDENTS_PER_QUERY)
+
+# Problem rescoring
+INSTRUCTOR_TASK_MODULES_PER_TASK = ENV_TOKENS.get("INSTRUCTOR_TASK_MODULES_PER_TASK", INSTRUCTOR_TASK_MODULES_PER_TASK)
+INSTRUCTOR_TASK_MODULES_PER_QUERY = ENV_TOKENS.get("INSTRUCTOR_TASK_MODULES_PER_QUERY", INSTRUCTOR_TASK_MODULES_PER_QUERY)
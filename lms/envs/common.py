@@ -48,6 +48,19 @@ DISCUSSION_SETTINGS = {
     'MAX_COMMENT_DEPTH': 2,
 }
 
+# The comments service client: how long to wait for the service, how many
+# times to retry the GETs which can't connect, how many connections to keep
+# open, and how many seconds to cache thread lists and users for (0 disables
+# caching; any write to the service invalidates the cache)
+COMMENTS_SERVICE_TIMEOUT = 5
+COMMENTS_SERVICE_MAX_RETRIES = 2
+COMMENTS_SERVICE_POOL_SIZE = 10
+COMMENTS_SERVICE_CACHE_TIMEOUT = 10
+
+# How many seconds to cache the discussion category map of a course for (0
+# disables caching; it is recomputed whenever the course is changed)
+DISCUSSION_CATEGORY_MAP_CACHE_TIMEOUT = 60 * 60
+
 
 # Features
 FEATURES = {
@@ -200,6 +213,14 @@ FEATURES = {
     # Give course staff unrestricted access to grade downloads (if set to False,
     # only edX superusers can perform the downloads)
     'ALLOW_COURSE_STAFF_GRADE_DOWNLOADS': False,
+
+    # Persist each student's per-section scores and reuse them when grading,
+    # recomputing only sections whose scores changed since the last computation
+    'ENABLE_PERSISTENT_GRADE_CACHE': False,
+
+    # Keep snapshots of the student state loaded to render courseware in the
+    # cache, and reuse them until the student's state changes
+    'ENABLE_FIELD_DATA_SNAPSHOTS': False,
 }
 
 # Used for A/B testing
@@ -211,6 +232,19 @@ GENERATE_PROFILE_SCORES = False
 # Used with XQueue
 XQUEUE_WAITTIME_BETWEEN_REQUESTS = 5  # seconds
 
+# How the LMS talks to XQueue, see capa.xqueue_interface.XQueueInterface.
+# After failure_threshold failed requests in a row, submissions fail at once
+# for recovery_time seconds. With async_submit, submissions are sent to XQueue
+# in the background.
+XQUEUE_CLIENT = {
+    'timeout': 10,  # seconds
+    'retries': 1,
+    'pool_size': 10,
+    'failure_threshold': 5,
+    'recovery_time': 30,  # seconds
+    'async_submit': False,
+}
+
 
 ############################# SET PATH INFORMATION #############################
 PROJECT_ROOT = path(__file__).abspath().dirname().dirname()  # /edx-platform/lms
@@ -415,6 +449,14 @@ CODE_JAIL = {
     },
 }
 
+# Sandboxed code can run in a pool of warm sandbox processes rather than a new
+# process each time.  'size' is how many each server process may keep (0 turns
+# the pool off), and each is replaced after 'max_executions'.
+CODE_JAIL_POOL = {
+    'size': 0,
+    'max_executions': 100,
+}
+
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
 # of them must match the course id for that course to run unsafe code.
 #
@@ -623,6 +665,8 @@ MIDDLEWARE_CLASSES = (
     # Detects user-requested locale from 'accept-language' header in http request
     'django.middleware.locale.LocaleMiddleware',
 
+    # Must come before TransactionMiddleware, so that it runs after the commit
+    'courseware.middleware.FieldDataVersionMiddleware',
     'django.middleware.transaction.TransactionMiddleware',
     # 'debug_toolbar.middleware.DebugToolbarMiddleware',
 
@@ -640,6 +684,10 @@ MIDDLEWARE_CLASSES = (
 
 STATICFILES_STORAGE = 'pipeline.storage.PipelineCachedStorage'
 
+# How many rewritten texts, and how many staticfiles lookups, static_replace
+# keeps in each process.  0 turns its caches off.
+STATIC_REPLACE_CACHE_SIZE = 1000
+
 from rooted_paths import rooted_glob
 
 courseware_js = (
@@ -1083,3 +1131,16 @@ GRADES_DOWNLOAD = {
     'BUCKET': 'edx-grades',
     'ROOT_PATH': '/tmp/edx-s3/grades',
 }
+
+# Grade reports are generated by subtasks that each grade at most this many students
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = 500
+# Number of students fetched per query when dividing students among subtasks
+GRADES_DOWNLOAD_STUDENTS_PER_QUERY = 5000
+
+###################### Problem Rescoring ######################
+
+# Rescoring and resetting a problem for more students than this is split among
+# subtasks that each update at most this many students' state
+INSTRUCTOR_TASK_MODULES_PER_TASK = 500
+# Number of student states fetched per query when dividing them among subtasks
+INSTRUCTOR_TASK_MODULES_PER_QUERY = 5000
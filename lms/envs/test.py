@@ -28,6 +28,13 @@ FEATURES['DISABLE_START_DATES'] = True
 # to reload
 FEATURES['ENABLE_DISCUSSION_SERVICE'] = False
 
+# The tests mock the discussion service's responses, so don't cache them
+COMMENTS_SERVICE_CACHE_TIMEOUT = 0
+
+# The tests change the courses' discussions between requests, so compute the
+# category maps every time
+DISCUSSION_CATEGORY_MAP_CACHE_TIMEOUT = 0
+
 FEATURES['ENABLE_SERVICE_STATUS'] = True
 
 FEATURES['ENABLE_HINTER_INSTRUCTOR_VIEW'] = True
@@ -64,6 +71,9 @@ TEST_ROOT = path("test_root")
 # Want static files in the same dir for running on jenkins.
 STATIC_ROOT = TEST_ROOT / "staticfiles"
 
+# Tests replace the staticfiles storage, so don't remember its lookups
+STATIC_REPLACE_CACHE_SIZE = 0
+
 STATUS_MESSAGE_PATH = TEST_ROOT / "status_message.json"
 
 COURSES_ROOT = TEST_ROOT / "data"
@@ -82,6 +82,12 @@ class Model(object):
     def initializable_attributes(self):
         return extract(self.attributes, self.initializable_fields)
 
+    def cache_scope(self):
+        """
+        Return the course and user whose cached responses writes to this change
+        """
+        return {'course_id': self.attributes.get('course_id'), 'user_id': self.attributes.get('user_id')}
+
     @classmethod
     def before_save(cls, instance):
         pass
@@ -94,17 +100,17 @@ class Model(object):
         self.before_save(self)
         if self.id:   # if we have id already, treat this as an update
             url = self.url(action='put', params=self.attributes)
-            response = perform_request('put', url, self.updatable_attributes())
+            response = perform_request('put', url, self.updatable_attributes(), **self.cache_scope())
         else:   # otherwise, treat this as an insert
             url = self.url(action='post', params=self.attributes)
-            response = perform_request('post', url, self.initializable_attributes())
+            response = perform_request('post', url, self.initializable_attributes(), **self.cache_scope())
         self.retrieved = True
         self.update_attributes(**response)
         self.after_save(self)
 
     def delete(self):
         url = self.url(action='delete', params=self.attributes)
-        response = perform_request('delete', url)
+        response = perform_request('delete', url, **self.cache_scope())
         self.retrieved = True
         self.update_attributes(**response)
 
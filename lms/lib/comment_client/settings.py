@@ -11,3 +11,14 @@ if hasattr(settings, "COMMENTS_SERVICE_KEY"):
     API_KEY = settings.COMMENTS_SERVICE_KEY
 else:
     API_KEY = "PUT_YOUR_API_KEY_HERE"
+
+# How long to wait for the service to respond, and how many times to retry
+# the GETs which can't connect to it
+TIMEOUT = getattr(settings, "COMMENTS_SERVICE_TIMEOUT", 5)
+MAX_RETRIES = getattr(settings, "COMMENTS_SERVICE_MAX_RETRIES", 0)
+
+# How many connections to the service to keep open
+POOL_SIZE = getattr(settings, "COMMENTS_SERVICE_POOL_SIZE", 10)
+
+# How many seconds to cache the responses of GETs for; 0 disables caching
+CACHE_TIMEOUT = getattr(settings, "COMMENTS_SERVICE_CACHE_TIMEOUT", 0)
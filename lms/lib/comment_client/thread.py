@@ -40,7 +40,7 @@ class Thread(models.Model):
             url = cls.url(action='get_all', params=extract(params, 'commentable_id'))
             if params.get('commentable_id'):
                 del params['commentable_id']
-        response = perform_request('get', url, params, *args, **kwargs)
+        response = perform_request('get', url, params, *args, cache=True, **kwargs)
         return response.get('collection', []), response.get('page', 1), response.get('num_pages', 1)
 
     @classmethod
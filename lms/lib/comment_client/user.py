@@ -29,11 +29,11 @@ class User(models.Model):
 
     def follow(self, source):
         params = {'source_type': source.type, 'source_id': source.id}
-        response = perform_request('post', _url_for_subscription(self.id), params)
+        response = perform_request('post', _url_for_subscription(self.id), params, user_id=self.id)
 
     def unfollow(self, source):
         params = {'source_type': source.type, 'source_id': source.id}
-        response = perform_request('delete', _url_for_subscription(self.id), params)
+        response = perform_request('delete', _url_for_subscription(self.id), params, user_id=self.id)
 
     def vote(self, voteable, value):
         if voteable.type == 'thread':
@@ -63,7 +63,7 @@ class User(models.Model):
         url = _url_for_user_active_threads(self.id)
         params = {'course_id': self.course_id}
         params = merge_dict(params, query_params)
-        response = perform_request('get', url, params)
+        response = perform_request('get', url, params, cache=True, user_id=self.id)
         return response.get('collection', []), response.get('page', 1), response.get('num_pages', 1)
 
     def subscribed_threads(self, query_params={}):
@@ -72,15 +72,18 @@ class User(models.Model):
         url = _url_for_user_subscribed_threads(self.id)
         params = {'course_id': self.course_id}
         params = merge_dict(params, query_params)
-        response = perform_request('get', url, params)
+        response = perform_request('get', url, params, cache=True, user_id=self.id)
         return response.get('collection', []), response.get('page', 1), response.get('num_pages', 1)
 
+    def cache_scope(self):
+        return {'course_id': self.attributes.get('course_id'), 'user_id': self.id}
+
     def _retrieve(self, *args, **kwargs):
         url = self.url(action='get', params=self.attributes)
         retrieve_params = self.default_retrieve_params
         if self.attributes.get('course_id'):
             retrieve_params['course_id'] = self.course_id
-        response = perform_request('get', url, retrieve_params)
+        response = perform_request('get', url, retrieve_params, cache=True, user_id=self.id)
         self.update_attributes(**response)
 
 
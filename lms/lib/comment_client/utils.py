@@ -1,14 +1,35 @@
 from contextlib import contextmanager
 from dogapi import dog_stats_api
+from django.core.cache import cache
+import hashlib
 import json
 import logging
 import requests
+from requests.adapters import HTTPAdapter
 import settings
 from time import time
 from uuid import uuid4
 
 log = logging.getLogger(__name__)
 
+# The cache key of the site-wide generation of the cached responses, which
+# changes on writes to the service not known to be for any course or user.
+# The generations of single courses and users are stored under keys prefixed
+# with it.
+CACHE_GENERATION_KEY = 'comment_client.cache_generation'
+
+
+def _make_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=settings.POOL_SIZE, pool_maxsize=settings.POOL_SIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+# The session all the requests to the service are made with, which keeps
+# their connections open to be reused
+SESSION = _make_session()
+
 
 def strip_none(dic):
     return dict([(k, v) for k, v in dic.iteritems() if v is not None])
@@ -49,28 +70,112 @@ def request_timer(request_id, method, url):
     )
 
 
+def _generation_keys(course_id=None, user_id=None):
+    """
+    Return the cache keys of the generations a response depends on: the
+    site-wide one, plus those of the course and user it was requested for
+    """
+    keys = [CACHE_GENERATION_KEY]
+    if course_id is not None:
+        keys.append('{0}.course.{1}'.format(CACHE_GENERATION_KEY, course_id))
+    if user_id is not None:
+        keys.append('{0}.user.{1}'.format(CACHE_GENERATION_KEY, user_id))
+    return keys
+
+
+def _invalidate_cache(keys):
+    """
+    Make the cached responses depending on the generations stored under keys
+    stale, by changing those generations
+    """
+    generations = dict((key, uuid4().hex) for key in keys)
+    cache.set_many(generations)
+    return generations
+
+
+def _cache_key(url, params, course_id=None, user_id=None):
+    keys = _generation_keys(course_id, user_id)
+    generations = cache.get_many(keys)
+    missing = [key for key in keys if key not in generations]
+    if missing:
+        generations.update(_invalidate_cache(missing))
+    key = json.dumps([[generations[key] for key in keys], url, params], sort_keys=True)
+    return 'comment_client.response.{0}'.format(hashlib.md5(key.encode('utf-8')).hexdigest())
+
+
+def _course_id_of(text):
+    """
+    Return the course of the thread or comment a write responded with, if any
+    """
+    try:
+        return json.loads(text).get('course_id')
+    except (ValueError, AttributeError):
+        return None
+
+
 def perform_request(method, url, data_or_params=None, *args, **kwargs):
+    """
+    Make a request to the comments service, returning its response parsed
+    from JSON, or as text if raw is given.
+
+    If cache is given, the response of a GET is cached for
+    settings.CACHE_TIMEOUT seconds, until a write is made to the course or
+    user it is for. These are given by course_id and user_id, or else taken
+    from data_or_params; writes that have neither make every cached
+    response stale.
+    """
     if data_or_params is None:
         data_or_params = {}
+    course_id = kwargs.get('course_id') or data_or_params.get('course_id')
+    user_id = kwargs.get('user_id') or data_or_params.get('user_id')
     headers = {'X-Edx-Api-Key': settings.API_KEY}
     request_id = uuid4()
     request_id_dict = {'request_id': request_id}
 
+    cache_key = None
+    if method == 'get' and kwargs.get('cache', False) and settings.CACHE_TIMEOUT:
+        cache_key = _cache_key(url, data_or_params, course_id, user_id)
+        text = cache.get(cache_key)
+        if text is not None:
+            return _parse_response(text, **kwargs)
+
     if method in ['post', 'put', 'patch']:
         data = data_or_params
         params = request_id_dict
     else:
         data = None
         params = merge_dict(data_or_params, request_id_dict)
+
+    # Only GETs are retried, as the others may have been made already
+    retries = settings.MAX_RETRIES if method == 'get' else 0
     with request_timer(request_id, method, url):
-        response = requests.request(
-            method,
-            url,
-            data=data,
-            params=params,
-            headers=headers,
-            timeout=5
-        )
+        for attempt in xrange(retries + 1):
+            try:
+                response = SESSION.request(
+                    method,
+                    url,
+                    data=data,
+                    params=params,
+                    headers=headers,
+                    timeout=settings.TIMEOUT
+                )
+                break
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == retries:
+                    raise
+                log.warning("comment_client_request_retry: request_id=%s, method=%s, url=%s", request_id, method, url)
+
+    if settings.CACHE_TIMEOUT:
+        if method != 'get':
+            if course_id is None:
+                course_id = _course_id_of(response.text)
+            if course_id is None and user_id is None:
+                _invalidate_cache([CACHE_GENERATION_KEY])
+            else:
+                _invalidate_cache(_generation_keys(course_id, user_id)[1:])
+        elif data_or_params.get('mark_as_read') and user_id is not None:
+            # Reading a thread only changes the thread lists of its reader
+            _invalidate_cache(_generation_keys(user_id=user_id)[1:])
 
     if 200 < response.status_code < 500:
         raise CommentClientRequestError(response.text, response.status_code)
@@ -80,10 +185,16 @@ def perform_request(method, url, data_or_params=None, *args, **kwargs):
     elif response.status_code == 500:
         raise CommentClient500Error(response.text)
     else:
-        if kwargs.get("raw", False):
-            return response.text
-        else:
-            return json.loads(response.text)
+        if cache_key is not None:
+            cache.set(cache_key, response.text, settings.CACHE_TIMEOUT)
+        return _parse_response(response.text, **kwargs)
+
+
+def _parse_response(text, raw=False, **kwargs):
+    if raw:
+        return text
+    else:
+        return json.loads(text)
 
 
 class CommentClientError(Exception):
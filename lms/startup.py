@@ -10,6 +10,7 @@ settings.INSTALLED_APPS  # pylint: disable=W0104
 
 from django_startup import autostartup
 from xmodule.modulestore.django import modulestore
+from capa.safe_exec import configure_pool
 
 log = logging.getLogger(__name__)
 
@@ -19,6 +20,8 @@ def run():
     """
     autostartup()
 
+    configure_pool(**settings.CODE_JAIL_POOL)
+
     # Trigger a forced initialization of our modulestores since this can take a while to complete
     # and we want this done before HTTP requests are accepted.
     if settings.INIT_MODULESTORE_ON_STARTUP: